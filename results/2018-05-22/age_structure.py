@@ -3,9 +3,16 @@
 ###############################################################
 
 import simuPOP as sim
+import sys
+import os
 import random
 import math
 import argparse
+import numpy
+# Operators shared by the scripts are kept in the src/ folder at the top of the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from operators import Mortality, Smurfing, VectorInfoExec
+from arraypop import ArrayPopulation
 
 ###############################################################
 #                 ARGUMENTS AND  VARIABLES                    #
@@ -18,17 +25,14 @@ parser.add_argument('-k', default=0.1911, type=float, help='rate of mortality of
 parser.add_argument('-N', default=5000, type=int, help='Population size.')
 parser.add_argument('-G', default=200, type=int, help='Number of generations.')
 parser.add_argument('-o', '--output', default='z1.txt', type=argparse.FileType('w'))
+parser.add_argument('-e', '--engine', default='simupop', choices=['simupop', 'numpy'], help='Simulate with simuPOP, or with the numpy arrays of arraypop.py, which can handle millions of individuals. Default: simupop.')
+parser.add_argument('-s', '--seed', default=None, type=int, help='Random number generator seed. Default: drawn from the system.')
 args = parser.parse_args()
 
 ###############################################################
 #                    FUNCTIONS AND CLASSES                    #
 ###############################################################
 
-def natural_death(smurf):
-   if smurf == 1.0 and random.random() < 1.0 - math.exp(-args.k):
-      return True
-   else:
-      return False
 def demo(gen, pop):
    if gen < 10:
       return pop.popSize()
@@ -38,31 +42,43 @@ def demo(gen, pop):
 def qtrait(geno):
    return (args.a, args.b)
 
-def outputStructure(pop):
-   numInd = {1: {0: {}, 1: {}}, 2: {0: {}, 1: {}}}
-   sim.stat(pop, popSize=True, maxOfInfo='age')
-   maxAge = int(pop.vars()['maxOfInfo']['age'])
-   numInd[1][0] = {x: 0 for x in range(maxAge + 1)}
-   numInd[1][1] = {x: 0 for x in range(maxAge + 1)}
-   numInd[2][0] = {x: 0 for x in range(maxAge + 1)}
-   numInd[2][1] = {x: 0 for x in range(maxAge + 1)}
-#   with open(args.output, 'w') as out:
-   args.output.write("# Generation: %d\n" % pop.dvars().gen)
-   args.output.write("# Total size: %d; maximum age: %d\n" % (pop.vars()['popSize'], maxAge))
+def writeStructure(gen, size, table):
+   '''Writes the numbers of individuals by sex, smurf state and age, from an array of shape (2, 2, maxAge + 1).'''
+   maxAge = table.shape[2] - 1
+   args.output.write("# Generation: %d\n" % gen)
+   args.output.write("# Total size: %d; maximum age: %d\n" % (size, maxAge))
    args.output.write("# Age\tSmurfMales\tMales\tFemales\tSmurfFemales\n")
    args.output.write("# Parameters of mortality model: a=%.4f, b=%.4f, k=%.4f, t_0=%.4f\n" % (args.a, args.b, args.k, -args.b/args.a))
-   for ind in pop.individuals():
-      numInd[ind.sex()][int(ind.smurf)][int(ind.age)] += 1
    for age in range(maxAge + 1):
-      args.output.write("%d\t%d\t%d\t%d\t%d\n" % (age, numInd[1][1][age], numInd[1][0][age], numInd[2][0][age], numInd[2][1][age]))
+      args.output.write("%d\t%d\t%d\t%d\t%d\n" % (age, table[0][1][age], table[0][0][age], table[1][0][age], table[1][1][age]))
    args.output.close()
+
+def outputStructure(pop):
+   sim.stat(pop, popSize=True, maxOfInfo='age')
+   maxAge = int(pop.vars()['maxOfInfo']['age'])
+   table = [[[0] * (maxAge + 1) for smurf in range(2)] for sex in range(2)]
+   for ind in pop.individuals():
+      table[ind.sex() - 1][int(ind.smurf)][int(ind.age)] += 1
+   writeStructure(pop.dvars().gen, pop.vars()['popSize'], numpy.array(table))
    return True
 
 ###############################################################
 #                         POPULATION                          #
 ###############################################################
 
-pop = sim.Population(args.N, loci = 1, ploidy = 2, infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'luck', 'fitness', 't0'])
+if args.engine == 'numpy':
+   # The same daily cycle, applied to arrays instead of simuPOP individuals. See arraypop.py.
+   pop = ArrayPopulation(args.N, args.a, args.b, k=args.k, loci=1, freq=[0.9, 0.1], seed=args.seed)
+   for gen in range(args.G):
+      pop.day(subPopSize=demo)
+   writeStructure(pop.gen, pop.popSize(), pop.structure())
+   sys.exit(0)
+
+if args.seed is not None:
+   sim.setRNG('mt19937', args.seed)
+   random.seed(args.seed)
+
+pop = sim.Population(args.N, loci = 1, ploidy = 2, infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'fitness'])
 
 pop.setVirtualSplitter(
    sim.CombinedSplitter(
@@ -89,6 +105,9 @@ exec('import math', pop.vars(), pop.vars())
 
 simu = sim.Simulator(pop, rep=1)
 
+# The same operator gives newborn founders their chance to become smurfs at age 0.
+smurfing = Smurfing(seed=args.seed)
+
 simu.evolve(
    initOps = [
       sim.InitSex(),
@@ -96,18 +115,15 @@ simu.evolve(
       sim.InitInfo([0], infoFields = 'age'),
       sim.InitInfo([args.a], infoFields = 'a'),
       sim.InitInfo([args.b], infoFields = 'b'),
-      sim.InitInfo(lambda: random.random(), infoFields = 'luck'),
-      sim.InfoExec("t0 = -ind.b / ind.a", exposeInd = 'ind'),
-      sim.InfoExec("smurf = 1.0 if ((ind.smurf == 1) or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd = 'ind'),
+      smurfing,
       sim.IdTagger()
    ],
    # The order should be: becoming a smurf or not since previous day, dying or not, aging one day
    # if lucky enough, and then mate at that age.
    preOps = [
-      sim.InfoExec("luck = random.random()"),
-      sim.InfoExec("smurf = 1.0 if ((ind.smurf == 1) or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd='ind'),
-      sim.DiscardIf(natural_death),
-      sim.InfoExec("age += 1")
+      smurfing,
+      Mortality('two_phases', k=args.k, seed=args.seed),
+      VectorInfoExec("age += 1")
    ],
    matingScheme = sim.HeteroMating(
       [
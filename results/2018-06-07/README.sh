@@ -28,19 +28,13 @@
 # Calculations of survival curves on 2018-06-21 suggest the following range
 # of parameters: 0.003 < a < 0.0100, b ~ -0.019.
 
-for XLoci in 20 100 200; do
-   for ALoci in 0 20 100 200; do
-      for mu in .00001 .0001 .001; do
-         if [ ! -e MSB.${XLoci}.${ALoci}${mu}.txt ]; then
-            INITFREQ=`echo "1.55 * ($XLoci + $ALoci) * $mu" | bc -l`
-            python mutationSelectionBalance.py \
-               -m 0.003 -M 0.010 -N 50000 -G 50000 --step 100 -q $INITFREQ\
-               -X $XLoci -A $ALoci -u $mu -o MSB.${XLoci}.${ALoci}${mu}.txt > MSB.${XLoci}.${ALoci}${mu}.log &
-         fi
-      done
-   done
-done
-wait
+# Launching all the combinations at once oversubscribes the machine. The sweep
+# runner in src/ runs as many at a time as cores are available, and records their
+# state in sweep.json. If interrupted, running it again only runs what did not finish.
+python ../../src/sweep.py mutationSelectionBalance.py \
+   "-m 0.003 -M 0.010 -N 50000 -G 50000 --step 100 -q {q} -X {X} -A {A} -u {u} -o MSB.{X}.{A}{u}.txt" \
+   -p X 20 100 200 -p A 0 20 100 200 -p u .00001 .0001 .001 -d "q=1.55 * (X + A) * u" \
+   -l "MSB.{X}.{A}{u}.log" -m sweep.json
 
 # The script mutationSelectionBalance.py wrote a first line for generation 0,
 # which gnuplot complains about, because of the logaritmic scale of the X axis.
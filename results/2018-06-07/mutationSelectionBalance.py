@@ -3,10 +3,15 @@
 ###############################################################
 
 import simuPOP as sim
+import sys
+import os
 import random
 import math
 import argparse
 import numpy
+# Operators shared by the scripts are kept in the src/ folder at the top of the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from operators import Mortality, Smurfing, VectorInfoExec, SexSpecificTransmitter, TableSelector, fitness_table, ArrayQuanTrait, PopStats
 
 ###############################################################
 #                 ARGUMENTS AND  VARIABLES                    #
@@ -37,12 +42,6 @@ A_loci = args.autosomal
 #                    FUNCTIONS AND CLASSES                    #
 ###############################################################
 
-def natural_death(smurf):
-   if smurf == 1.0 and random.random() < 1.0 - math.exp(-args.k):
-      return True
-   else:
-      return False
-
 def demo(gen, pop):
    if gen < 10:
       return pop.popSize()
@@ -66,59 +65,17 @@ def AdditiveCodominant(geno, ind):
    b = args.b
    return (a, b)
 
-def AdditiveRecessive(geno, ind):
-   # males have a shorter 'geno' tuple, because there is only one
-   # allele in each locus of the X chromosome. Assuming that X loci
-   # are listed before the autosomal ones.
-   a = min_a
-   gene_effect = (max_a - min_a) / ind.totNumLoci()
-   if ind.sex() == 1:
-      for X_locus in range(X_loci):
-         if geno[X_locus] == 1:
-            a += gene_effect
-      for A_locus in range(ind.totNumLoci() - X_loci):
-         if geno[X_loci + A_locus * 2] + geno[X_loci + A_locus * 2 + 1] == 2:
-            a += gene_effect
-   elif ind.sex() == 2:
-      for locus in range(ind.totNumLoci()):
-         if geno[locus * 2] + geno[locus * 2 + 1] == 2:
-            a += gene_effect
-   b = args.b
-   return (a, b)
-
-class sexSpecificRecombinator(sim.PyOperator):
-    def __init__(self, intensity=0, rates=0, loci=sim.ALL_AVAIL, convMode=sim.NO_CONVERSION,
-            maleIntensity=0, maleRates=0, maleLoci=sim.ALL_AVAIL, maleConvMode=sim.NO_CONVERSION,
-            *args, **kwargs):
-        # This operator is used to recombine maternal chromosomes
-        self.Recombinator = sim.Recombinator(rates, intensity, loci, convMode)
-        # This operator is used to recombine paternal chromosomes
-        self.maleRecombinator = sim.Recombinator(maleRates, maleIntensity,
-            maleLoci, maleConvMode)
-        sim.PyOperator.__init__(self, func=self.transmitGenotype, *args, **kwargs)
-    def transmitGenotype(self, pop, off, dad, mom):
-        # Form the first homologous copy of offspring.
-        self.Recombinator.transmitGenotype(mom, off, 0)
-        # Form the second homologous copy of offspring.
-        self.maleRecombinator.transmitGenotype(dad, off, 1)
-        return True
-
 def OutputStats(pop):
-   X = 0
-   for locus in range(X_loci):
-      X += pop.dvars().alleleFreq[locus][1]
-   A = 0
-   for locus in range(X_loci, X_loci + A_loci):
-      A += pop.dvars().alleleFreq[locus][1]
+   # Mean mutant frequencies in X-linked and autosomal loci are computed by PopStats.
    if pop.dvars().gen == 0:
       args.output.write("#Gen. \tMeanFreqX \tMeanFreqAu\tMaleAge\tFemAge \tMale_a\tFem_a \n")
    outstring = "{:6d}".format(pop.dvars().gen)
    if X_loci > 0:
-      outstring += "\t{:.8f}".format(X/X_loci)
+      outstring += "\t{:.8f}".format(pop.dvars().mutantFreq['X'])
    else:
       outstring += "\t          "
    if A_loci > 0:
-      outstring += "\t{:.8f}".format(A/A_loci)
+      outstring += "\t{:.8f}".format(pop.dvars().mutantFreq['A'])
    else:
       outstring += "\t          "
    outstring += "\t{:7.4f}".format(pop.dvars().meanOfInfo_malesAge['age'])
@@ -140,7 +97,7 @@ def OutputStats(pop):
 # and 2.07 / A_loci, respectively. 
 pop = sim.Population(args.N, loci = [X_loci, A_loci], ploidy = 2,
    chromTypes = [sim.CHROMOSOME_X, sim.AUTOSOME],
-   infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'luck', 't0', 'fitness'])
+   infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'fitness'])
 
 pop.dvars().seed = args.seed
 
@@ -178,6 +135,9 @@ exec("import math", pop.vars(), pop.vars())
 
 simu = sim.Simulator(pop, rep=1)
 
+# The same operator gives newborn founders their chance to become smurfs at age 0.
+smurfing = Smurfing(seed=args.seed)
+
 simu.evolve(
    initOps = [
       sim.InitSex(),
@@ -185,17 +145,14 @@ simu.evolve(
       sim.InitInfo([0], infoFields = 'age'),
       sim.InitInfo([min_a], infoFields = 'a'),
       sim.InitInfo([-10 * min_a], infoFields = 'b'),
-      sim.InitInfo(lambda: random.random(), infoFields = 'luck'),
-      sim.InfoExec("t0 = -ind.b / ind.a", exposeInd = 'ind'),
-      sim.InfoExec("smurf = 1.0 if ((ind.smurf == 1) or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd = 'ind'),
+      smurfing,
       sim.IdTagger()
    ],
    preOps = [
-      sim.InfoExec("luck = random.random()"),
-      sim.InfoExec("smurf = 1.0 if ((ind.smurf == 1) or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd='ind'),
-      sim.DiscardIf(natural_death),
-      sim.InfoExec("age += 1"),
-      sim.PySelector(func=fitness_func)
+      smurfing,
+      Mortality('two_phases', k=args.k, seed=args.seed),
+      VectorInfoExec("age += 1"),
+      TableSelector(fitness_table(fitness_func, 50))
    ],
    matingScheme = sim.HeteroMating(
       [
@@ -205,8 +162,7 @@ simu.evolve(
                sim.IdTagger(),
                sim.PedigreeTagger(),
                sim.InfoExec("smurf = 0.0"),
-               sexSpecificRecombinator(rates=[ 0.75 / X_loci for x in range(X_loci) ] + [ 2.07 / A_loci for x in range(A_loci) ], maleRates=0.0),
-               sim.PyQuanTrait(loci = sim.ALL_AVAIL, func = AdditiveRecessive, infoFields = ['a', 'b']) 
+               sim.MendelianGenoTransmitter()
             ],
             weight = 1,
             subPops = [(0,1)],
@@ -216,12 +172,11 @@ simu.evolve(
       subPopSize = demo
    ),
    postOps = [
+      # Mothers recombine, with maps of 0.75 Morgans on the X and 2.07 Morgans on the autosomes. Fathers do not.
+      SexSpecificTransmitter(rates = [ 0.75 / X_loci for x in range(X_loci) ] + [ 2.07 / A_loci for x in range(A_loci) ], maleRates = 0.0, seed = args.seed, newborns = (0, 5)),
+      ArrayQuanTrait(min_a, (max_a - min_a) / max(1, X_loci + A_loci), args.b, mode='recessive'),
       sim.SNPMutator(u=args.mutation, subPops=[(0,5)]),
-      sim.Stat(alleleFreq=sim.ALL_AVAIL, step=args.step),
-      sim.Stat(meanOfInfo='age', subPops=[(0,3)], suffix='_malesAge', step=args.step),
-      sim.Stat(meanOfInfo='age', subPops=[(0,4)], suffix='_femalesAge', step=args.step),
-      sim.Stat(meanOfInfo='a', subPops=[(0,3)], suffix='_males', step=args.step),
-      sim.Stat(meanOfInfo='a', subPops=[(0,4)], suffix='_females', step=args.step),
+      PopStats(meanOfInfo=[('age', 1, '_malesAge'), ('age', 2, '_femalesAge'), ('a', 1, '_males'), ('a', 2, '_females')], step=args.step),
       sim.PyOperator(func=OutputStats, step=args.step)
    ],
    gen=args.G
@@ -3,11 +3,19 @@
 ###############################################################
 
 import simuPOP as sim
+import sys
+import os
 import random
 import math
 import argparse
 import re
 import numpy
+# Operators shared by the scripts are kept in the src/ folder at the top of the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from operators import Mortality, Smurfing, VectorInfoExec, TableSelector, fitness_table, ArrayQuanTrait, PedigreeSink, AgeHistogram
+import pedigree
+from classcount import ClassCounts
+from leslie import aging_parameters
 
 ###############################################################
 #                 ARGUMENTS AND  VARIABLES                    #
@@ -25,8 +33,11 @@ parser.add_argument('-s', '--feffect', type=float, default=0.114, help='Female s
 parser.add_argument('-d', '--dominance', type=float, default=0.5, help='Coefficient of dominance of deleterious allele in females. Default: 0.5')
 parser.add_argument('-f', '--initfreq', type=float, default=0.5, help='Initial frequency of allele 1. Default: 0.5.')
 parser.add_argument('-o', '--output', default='z1', help='Ouput file prefix. Default: z1.')
+parser.add_argument('-r', '--seed', default=None, type=int, help='Random number generator seed. Default: drawn from the system.')
+parser.add_argument('-E', '--engine', default='simupop', choices=['simupop', 'counts'], help='Simulate individuals with simuPOP, or only the numbers of individuals of every sex, genotype, age and smurf state (see classcount.py), which is fast for any population size. Default: simupop.')
 args = parser.parse_args()
 min_a = args.a
+maxAge = 200
 if re.search("two|phases|smurf", args.model, re.I):
    args.model = "two_phases"
 if re.search("gompert?z", args.model, re.I):
@@ -34,36 +45,10 @@ if re.search("gompert?z", args.model, re.I):
 if re.search("weibull?", args.model, re.I):
    args.model = "weibull"
 
-fh = open(args.output + '.ped', 'w')
-
 ###############################################################
 #                    FUNCTIONS AND CLASSES                    #
 ###############################################################
 
-def aging_model(model):
-   def two_phases(smurf, pop):
-      k = pop.dvars().k
-      if smurf == 1 and random.random() < 1.0 - math.exp(-k):
-         return True
-      else:
-         return False
-   def weibull(age, a, b):
-      if random.random() < 1.0 - math.exp(-(a/b) * (age + 1) ** b + (a/b) * age ** b):
-         return True
-      else:
-         return False
-   def gompertz(age, a, b):
-      if random.random() < 1.0 - math.exp( (a * math.exp(b * age) / b) * (1.0 - math.exp(b)) ):
-         return True
-      else:
-         return False
-   if model == "two_phases":
-      return two_phases
-   if model == "gompertz":
-      return gompertz
-   if model == "weibull":
-      return weibull
-
 def demo(gen, pop):
    # This prevents running out of reproducers in a cohort of larvae where one
    # or more died.
@@ -97,30 +82,78 @@ def fitness_func(geno, ind, pop, age):
       value *= 1.0
    return value
 
-def MaleEffect(geno, ind):
-   if ind.sex() == 2:
-      a = min_a
-   else:
-      # allele "1" makes male aging rate increase.
-      a = min_a + args.meffect * geno[0]
-   b = args.b
-   t0 = -b / a
-   return (a, b, t0)
+def report(Offspring, Individuals, AccumAges):
+   '''Writes the average relative fitness of genotypes and the numbers of offspring and of individuals by age.'''
+   TotalMaleFitness   = {g: Offspring[0, g] for g in range(2)}
+   TotalFemaleFitness = {g: Offspring[1, g] for g in range(3)}
+   NumMales = {g: int(Individuals[0, g]) for g in range(2)}
+   NumFemales = {g: int(Individuals[1, g]) for g in range(3)}
+   AverageMaleFitness = {0: 0, 1: 0}
+   AverageFemaleFitness = {0: 0, 1: 0, 2: 0}
+   assert sum(TotalMaleFitness[0] + TotalMaleFitness[1]) == sum(TotalFemaleFitness[0] + TotalFemaleFitness[1] + TotalFemaleFitness[2])
+   for genotype in range(2):
+      try:
+         AverageMaleFitness[genotype] = TotalMaleFitness[genotype].sum() / NumMales[genotype]
+      except ZeroDivisionError:
+         AverageMaleFitness[genotype] = 'nan'
+   MaxMaleFitness = max([x for x in AverageMaleFitness.values() if x != 'nan'])
+   # Because the keys (genotypes) are like an index (0, 1...) I can use an array instead of a dictionary.
+   # Here, I trust that dictionaries preserve the insertion order of both keys and values (new in python 3.7).
+   RelativeMaleFitness = [ x / MaxMaleFitness if x != 'nan' and MaxMaleFitness > 0 else 'nan' for x in AverageMaleFitness.values()]
+   for genotype in range(3):
+      try:
+         AverageFemaleFitness[genotype] = TotalFemaleFitness[genotype].sum() / NumFemales[genotype]
+      except ZeroDivisionError:
+         AverageFemaleFitness[genotype] = 'nan'
+   MaxFemaleFitness = max([x for x in AverageFemaleFitness.values() if x != 'nan'])
+   RelativeFemaleFitness = [ x / MaxFemaleFitness if x != 'nan' and MaxFemaleFitness > 0 else 'nan' for x in AverageFemaleFitness.values()]
+
+   with open(args.output + '.fit', 'w') as FitnessFile:
+      print("#Model    \tBasic_a\tDelta_a\tFem_s\tDomin.\tFreq.\tSex\tGenot.\tOffs.\tParents\tAve_fit.\tRel_fit.", file=FitnessFile)
+      for genotype in range(2):
+         print("{}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.2f}\tMales\t{:d}\t{:d}\t{:d}\t{}\t{}".format(args.model, args.a, args.meffect,
+            args.feffect, args.dominance, args.initfreq, genotype, int(TotalMaleFitness[genotype].sum()), NumMales[genotype],
+            AverageMaleFitness[genotype], RelativeMaleFitness[genotype]), file = FitnessFile)
+      for genotype in range(3):
+         print("{}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.2f}\tFemales\t{:d}\t{:d}\t{:d}\t{}\t{}".format(args.model, args.a, args.meffect,
+            args.feffect, args.dominance, args.initfreq, genotype, int(TotalFemaleFitness[genotype].sum()), NumFemales[genotype],
+            AverageFemaleFitness[genotype], RelativeFemaleFitness[genotype]), file = FitnessFile)
+   
+   with open(args.output + '.age', 'w') as AgeFile:
+      # Recall, AccumAges is an array filled along the simulation that records the accumulated number of individuals ever
+      # alive right before mating with a specific sex (index 0 or 1), genotype (0, 1 or 2) and age (up to MaxAge).
+      print("#Age\tM0_Abs\tM1_Abs\tF0_Abs\tF1_Abs\tF2_Abs\t\tM0_Num\tM1_Num\tF0_Num\tF1_Num\tF2_Num", file = AgeFile)
+      for age in range(1,50):
+         print("{: 3}\t{: 6}\t{: 6}\t{: 6}\t{: 6}\t{: 6}\t\t{: 6}\t{: 6}\t{: 6}\t{: 6}\t{: 6}".format(age,
+            TotalMaleFitness[0][age], TotalMaleFitness[1][age], TotalFemaleFitness[0][age], TotalFemaleFitness[1][age], TotalFemaleFitness[2][age],
+            AccumAges[0, 0, age], AccumAges[0, 1, age], AccumAges[1, 0, age], AccumAges[1, 1, age], AccumAges[1, 2, age]), file = AgeFile)
 
 ###############################################################
 #                         POPULATION                          #
 ###############################################################
 
+if args.engine == 'counts':
+   # The same life cycle, applied to the numbers of individuals of every class. See classcount.py.
+   # Parents are counted as PedigreeSink and AgeHistogram would, without a pedigree.
+   counts = ClassCounts(aging_parameters(min_a, args.meffect, 'X', 'codominant', sexes=(1,)), args.b,
+                        fitness_table(fitness_func, 50), model = args.model, k = args.k, chromosome = 'X',
+                        N = args.N, p0 = args.initfreq, maxAge = maxAge, seed = args.seed).run(args.G)
+   report(counts.children[..., :50], counts.born, counts.alive)
+   sys.exit(0)
+
+if args.seed is not None:
+   sim.setRNG('mt19937', args.seed)
+
 pop = sim.Population(args.N, loci = [1], ploidy = 2,
    chromTypes = [sim.CHROMOSOME_X],
-   infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'luck', 'fitness', 't0', 'birthday'])
-#pop.dvars().seed = args.seed
+   infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'fitness', 'birthday'])
+pop.dvars().seed = args.seed
 pop.dvars().min_a = min_a
 pop.dvars().meffect = args.meffect
 pop.dvars().feffect = args.feffect
 pop.dvars().dominance = args.dominance
 pop.dvars().k = args.k
-pop.dvars().maxAge = 200
+pop.dvars().maxAge = maxAge
 
 # Below the population is split first by an age cutoff of 10 days
 # (larvae and adults), and then by the aging stage (normal, smurf).
@@ -145,14 +178,24 @@ pop.setVirtualSplitter(
 )
 
 # This is to be able to call random and math from InfoExec:
-exec("import random", pop.vars(), pop.vars())
+exec("import random\nrandom.seed(seed)", pop.vars(), pop.vars())
 exec("import math", pop.vars(), pop.vars())
 
 ###############################################################
 #                         SIMULATION                          #
 ###############################################################
 
+# The pedigree is written in binary records, first the initial population and then
+# the offspring of every generation. See pedigree.py.
+sink = PedigreeSink(args.output + '.ped', loci = [0])
+# The number of individuals alive right before mating, by sex, genotype and age,
+# is accumulated across generations in an array.
+ages = AgeHistogram(loci = [0], maxAge = pop.dvars().maxAge)
+
 simu = sim.Simulator(pop, 1)
+# The same operator gives newborn founders their chance to become smurfs at age 0.
+smurfing = Smurfing(seed=args.seed)
+
 simu.evolve(
    initOps = [
       sim.InitSex(),
@@ -163,21 +206,17 @@ simu.evolve(
       # At this point, even males are diploids! Only 1/1 and 1/0 (but not 0/1) males get 'a' increased.
       sim.InfoExec("a = min_a + meffect if ind.sex() == 1 and ind.allele(0,0) == 1 else min_a", exposeInd = 'ind'),
       sim.InitInfo([ args.b ], infoFields = 'b'),
-      sim.InitInfo(lambda: random.random(), infoFields = 'luck'),
-      sim.InfoExec("t0 = -ind.b / ind.a", exposeInd = 'ind'),
-      sim.InfoExec("smurf = 1.0 if (ind.smurf == 1 or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd = 'ind'),
+      smurfing,
       sim.IdTagger(),
-      sim.PedigreeTagger(output = '>>{}.ped'.format(args.output), outputFields = ['a', 'birthday'], outputLoci = [0]),
-      sim.PyExec("AccumAges = {1: {0: {x: 0 for x in range(maxAge)}, 1: {x: 0 for x in range(maxAge)}, 2: {x: 0 for x in range(maxAge)}}, 2: {0: {x: 0 for x in range (maxAge)}, 1: {x: 0 for x in range(maxAge)}, 2: {x: 0 for x in range(maxAge)}}}")
+      sink
    ],
    preOps = [
-      sim.InfoExec("luck = random.random()"),
-      sim.InfoExec("smurf = 1.0 if (ind.smurf == 1 or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd='ind'),
-      sim.DiscardIf(aging_model(args.model)),
-      sim.InfoExec("age += 1"),
+      smurfing,
+      Mortality(args.model, seed=args.seed),
+      VectorInfoExec("age += 1"),
       # Here, ind.allele(0,1) is 0 for all males, except in first generation.
-      sim.InfoExec("AccumAges[ind.sex()][ind.allele(0,0) + ind.allele(0,1)][int(ind.age)] += 1", usePopVars=True, exposeInd='ind'),
-      sim.PySelector(loci=[0], func=fitness_func)
+      ages,
+      TableSelector(fitness_table(fitness_func, 50), loci=[0])
    ],
    matingScheme = sim.HeteroMating(
       [
@@ -188,8 +227,7 @@ simu.evolve(
                sim.InfoExec("smurf = 0.0"),
                sim.InfoExec("birthday = gen"),
                sim.MendelianGenoTransmitter(),
-               sim.PyQuanTrait(loci = sim.ALL_AVAIL, func = MaleEffect, infoFields = ['a', 'b', 't0']),
-               sim.PedigreeTagger(output = '>>{}.ped'.format(args.output), outputFields = ['a', 'birthday'], outputLoci=[0])
+               sim.PedigreeTagger()
             ],
             weight = 1,
             subPops = [(0,1)],
@@ -198,92 +236,22 @@ simu.evolve(
       ],
       subPopSize = demo
    ),
+   postOps = [
+      ArrayQuanTrait(min_a, args.meffect, args.b, mode='codominant', sexes=[1]),
+      sink
+   ],
    gen = args.G
 )
 
-fh.close()
+sink.close()
 
 pop = simu.extract(0)
-AccumAges = pop.dvars().AccumAges
-OffspringNumber = {}
-Sex = {}
-Genotype = {}
-Birthday = {}
-with open(args.output + '.ped', 'r') as ped:
-   for line in ped:
-      Fields = line.split()
-      # Initialize the number of children that focal individual will have at each age. Now, all zeros.
-      OffspringNumber[int(Fields[0])] = numpy.zeros(50, dtype=numpy.uint64)
-      Sex[int(Fields[0])] = Fields[3]
-      Genotype[int(Fields[0])] = int(Fields[7]) + int(Fields[8])
-      Birthday[int(Fields[0])] = int(Fields[6])
-      # The first generation, genotypes are initialized as if all chromosomes were
-      # autosomes, and some males are assigned genotype '1 1'. I change that to have
-      # consistent hemizygous genotypes in all males.
-      if Fields[3] == 'M' and Genotype[int(Fields[0])] == 2:
-         Genotype[int(Fields[0])] = 1
-      try:
-         # This counts the individual as offspring of its _father_ at the father's age.
-         OffspringNumber[int(Fields[1])][int(Fields[6]) - Birthday[int(Fields[1])]] += 1
-      except KeyError:
-         assert Fields[1] == '0'
-      try:
-         # And now of its mother.
-         OffspringNumber[int(Fields[2])][int(Fields[6]) - Birthday[int(Fields[2])]] += 1
-      except KeyError:
-         assert Fields[2] == '0'
-
+AccumAges = ages.table(0)
 # This will record the numbers of offspring from age-specific parents, across all generations.
 # To compare the age-specific fecundities between genotypes, we need to know the overall
 # (across generations) numbers of parents at each age. Note the use of a numpy array.
-TotalMaleFitness   = {0: numpy.zeros(50, dtype=numpy.uint64), 1: numpy.zeros(50, dtype=numpy.uint64)}
-TotalFemaleFitness = {0: numpy.zeros(50, dtype=numpy.uint64), 1: numpy.zeros(50, dtype=numpy.uint64), 2: numpy.zeros(50, dtype=numpy.uint64)}
-NumMales = {0: 0, 1: 0}
-NumFemales = {0: 0, 1: 0, 2: 0}
-AverageMaleFitness = {0: 0, 1: 0}
-AverageFemaleFitness = {0: 0, 1: 0, 2: 0}
-# This iterates over all individuals simulated, including those who didn't reach adulthood by the end of the simulation...
-for ind in OffspringNumber.keys():
-   if Sex[ind] == 'M':
-      TotalMaleFitness[Genotype[ind]] += OffspringNumber[ind]
-      NumMales[Genotype[ind]] += 1
-   else:
-      TotalFemaleFitness[Genotype[ind]] += OffspringNumber[ind]
-      NumFemales[Genotype[ind]] += 1
-assert sum(TotalMaleFitness[0] + TotalMaleFitness[1]) == sum(TotalFemaleFitness[0] + TotalFemaleFitness[1] + TotalFemaleFitness[2])
-for genotype in range(2):
-   try:
-      AverageMaleFitness[genotype] = TotalMaleFitness[genotype].sum() / NumMales[genotype]
-   except ZeroDivisionError:
-      AverageMaleFitness[genotype] = 'nan'
-MaxMaleFitness = max([x for x in AverageMaleFitness.values() if x != 'nan'])
-# Because the keys (genotypes) are like an index (0, 1...) I can use an array instead of a dictionary.
-# Here, I trust that dictionaries preserve the insertion order of both keys and values (new in python 3.7).
-RelativeMaleFitness = [ x / MaxMaleFitness if x != 'nan' and MaxMaleFitness > 0 else 'nan' for x in AverageMaleFitness.values()]
-for genotype in range(3):
-   try:
-      AverageFemaleFitness[genotype] = TotalFemaleFitness[genotype].sum() / NumFemales[genotype]
-   except ZeroDivisionError:
-      AverageFemaleFitness[genotype] = 'nan'
-MaxFemaleFitness = max([x for x in AverageFemaleFitness.values() if x != 'nan'])
-RelativeFemaleFitness = [ x / MaxFemaleFitness if x != 'nan' and MaxFemaleFitness > 0 else 'nan' for x in AverageFemaleFitness.values()]
-
-with open(args.output + '.fit', 'w') as FitnessFile:
-   print("#Model    \tBasic_a\tDelta_a\tFem_s\tDomin.\tFreq.\tSex\tGenot.\tOffs.\tParents\tAve_fit.\tRel_fit.", file=FitnessFile)
-   for genotype in range(2):
-      print("{}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.2f}\tMales\t{:d}\t{:d}\t{:d}\t{}\t{}".format(args.model, args.a, args.meffect,
-         args.feffect, args.dominance, args.initfreq, genotype, int(TotalMaleFitness[genotype].sum()), NumMales[genotype],
-         AverageMaleFitness[genotype], RelativeMaleFitness[genotype]), file = FitnessFile)
-   for genotype in range(3):
-      print("{}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.4f}\t{:.2f}\tFemales\t{:d}\t{:d}\t{:d}\t{}\t{}".format(args.model, args.a, args.meffect,
-         args.feffect, args.dominance, args.initfreq, genotype, int(TotalFemaleFitness[genotype].sum()), NumFemales[genotype],
-         AverageFemaleFitness[genotype], RelativeFemaleFitness[genotype]), file = FitnessFile)
-   
-with open(args.output + '.age', 'w') as AgeFile:
-   # Recall, AccumAges is dictionary created along simulation that records the accumulated number of individuals ever
-   # alive right before mating with a specific sex (1 or 2), genotype (0, 1 or 2) and age (up to MaxAge).
-   print("#Age\tM0_Abs\tM1_Abs\tF0_Abs\tF1_Abs\tF2_Abs\t\tM0_Num\tM1_Num\tF0_Num\tF1_Num\tF2_Num", file = AgeFile)
-   for age in range(1,50):
-      print("{: 3}\t{: 6}\t{: 6}\t{: 6}\t{: 6}\t{: 6}\t\t{: 6}\t{: 6}\t{: 6}\t{: 6}\t{: 6}".format(age,
-         TotalMaleFitness[0][age], TotalMaleFitness[1][age], TotalFemaleFitness[0][age], TotalFemaleFitness[1][age], TotalFemaleFitness[2][age],
-         AccumAges[1][0][age], AccumAges[1][1][age], AccumAges[2][0][age], AccumAges[2][1][age], AccumAges[2][2][age]), file = AgeFile)
+# The pedigree is read only once, in chunks, and the offspring of every parent are added
+# to the totals of its sex and genotype at the age of the parent, without keeping a record
+# per individual. Males with genotype '1 1' in the first generation count as genotype 1.
+Offspring, Individuals = pedigree.offspring_by_parent_age(args.output + '.ped', ages = 50, maxAge = pop.dvars().maxAge)
+report(Offspring, Individuals, AccumAges)
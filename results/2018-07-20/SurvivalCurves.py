@@ -3,10 +3,19 @@
 ###############################################################
 
 import simuPOP as sim
+import sys
+import os
 import random
 import math
 import argparse
 import re
+import numpy
+# Operators shared by the scripts are kept in the src/ folder at the top of the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from operators import Mortality, Smurfing, VectorInfoExec
+from replicates import run_replicates
+from arraypop import ArrayPopulation
+from cohort import cohort_counts, KINDS
 
 ###############################################################
 #                 ARGUMENTS AND  VARIABLES                    #
@@ -21,6 +30,10 @@ parser.add_argument('-N', default=5000, type=int, help='Population size.')
 parser.add_argument('-G', default=200, type=int, help='Number of days to simulate. Default: 200.')
 parser.add_argument('-o', '--output', default='z1.txt', type=argparse.FileType('w'))
 parser.add_argument('-r', '--replicates', default=1, type=int, help='Number of replicates. Default: 1.')
+parser.add_argument('-s', '--seed', default=None, type=int, help='Random number generator seed. Default: drawn from the system.')
+parser.add_argument('-w', '--workers', default=None, type=int, help='Number of replicates to simulate at the same time, in different processes. Default: number of cores.')
+parser.add_argument('-e', '--engine', default='simupop', choices=['simupop', 'numpy', 'counts'], help='Simulate with simuPOP, with the numpy arrays of arraypop.py, which can handle millions of individuals, or only with the numbers of individuals of every class, drawn from binomial distributions (see cohort.py), which is fast for any cohort size and number of replicates. Default: simupop.')
+parser.add_argument('-B', '--bands', action='store_true', help='Instead of the proportions alive in every replicate, print their mean and their 2.5%% and 97.5%% quantiles across replicates. Default: False.')
 args = parser.parse_args()
 
 if re.search("two|phases|smurf", args.model, re.I):
@@ -34,103 +47,108 @@ if re.search("weibull?", args.model, re.I):
 #                    FUNCTIONS AND CLASSES                    #
 ###############################################################
 
-def aging_model(model):
-   def two_phases(smurf, pop):
-      k = pop.dvars().k
-      if smurf == 1 and random.random() < 1.0 - math.exp(-k):
-         return True
-      else:
-         return False
-   def weibull(age, a, b):
-#      if random.random() < 1.0 - math.exp(-(a/b) * (age**b - (age - 1)**b)):
-      if random.random() < 1.0 - math.exp(-(a/b) * (age + 1) ** b + (a/b) * age ** b):
-         return True
-      else:
-         return False
-   def gompertz(age, a, b):
-#      if random.random() < 1.0 - math.exp( -(a * math.exp(b*age) / b) * (1.0 - math.exp(-b))):
-      if random.random() < 1.0 - math.exp( (a * math.exp(b * age) / b) * (1.0 - math.exp(b)) ):
-         return True
-      else:
-         return False
-   if model == "two_phases":
-      return two_phases
-   if model == "gompertz":
-      return gompertz
-   if model == "weibull":
-      return weibull
-
 def demo(gen, pop):
    return pop.popSize()
 
-###############################################################
-#                         POPULATION                          #
-###############################################################
+def cohort(rep, seeds):
+   '''Simulates one replicate cohort, and returns the numbers of larvae, adults and smurfs alive every day.'''
+   seed, pySeed = seeds
+   sim.setRNG('mt19937', seed)
+   random.seed(pySeed)
+
+   pop = sim.Population(args.N, loci = 0, ploidy = 2, infoFields = ['age', 'a', 'b', 'smurf'])
+
+   pop.setVirtualSplitter(
+      sim.CombinedSplitter(
+         splitters = [
+            sim.ProductSplitter(
+               splitters = [
+                  sim.InfoSplitter(field = 'age', cutoff = 10),
+                  sim.InfoSplitter(field = 'smurf', values = [0, 1])
+               ]
+            )
+         ],
+         vspMap = [(0), (2), (1,3)],
+         names = ['larvae', 'adults', 'smurfs']
+      )
+   )
+
+   # This is to be able to call random from InfoExec:
+   exec('import random', pop.vars(), pop.vars())
+   exec('import math', pop.vars(), pop.vars())
+   pop.dvars().k = args.k
+   pop.dvars().model = args.model
+
+   simu = sim.Simulator(pop, rep=1)
 
-pop = sim.Population(args.N, loci = 0, ploidy = 2, infoFields = ['age', 'a', 'b', 'smurf', 'luck', 't0'])
-
-pop.setVirtualSplitter(
-   sim.CombinedSplitter(
-      splitters = [
-         sim.ProductSplitter(
-            splitters = [
-               sim.InfoSplitter(field = 'age', cutoff = 10),
-               sim.InfoSplitter(field = 'smurf', values = [0, 1])
-            ]
-         )
+   # Only the two-phases model has smurfs. The same operator gives newborns a first chance at age 0.
+   smurfing = [Smurfing(seed=pySeed)] if args.model == 'two_phases' else []
+   simu.evolve(
+      initOps = [
+         sim.InitInfo([0], infoFields = 'age'),
+         sim.InitInfo([args.a], infoFields = 'a'),
+         sim.InitInfo([args.b], infoFields = 'b'),
+         sim.PyExec("Surviving = {'larvae': [], 'adults': [], 'smurfs': []}")
+      ] + smurfing,
+      preOps = smurfing + [
+         Mortality(args.model, seed=pySeed),
+         VectorInfoExec("age += 1")
       ],
-      vspMap = [(0), (2), (1,3)],
-      names = ['larvae', 'adults', 'smurfs']
+      matingScheme = sim.CloneMating(subPops = sim.ALL_AVAIL, subPopSize = demo),
+      postOps = [
+         sim.Stat(popSize=True, subPops=[(0,0), (0,1), (0,2)]),
+         sim.PyExec("Surviving['larvae'].append(subPopSize[0])"),
+         sim.PyExec("Surviving['adults'].append(subPopSize[1])"),
+         sim.PyExec("Surviving['smurfs'].append(subPopSize[2])"),
+#         sim.PyEval(r'"{:d}\t{:d}\t{:d}\t{:d}\n".format(gen, subPopSize[0], subPopSize[1], subPopSize[2])', step=1),
+         sim.TerminateIf('popSize == 0')
+      ],
+      gen=args.G
    )
-)
+   return simu.vars(0)['Surviving']
 
-# This is to be able to call random from InfoExec:
-exec('import random', pop.vars(), pop.vars())
-exec('import math', pop.vars(), pop.vars())
-pop.dvars().k = args.k
-pop.dvars().model = args.model
+def array_cohort(rep, seeds):
+   '''Same as cohort(), with the population kept in numpy arrays. See arraypop.py.'''
+   pop = ArrayPopulation(args.N, args.a, args.b, k=args.k, model=args.model, seed=seeds)
+   Surviving = {'larvae': [], 'adults': [], 'smurfs': []}
+   for day in range(args.G):
+      pop.day()
+      for kind, size in zip(['larvae', 'adults', 'smurfs'], pop.counts()):
+         Surviving[kind].append(size)
+      if pop.popSize() == 0:
+         break
+   return Surviving
 
 ###############################################################
 #                         SIMULATION                          #
 ###############################################################
 
-simu = sim.Simulator(pop, rep=args.replicates)
-
-simu.evolve(
-   initOps = [
-      sim.InitInfo([0], infoFields = 'age'),
-      sim.InitInfo([args.a], infoFields = 'a'),
-      sim.InitInfo([args.b], infoFields = 'b'),
-      sim.InitInfo(lambda: random.random(), infoFields = 'luck'),
-      sim.InfoExec("t0 = -ind.b / ind.a", exposeInd = 'ind'),
-      sim.InfoExec("smurf = 1 if (model == 'two_phases' and ind.age > ind.t0 and ind.luck <= 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0)) else 0", exposeInd = 'ind'),
-      sim.PyExec("Surviving = {'larvae': [], 'adults': [], 'smurfs': []}")
-   ],
-   preOps = [
-      sim.InfoExec("luck = random.random()"),
-      sim.InfoExec("smurf = 1 if ((ind.smurf == 1) or (model == 'two_phases' and ind.age > ind.t0 and ind.luck <= 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0", exposeInd='ind'),
-      sim.DiscardIf(aging_model(args.model)),
-      sim.InfoExec("age += 1")
-   ],
-   matingScheme = sim.CloneMating(subPops = sim.ALL_AVAIL, subPopSize = demo),
-   postOps = [
-      sim.Stat(popSize=True, subPops=[(0,0), (0,1), (0,2)]),
-      sim.PyExec("Surviving['larvae'].append(subPopSize[0])"),
-      sim.PyExec("Surviving['adults'].append(subPopSize[1])"),
-      sim.PyExec("Surviving['smurfs'].append(subPopSize[2])"),
-#      sim.PyEval(r'"{:d}\t{:d}\t{:d}\t{:d}\n".format(gen, subPopSize[0], subPopSize[1], subPopSize[2])', step=1),
-      sim.TerminateIf('popSize == 0')
-   ],
-   gen=args.G
-)
-
-args.output.write("#Gen\t" + "\t".join(['Larvae\tAdults\tSmurfs' for a in range(args.replicates)]) + "\n")
-for day in range(args.G):
-   line = "{:3d}".format(day + 1)
+if args.engine == 'counts':
+   # All replicates at once, with the counts of individuals of every class. See cohort.py.
+   counts = cohort_counts(args.N, args.G, args.model, args.a, args.b, args.k, args.replicates, rng=numpy.random.default_rng(args.seed))
+else:
+   # Replicates are simulated in parallel, with seeds derived from the root seed. See replicates.py.
+   Surviving = run_replicates(cohort if args.engine == 'simupop' else array_cohort, args.replicates, args.seed, args.workers)
+   counts = numpy.zeros((args.replicates, len(KINDS), args.G))
    for rep in range(args.replicates):
-      for kind in ['larvae', 'adults', 'smurfs']:
-         try:
-            line += "\t{:.4f}".format(simu.vars(rep)['Surviving'][kind][day] / args.N)
-         except IndexError:
-            line += "\t0.0000"
-   args.output.write(line + "\n")
+      for i, kind in enumerate(KINDS):
+         counts[rep, i, :len(Surviving[rep][kind])] = Surviving[rep][kind][:args.G]
+
+proportions = counts / args.N
+if args.bands:
+   args.output.write("#Gen\t" + "\t".join(['{0}\t{0}_2.5%\t{0}_97.5%'.format(kind.capitalize()) for kind in KINDS]) + "\n")
+   mean = proportions.mean(axis=0)
+   low, high = numpy.quantile(proportions, [0.025, 0.975], axis=0)
+   for day in range(args.G):
+      line = "{:3d}".format(day + 1)
+      for i in range(len(KINDS)):
+         line += "\t{:.4f}\t{:.4f}\t{:.4f}".format(mean[i, day], low[i, day], high[i, day])
+      args.output.write(line + "\n")
+else:
+   args.output.write("#Gen\t" + "\t".join(['Larvae\tAdults\tSmurfs' for a in range(args.replicates)]) + "\n")
+   for day in range(args.G):
+      line = "{:3d}".format(day + 1)
+      for rep in range(args.replicates):
+         for i in range(len(KINDS)):
+            line += "\t{:.4f}".format(proportions[rep, i, day])
+      args.output.write(line + "\n")
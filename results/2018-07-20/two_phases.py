@@ -1,6 +1,10 @@
 import argparse
 import numpy
-import math
+import sys
+import os
+# Modules shared by the scripts are kept in the src/ folder at the top of the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+import lifetable
 
 parser = argparse.ArgumentParser(description='Survival function of the smurf model of aging.')
 parser.add_argument('-a', '--min_a', default=0.001, type=float, help='')
@@ -14,38 +18,6 @@ parser.add_argument('-x', '--oldest', default=100, type=int, help='')
 parser.add_argument('-o', '--output', default='z1.txt', type=argparse.FileType('w'), help='')
 args=parser.parse_args()
 
-def fecundity(x):
-   if x < 10:
-      return 0
-   else:
-      F = 1 - ((x - 12)**2) / 100
-      if F > 0:
-         return F
-      else:
-         return 0
-
-def survival(a, b, d, x):
-   t0 = -b / a
-   assert t0 >= 0
-   S = 1.0
-   if x <= t0:
-      return S
-   else:
-      i = math.ceil(t0)
-      while i <= x - 1:
-         S *= math.exp(-a * i + a * t0 - a / 2.0)
-         i += 1
-      i = math.ceil(t0)
-      while i <= x - 1:
-         P = 1.0
-         j = math.ceil(t0)
-         while j <= i - 1:
-            P *= math.exp(-a * j + a * t0 - a / 2.0)
-            j += 1
-         S += (1.0 - math.exp(-a * i + a * t0 - a / 2.0)) * math.exp((i-x)*d) * P
-         i += 1
-   return S
-
 if not(args.max_a is None):
    if args.max_a > args.min_a:
       a_values = list(numpy.linspace(args.min_a, args.max_a, num=args.num_values))
@@ -70,15 +42,11 @@ else:
 Survival = {}
 Fitness  = {}
 
+# All survival curves are computed at once, in linear time. See lifetable.py.
+S, W = lifetable.two_phases_table(numpy.array(a_values), numpy.array(b_values), args.death_rate, args.oldest)
 for i in range(args.num_values):
-   Fitness[(a_values[i], b_values[i])] = 0
-   for x in range(1, args.oldest + 1):
-      try:
-         Survival[(a_values[i],b_values[i])][x] = survival(a_values[i], b_values[i], args.death_rate, x)
-      except KeyError:
-         Survival[(a_values[i],b_values[i])] = {}
-         Survival[(a_values[i],b_values[i])][x] = survival(a_values[i], b_values[i], args.death_rate, x)
-      Fitness[(a_values[i], b_values[i])] += Survival[(a_values[i],b_values[i])][x] * fecundity(x)
+   Survival[(a_values[i], b_values[i])] = {x: S[i, x - 1] for x in range(1, args.oldest + 1)}
+   Fitness[(a_values[i], b_values[i])] = W[i]
 
 header1 = "#a  "
 header2 = "#b  "
@@ -4,51 +4,36 @@
 
 import simuOpt
 # I need to set module's options before loading the simuPOP module. And I need to load the
-# simuPOP module before defining the SexSpecificRecombinator class, which requires simuPOP.
+# simuPOP module before importing the operators from src/, which require simuPOP.
 # Thus, I cannot set the module's options from arguments passed in the command line to the
-# main function, unfortunately.
-simuOpt.setOptions(numThreads = 20, optimized = False, debug = 'DBG_ALL', alleleType = 'short', quiet = True)
+# main function, unfortunately. Loci are biallelic, and the 'binary' allele type stores
+# every allele in one bit, instead of the 16 bits of the 'short' type.
+simuOpt.setOptions(numThreads = 20, optimized = False, debug = 'DBG_ALL', alleleType = 'binary', quiet = True)
 # These are the available debugging codes:
 #    'DBG_ALL', 'DBG_GENERAL', 'DBG_UTILITY', 'DBG_POPULATION', 'DBG_OPERATOR', 'DBG_SIMULATOR',
 #    'DBG_INDIVIDUAL', 'DBG_MUTATOR', 'DBG_TRANSMITTER', 'DBG_INITIALIZER', 'DBG_STATOR', 'DBG_TAGGER',
 #    'DBG_SELECTOR', 'DBG_MATING', 'DBG_MIGRATOR', 'DBG_PROFILE', 'DBG_BATCHTESTING',
 #    'DBG_INTEROPERABILITY', 'DBG_COMPATIBILITY', 'DBG_DEVEL', 'DBG_WARNING'
 import simuPOP as sim
+import sys
+import os
 import random
 import math
 import argparse
 import numpy
+# Operators shared by the scripts are kept in the src/ folder at the top of the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from operators import Mortality, Smurfing, VectorInfoExec, SexSpecificTransmitter, TableSelector, fitness_table, ArrayQuanTrait, Equilibrium, PopStats
+from replicates import run_replicates
+from checkpoint import Checkpoint, Reseeder
+from trajectory import TrajectorySink, text_lines
+from profiler import Profiler
 
 
 ###############################################################
 #                    FUNCTIONS AND CLASSES                    #
 ###############################################################
 
-def natural_death(aging_model):
-   '''Returns a death function according to the aging model.'''
-   def two_phases(smurf, pop):
-      k = pop.dvars().k
-      if smurf == 1 and random.random() < 1.0 - math.exp(-k):
-         return True
-      else:
-         return False
-   def weibull(age, a, b):
-      if random.random() < 1.0 - math.exp(-(a/b) * (age + 1) ** b + (a/b) * age ** b):
-         return True
-      else:
-         return False
-   def gompertz(age, a, b):
-      if random.random() < 1.0 - math.exp( (a * math.exp(b * age) / b) * (1.0 - math.exp(b)) ):
-         return True
-      else:
-         return False
-   if aging_model == 'two_phases':
-      return two_phases
-   if aging_model == 'weibull':
-      return weibull
-   if aging_model == 'gompertz':
-      return gompertz
-
 def fitness_func1(age):
    '''Age-specific probability of being chosen as a parent.'''
    # Age-specific reproductive value is taken from Lin et al. 2014 (Florida Entomologist 94(4):1434-43, Figure 4B).
@@ -65,62 +50,74 @@ def fitness_func1(age):
    else:
       return 0
 
-class sexSpecificRecombinator(sim.PyOperator):
-    def __init__(self, intensity=0, rates=0, loci=sim.ALL_AVAIL, convMode=sim.NO_CONVERSION,
-            maleIntensity=0, maleRates=0, maleLoci=sim.ALL_AVAIL, maleConvMode=sim.NO_CONVERSION,
-            *args, **kwargs):
-        # This operator is used to recombine maternal chromosomes
-        self.Recombinator = sim.Recombinator(rates, intensity, loci, convMode)
-        # This operator is used to recombine paternal chromosomes
-        self.maleRecombinator = sim.Recombinator(maleRates, maleIntensity,
-            maleLoci, maleConvMode)
-        sim.PyOperator.__init__(self, func=self.transmitGenotype, *args, **kwargs)
-    def transmitGenotype(self, pop, off, dad, mom):
-        # Form the first homologous copy of offspring.
-        self.Recombinator.transmitGenotype(mom, off, 0)
-        # Form the second homologous copy of offspring.
-        self.maleRecombinator.transmitGenotype(dad, off, 1)
-        return True
-
 def demo(pop):
    if pop.subPopSize([0,1]) == 0:
       return pop.popSize()
    else:
       return pop.dvars().N
 
-def TweakAdditiveRecessive(aging_a1, aging_a2, aging_b, X_loci):
-   def AdditiveRecessive(geno, ind):
-      '''Assigns a and b values of the aging model to newborns, according to genotype.'''
-      # males have a shorter 'geno' tuple, because there is only one
-      # allele in each locus of the X chromosome. Assuming that X loci
-      # are listed before the autosomal ones.
-      a = aging_a1
-      gene_effect = (aging_a2 - aging_a1) / ind.totNumLoci()
-      if ind.sex() == 1:
-         for X_locus in range(X_loci):
-            if geno[X_locus] == 1:
-               a += gene_effect
-         for A_locus in range(ind.totNumLoci() - X_loci):
-            if geno[X_loci + A_locus * 2] + geno[X_loci + A_locus * 2 + 1] == 2:
-               a += gene_effect
-      elif ind.sex() == 2:
-         for locus in range(ind.totNumLoci()):
-            if geno[locus * 2] + geno[locus * 2 + 1] == 2:
-               a += gene_effect
-      b = aging_b
-      return (a, b)
-   return AdditiveRecessive
+def instrument(profiler, stage, ops):
+   '''Adds the timing markers of the profiler to a list of operators, if profiling.'''
+   return getattr(profiler, stage)(ops) if profiler else ops
+
+def MutationSelection(N=1000, generations=10000, X_loci=100, A_loci=0, AgingModel='two_phases', seed=2001, reps=1, InitMutFreq=0.001, aging_a1=0.003, aging_a2=0.05, aging_b=-0.019, aging_k=0.1911, MutRate=0.001, StatsStep=100, OutPopPrefix='z1', PrintFreqs=False, debug=False, workers=None, CheckpointStep=0, resume=False, tolerance=0, window=10, profile=False, trace=False):
+   '''Creates and evolves populations to reach mutation-selection balance.
 
-def MutationSelection(N=1000, generations=10000, X_loci=100, A_loci=0, AgingModel='two_phases', seed=2001, reps=1, InitMutFreq=0.001, aging_a1=0.003, aging_a2=0.05, aging_b=-0.019, aging_k=0.1911, MutRate=0.001, StatsStep=100, OutPopPrefix='z1', PrintFreqs=False, debug=False):
-   '''Creates and evolves a population to reach mutation-selection balance.'''
+   Replicates are evolved in parallel by up to 'workers' processes, each with
+   its own seeds derived from 'seed' (see replicates.py). Replicate i is saved
+   in '{OutPopPrefix}_{i}.pop', and its mutant allele frequencies every StatsStep
+   generations in '{OutPopPrefix}_{i}.traj' (see trajectory.py). With 'PrintFreqs',
+   they are printed in the end, in order of replicates, so that the output does
+   not depend on the number of workers.
+   If 'CheckpointStep' is positive, every replicate is checkpointed with that
+   periodicity, and with 'resume' it continues from its last checkpoint, if any.
+   If 'tolerance' is positive, replicates stop when the mean mutant frequencies
+   and mean ages are stationary (see operators.Equilibrium), and the generation
+   and equilibrium estimates are reported in the standard error.
+   With 'profile', the time spent by every operator is written to
+   '{OutPopPrefix}_{i}.profile', with all the operators applied during mating
+   counted as mating, and with 'trace', also the time of every
+   generation to '{OutPopPrefix}_{i}.trace' (see profiler.py).'''
    if debug:
       sim.turnOnDebug('DBG_ALL')
    else:
       sim.turnOffDebug('DBG_ALL')
-   sim.setRNG('mt19937', seed)
-   pop = sim.Population(N, loci = [X_loci, A_loci], ploidy = 2,
-      chromTypes = [sim.CHROMOSOME_X, sim.AUTOSOME],
-      infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'luck', 't0', 'fitness'])
+   results = run_replicates(EvolveReplicate, reps, seed, workers, N = N, generations = generations,
+      X_loci = X_loci, A_loci = A_loci, AgingModel = AgingModel, InitMutFreq = InitMutFreq, aging_a1 = aging_a1,
+      aging_a2 = aging_a2, aging_b = aging_b, aging_k = aging_k, MutRate = MutRate, StatsStep = StatsStep,
+      OutPopPrefix = OutPopPrefix, CheckpointStep = CheckpointStep, resume = resume,
+      tolerance = tolerance, window = window, profile = profile, trace = trace)
+   if PrintFreqs:
+      for rep in range(reps):
+         for line in text_lines('{}_{}.traj'.format(OutPopPrefix, rep), rep):
+            sys.stdout.write(line)
+   for rep, equilibrium in enumerate(results):
+      if equilibrium:
+         sys.stderr.write('Replicate {} reached equilibrium at generation {}: {}.\n'.format(rep, equilibrium['gen'],
+            ', '.join('{} = {:.4g} (var. {:.4g})'.format(name, mean, equilibrium['variance'][name]) for name, mean in equilibrium['mean'].items())))
+
+def EvolveReplicate(rep, seeds, N, generations, X_loci, A_loci, AgingModel, InitMutFreq, aging_a1, aging_a2, aging_b, aging_k, MutRate, StatsStep, OutPopPrefix, CheckpointStep=0, resume=False, tolerance=0, window=10, profile=False, trace=False):
+   '''Evolves one replicate population, saves it and returns its equilibrium estimates, if any.'''
+   seed, pySeed = seeds
+   profiler = Profiler('{}_{}.trace'.format(OutPopPrefix, rep) if trace else None) if profile or trace else None
+   # Operators with their own random number generators are checkpointed.
+   smurfing = Smurfing(seed=pySeed)
+   mortality = Mortality(AgingModel, k=aging_k, seed=pySeed)
+   # Mothers recombine, with maps of 0.75 Morgans on the X and 2.07 Morgans on the autosomes. Fathers do not.
+   transmitter = SexSpecificTransmitter(rates = [ 0.75 / X_loci for x in range(X_loci) ] + [2.07 / A_loci for x in range(A_loci) ], maleRates = 0.0, seed = pySeed, newborns = (0, 5))
+   checkpoint = Checkpoint('{}_{}'.format(OutPopPrefix, rep), seed, operators = [smurfing, mortality, transmitter],
+      varNames = ['alleleFreq', 'equilibriumHistory'], step = max(CheckpointStep, 1))
+   pop, nextID = checkpoint.restore() if resume else (None, 0)
+   if pop is None:
+      sim.setRNG('mt19937', seed)
+      pop = sim.Population(N, loci = [X_loci, A_loci], ploidy = 2,
+         chromTypes = [sim.CHROMOSOME_X, sim.AUTOSOME],
+         infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'fitness'])
+      start = 0
+   else:
+      start = pop.dvars().gen
+   trajectory = TrajectorySink('{}_{}.traj'.format(OutPopPrefix, rep), X_loci, A_loci, start = start if start > 0 else None, step = StatsStep)
+   checkpoint.sinks.append(trajectory)
    pop.setVirtualSplitter(
       sim.CombinedSplitter(
          splitters = [
@@ -139,44 +136,37 @@ def MutationSelection(N=1000, generations=10000, X_loci=100, A_loci=0, AgingMode
    )
    pop.dvars().k = aging_k
    pop.dvars().N = N
-   pop.dvars().seed = seed
+   pop.dvars().seed = pySeed
    pop.dvars().X_loci = X_loci
    pop.dvars().A_loci = A_loci
    pop.dvars().AgingModel = AgingModel
-   exec("import random\nrandom.seed(seed)", pop.vars(), pop.vars())
+   # A resumed run keeps the state of the random module saved in the checkpoint.
+   exec("import random" if start > 0 else "import random\nrandom.seed(seed)", pop.vars(), pop.vars())
    exec("import math", pop.vars(), pop.vars())
-   simu = sim.Simulator(pop, rep = reps)
+   simu = sim.Simulator(pop, rep = 1)
    simu.evolve(
-      initOps = [
+      initOps = [] if start > 0 else [
          sim.InitSex(),
          sim.InitGenotype(freq = [1 - InitMutFreq, InitMutFreq]),
          sim.InitInfo([0], infoFields = 'age'),
          sim.InitInfo([aging_a1], infoFields = 'a'),
          sim.InitInfo([aging_b], infoFields = 'b'),
-         sim.InitInfo(lambda: random.random(), infoFields = 'luck'),
-         sim.InfoExec('t0 = -ind.b / ind.a', exposeInd = 'ind'),
-         sim.InfoExec('smurf = 1.0 if AgingModel == "two_phases" and (ind.smurf == 1 or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0', exposeInd = 'ind'),
-         sim.IdTagger(),
-         sim.PyExec('XFreqChange={}'),
-         sim.PyExec('AFreqChange={}')
-      ],
-      preOps = [
-         sim.InfoExec('luck = random.random()'),
-         sim.InfoExec('smurf = 1.0 if AgingModel == "two_phases" and (ind.smurf == 1 or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0', exposeInd = 'ind'),
-         sim.DiscardIf(natural_death(AgingModel)),
-         sim.InfoExec('age += 1'),
-         sim.PySelector(func = fitness_func1)
-      ],
+         sim.IdTagger()
+      ] + ([smurfing] if AgingModel == 'two_phases' else []),
+      preOps = instrument(profiler, 'preOps', ([smurfing] if AgingModel == 'two_phases' else []) + [
+         mortality,
+         VectorInfoExec('age += 1'),
+         TableSelector(fitness_table(fitness_func1, 50))
+      ]),
       matingScheme = sim.HeteroMating(
          [
             sim.CloneMating(subPops = [(0,0), (0,1), (0,2)], weight = -1),
             sim.RandomMating(
                ops = [
-                  sim.IdTagger(),
+                  sim.IdTagger(startID = nextID),
                   sim.PedigreeTagger(),
                   sim.InfoExec('smurf = 0.0'),
-                  sexSpecificRecombinator(rates = [ 0.75 / X_loci for x in range(X_loci) ] + [2.07 / A_loci for x in range(A_loci) ], maleRates = 0.0),
-                  sim.PyQuanTrait(loci = sim.ALL_AVAIL, func = TweakAdditiveRecessive(aging_a1, aging_a2, aging_b, X_loci), infoFields = ['a', 'b'])
+                  sim.MendelianGenoTransmitter()
                ],
                weight = 1,
                subPops = [(0,1)],
@@ -185,33 +175,24 @@ def MutationSelection(N=1000, generations=10000, X_loci=100, A_loci=0, AgingMode
          ],
          subPopSize = demo
       ),
-      postOps = [
+      postOps = instrument(profiler, 'postOps', [
+         transmitter,
+         ArrayQuanTrait(aging_a1, (aging_a2 - aging_a1) / max(1, X_loci + A_loci), aging_b, mode='recessive'),
          sim.SNPMutator(u=MutRate, subPops=[(0,5)]),
-         sim.Stat(alleleFreq=sim.ALL_AVAIL, step=StatsStep),
-         sim.IfElse('X_loci > 0',
-            ifOps = [sim.PyExec('XFreqChange[gen] = [alleleFreq[x][1] for x in range(X_loci)]')],
-            elseOps = [sim.PyExec('XFreqChange[gen] = []')],
-            step = StatsStep
-         ),
-         sim.IfElse('A_loci > 0',
-            ifOps = [sim.PyExec('AFreqChange[gen] = [alleleFreq[a][1] for a in range(X_loci, pop.totNumLoci())]', exposePop='pop')],
-            elseOps = [sim.PyExec('AFreqChange[gen] = []')],
-            step = StatsStep
-         ),
-         sim.IfElse(PrintFreqs,
-            ifOps=[
-               sim.PyEval(r"str(rep) + '\t' + str(gen) + '\t' + '\t'.join(map('{0:.4f}'.format, XFreqChange[gen])) + '\t\t' + '\t'.join(map('{0:.4f}'.format, AFreqChange[gen])) + '\n'")
-            ],
-            step = StatsStep
-         ),
+         PopStats(step=StatsStep),
+         trajectory,
          sim.TerminateIf('sum([alleleFreq[x][0] * alleleFreq[x][1] for x in range(X_loci + A_loci)]) == 0')
-      ],
-      gen = generations
+      ] + ([Equilibrium(range(X_loci), range(X_loci, X_loci + A_loci), window, tolerance, step=StatsStep)] if tolerance > 0 else []
+      ) + [Reseeder(seed)] + ([checkpoint] if CheckpointStep > 0 else [])),
+      gen = generations - start
    )
-   i = 0
-   for pop in simu.populations():
-      pop.save('{}_{}.pop'.format(OutPopPrefix, i))
-      i += 1
+   trajectory.close()
+   if profiler:
+      with open('{}_{}.profile'.format(OutPopPrefix, rep), 'w') as fh:
+         profiler.summary(fh)
+   pop = simu.extract(0)
+   pop.save('{}_{}.pop'.format(OutPopPrefix, rep))
+   return pop.vars().get('equilibrium')
 
 def main():
    parser = argparse.ArgumentParser(description = 'Simulates a population with a specific aging model, where mutations in X-linked and/or autosomal loci affect parameter a of the model. The population is evolved to reach mutation-selection balance.')
@@ -230,7 +211,14 @@ def main():
    parser.add_argument('-q', '--InitMutFreq', default=0.001, type=float, help='Initial mutant frequency. Default: 0.001.')
    parser.add_argument('-m', '--AgingModel', default='two_phases', type=str, choices=['two_phases', 'weibull', 'gompertz'], help='Aging model. Choices: "two_phases", "weibull", "gompertz". Default: "two_phases".')
    parser.add_argument('-r', '--reps',       default=1,      type=int,   help='Number of population replicates to simulate. Default: 1.')
-   parser.add_argument('-P', '--PrintFreqs', action='store_true',        help='Print mutant allele frequencies every StatsStep generations. Default: False.')
+   parser.add_argument('-w', '--workers',    default=None,   type=int,   help='Number of replicates to simulate at the same time, in different processes. Default: number of cores.')
+   parser.add_argument('-C', '--CheckpointStep', default=0, type=int,  help='Periodicity of checkpoints, in generations. Only the last two are kept. Default: 0 (no checkpoints).')
+   parser.add_argument('-R', '--resume',     action='store_true',        help='Continue every replicate from its last checkpoint, if any. Default: False.')
+   parser.add_argument('-T', '--tolerance',  default=0,      type=float, help='Stop when the mean mutant frequencies and the mean ages by sex change less than this proportion between two windows of StatsStep records. Default: 0 (run all generations).')
+   parser.add_argument('-W', '--window',     default=10,     type=int,   help='Number of records of statistics compared to detect the equilibrium. Default: 10.')
+   parser.add_argument('-P', '--PrintFreqs', action='store_true',        help='Print mutant allele frequencies every StatsStep generations, from the trajectory files, after evolving. Default: False.')
+   parser.add_argument('-p', '--profile',    action='store_true',        help='Write the time spent by every pre and post-mating operator to {OutPopPrefix}_{rep}.profile. The mating scheme and the operators applied during mating (IdTagger, transmitters...) share one "mating" row. Default: False.')
+   parser.add_argument('-t', '--trace',      action='store_true',        help='Write the time spent by every pre and post-mating operator, and by mating as a whole, in every generation to {OutPopPrefix}_{rep}.trace. Default: False.')
    parser.add_argument('-D', '--debug',      action='store_true',        help='Turn on debugging. Default: False.')
    args = parser.parse_args()
    MutationSelection(N = args.PopSize,
@@ -249,7 +237,14 @@ def main():
                      StatsStep = args.StatsStep,
                      OutPopPrefix = args.OutPopPrefix,
                      PrintFreqs = args.PrintFreqs,
-                     debug = args.debug)
+                     debug = args.debug,
+                     workers = args.workers,
+                     CheckpointStep = args.CheckpointStep,
+                     resume = args.resume,
+                     tolerance = args.tolerance,
+                     window = args.window,
+                     profile = args.profile,
+                     trace = args.trace)
 
 if __name__ == '__main__':
    main()
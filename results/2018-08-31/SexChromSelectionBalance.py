@@ -3,9 +3,16 @@
 ###############################################################
 
 import simuPOP as sim
+import sys
+import os
 import random
 import math
 import argparse
+# Operators shared by the scripts are kept in the src/ folder at the top of the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from operators import Mortality, Smurfing, VectorInfoExec, TableSelector, fitness_table, ArrayQuanTrait, ReproductiveSuccess, Equilibrium, PopStats
+from classcount import ClassCounts
+from leslie import aging_parameters
 
 ###############################################################
 #                 ARGUMENTS AND  VARIABLES                    #
@@ -22,19 +29,21 @@ parser.add_argument('-s', '--feffect', type=float, default=0.061168, help='Femal
 parser.add_argument('-d', '--dominance', type=float, default=0.5, help='Coefficient of dominance of deleterious allele in females. Default: 0.5')
 parser.add_argument('-o', '--output', default='z1.txt', type=argparse.FileType('w'), help='Ouput file name. Default: z1.txt.')
 parser.add_argument('-r', '--seed', default=115, type=int, help='Random number generator seed. Default: 115.')
+parser.add_argument('-T', '--tolerance', default=0, type=float, help='Stop when the mutant frequency and the mean ages by sex change less than this proportion between two windows of records, taken every 100 generations. Default: 0 (run all generations).')
+parser.add_argument('-W', '--window', default=10, type=int, help='Number of records compared to detect the equilibrium. Default: 10.')
+parser.add_argument('-f', '--fitness', default=None, type=argparse.FileType('w'), help='Output file for the realized lifetime reproductive success by sex and genotype. Default: not written.')
+parser.add_argument('-E', '--engine', default='simupop', choices=['simupop', 'counts'], help='Simulate individuals with simuPOP, or only the numbers of individuals of every sex, genotype, age and smurf state (see classcount.py), which is fast for any population size. Default: simupop.')
 args = parser.parse_args()
 min_a = args.m
+# Initial frequencies of alleles 0 and 1, in both engines.
+initial_freq = [0.5, 0.5]
+if args.engine == 'counts' and (args.fitness or args.tolerance > 0):
+   parser.error('options --fitness and --tolerance require the simupop engine.')
 
 ###############################################################
 #                    FUNCTIONS AND CLASSES                    #
 ###############################################################
 
-def natural_death(smurf):
-   if smurf == 1.0 and random.random() < 1.0 - math.exp(-args.k):
-      return True
-   else:
-      return False
-
 def demo(gen, pop):
    # This prevents running out of reproducers in a cohort of larvae where one
    # or more died.
@@ -64,22 +73,11 @@ def fitness_func(geno, ind, pop, age):
       value *= 1.0
    return value
 
-def MaleEffect(geno, ind):
-   if ind.sex() == 2:
-      a = min_a
-   else:
-      # allele "1" makes male aging rate increase.
-      a = min_a + args.meffect * geno[0]
-   b = args.b
-   t0 = -b / a
-   return (a, b, t0)
+# Allele frequencies and mean age and 'a' parameter by sex, in one pass.
+Stats = PopStats(meanOfInfo = [('age', 1, '_males'), ('age', 2, '_females'), ('a', 1, '_amales'), ('a', 2, '_afemales')])
 
 def OutputStats(pop):
-   sim.stat(pop, alleleFreq=sim.ALL_AVAIL)
-   sim.stat(pop, meanOfInfo='age', subPops=[(0,3)], suffix='_males')
-   sim.stat(pop, meanOfInfo='age', subPops=[(0,4)], suffix='_females')
-   sim.stat(pop, meanOfInfo='a', subPops=[(0,3)], suffix='_amales')
-   sim.stat(pop, meanOfInfo='a', subPops=[(0,4)], suffix='_afemales')
+   Stats.apply(pop)
    outstring = str(pop.dvars().gen)
    for locus in range(pop.totNumLoci()):
       outstring += "\t%.3f" % pop.dvars().alleleFreq[locus][1]
@@ -94,9 +92,21 @@ def OutputStats(pop):
 #                         POPULATION                          #
 ###############################################################
 
+if args.engine == 'counts':
+   # The same life cycle, applied to the numbers of individuals of every class. See classcount.py.
+   counts = ClassCounts(aging_parameters(min_a, args.meffect, 'X', 'codominant', sexes=(1,)), args.b,
+                        fitness_table(fitness_func, 50), k = args.k, chromosome = 'X', N = args.N,
+                        p0 = initial_freq[1], seed = args.seed)
+   for gen in range(args.G):
+      counts.step()
+      if gen % 100 == 0:
+         age, a = counts.mean_age(), counts.mean_a()
+         args.output.write("%d\t%.3f\t%3d\t%3d\t%4f\t%4f\n" % (gen, counts.frequency(), age[0], age[1], a[0], a[1]))
+   sys.exit(0)
+
 pop = sim.Population(args.N, loci = [1], ploidy = 2,
    chromTypes = [sim.CHROMOSOME_X],
-   infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'luck', 'fitness', 't0'])
+   infoFields = ['age', 'a', 'b', 'smurf', 'ind_id',  'father_id', 'mother_id', 'fitness'])
 pop.dvars().seed = args.seed
 pop.dvars().min_a = min_a
 pop.dvars().meffect = args.meffect
@@ -135,25 +145,30 @@ exec("import math", pop.vars(), pop.vars())
 
 simu = sim.Simulator(pop, rep=1)
 
+# Offspring of every individual are counted as they are born, to know the
+# fitness that genotypes actually experience, without writing the pedigree.
+# It is only needed for the --fitness output.
+lrs = ReproductiveSuccess(loci = [0], ages = 50) if args.fitness else None
+
+# The same operator gives newborn founders their chance to become smurfs at age 0.
+smurfing = Smurfing(seed=args.seed)
+
 simu.evolve(
    initOps = [
       sim.InitSex(),
-      sim.InitGenotype(freq = [0.5, 0.5]),
+      sim.InitGenotype(freq = initial_freq),
       sim.InitInfo([0], infoFields = 'age'),
       sim.InitInfo([1], infoFields = 'fitness'),
       sim.InfoExec("a = min_a + meffect if ind.sex() == 1 and ind.allele(0,0) == 1 else min_a", exposeInd = 'ind'),
       sim.InitInfo([ args.b ], infoFields = 'b'),
-      sim.InitInfo(lambda: random.random(), infoFields = 'luck'),
-      sim.InfoExec("t0 = -ind.b / ind.a", exposeInd = 'ind'),
-      sim.InfoExec("smurf = 1.0 if (ind.smurf == 1 or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd = 'ind'),
+      smurfing,
       sim.IdTagger()
    ],
    preOps = [
-      sim.InfoExec("luck = random.random()"),
-      sim.InfoExec("smurf = 1.0 if (ind.smurf == 1 or (ind.age > ind.t0 and ind.luck < 1.0 - math.exp(-ind.a * ind.age + ind.a * ind.t0 - ind.a / 2.0))) else 0.0", exposeInd='ind'),
-      sim.DiscardIf(natural_death),
-      sim.InfoExec("age += 1"),
-      sim.PySelector(loci=[0], func=fitness_func)
+      smurfing,
+      Mortality('two_phases', k=args.k, seed=args.seed),
+      VectorInfoExec("age += 1"),
+      TableSelector(fitness_table(fitness_func, 50), loci=[0])
    ],
    matingScheme = sim.HeteroMating(
       [
@@ -163,8 +178,7 @@ simu.evolve(
                sim.IdTagger(),
                sim.PedigreeTagger(),
                sim.InfoExec("smurf = 0.0"),
-               sim.MendelianGenoTransmitter(),
-               sim.PyQuanTrait(loci = sim.ALL_AVAIL, func = MaleEffect, infoFields = ['a', 'b', 't0']) 
+               sim.MendelianGenoTransmitter()
             ],
             weight = 1,
             subPops = [(0,1)],
@@ -174,10 +188,26 @@ simu.evolve(
       subPopSize = demo
    ),
    postOps = [
+      ArrayQuanTrait(min_a, args.meffect, args.b, mode='codominant', sexes=[1]),
       sim.PyOperator(func=OutputStats, step=100)
-   ],
+   ] + ([lrs] if args.fitness else []) + ([Equilibrium(xLoci = [0], window = args.window, tolerance = args.tolerance, step = 100)] if args.tolerance > 0 else []),
    gen=args.G
 )
 
+equilibrium = simu.vars(0).get('equilibrium')
+if equilibrium:
+   args.output.write('# Equilibrium at generation {}:'.format(equilibrium['gen']) + ''.join(
+      '\t{} = {:.4f} ({:.4g})'.format(name, mean, equilibrium['variance'][name]) for name, mean in equilibrium['mean'].items()) + '\n')
+
+if args.fitness:
+   offspring, individuals = lrs.tables(0)
+   args.fitness.write('Sex\tGenotype\tIndividuals\tOffspring\tMeanOffspring\n')
+   for sex in (1, 2):
+      for genotype in range(2 if sex == 1 else 3):
+         total = int(offspring[sex - 1, genotype].sum())
+         number = int(individuals[sex - 1, genotype])
+         args.fitness.write('{}\t{}\t{}\t{}\t{:.4f}\n'.format(sex, genotype, number, total, total / number if number > 0 else float('nan')))
+   args.fitness.close()
+
 pop = simu.extract(0)
 sim.dump(pop, max=200)
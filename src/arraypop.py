@@ -0,0 +1,146 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import numpy
+import hazards
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# In age_structure.py and SurvivalCurves.py, most of the daily work is done
+# on every individual by InfoExec statements and python callbacks: a chance to
+# become a smurf, a chance to die, one day older, and then HeteroMating clones
+# everyone alive and fills the population up to its size with the offspring of
+# random pairs of non-smurf adults. Here, the population is a set of contiguous
+# arrays, one per information field, plus the sex and the genotypes, and the
+# same daily cycle is applied to whole arrays, with a numpy random generator.
+# The probabilities are the same as in the scripts, but the random numbers are
+# not: results agree in distribution, not individual by individual.
+#
+# Genotypes have shape (individuals, 2, loci). All loci are on one autosome,
+# transmitted without recombination, like MendelianGenoTransmitter() does with
+# the single locus of age_structure.py.
+
+MALE = 1
+FEMALE = 2
+
+class ArrayPopulation:
+   '''Population of the two-phases (or Gompertz, or Weibull) model, kept as arrays.
+
+   It starts with N newborns of random sex, with parameters 'a' and 'b', and
+   with independent alleles drawn with frequencies 'freq' at every one of
+   'loci' loci. Non-smurfs of age 'adult' or older reproduce, in families of
+   a uniform number of offspring between the two values of 'offspring', like
+   numOffspring=(sim.UNIFORM_DISTRIBUTION, 10, 50). Newborns get the same
+   'a' and 'b' as the founders.'''
+   def __init__(self, N, a, b, k=0.1911, model='two_phases', loci=0, freq=(0.9, 0.1), adult=10,
+                offspring=(10, 50), seed=None):
+      if model not in hazards.MODELS:
+         raise ValueError('Unknown aging model: "{}". Choices: {}.'.format(model, ', '.join(hazards.MODELS)))
+      self.model = model
+      self.k = k
+      self.a0 = a
+      self.b0 = b
+      self.adult = adult
+      self.offspring = offspring
+      self.rng = numpy.random.default_rng(seed)
+      self.gen = 0
+      self.sex = self.rng.integers(MALE, FEMALE + 1, size=N).astype(numpy.int8)
+      self.age = numpy.zeros(N, dtype=numpy.int32)
+      self.smurf = numpy.zeros(N, dtype=numpy.int8)
+      self.a = numpy.full(N, a, dtype=float)
+      self.b = numpy.full(N, b, dtype=float)
+      self.t0 = -self.b / self.a
+      self.genotype = (self.rng.random((N, 2, loci)) < freq[1]).astype(numpy.uint8)
+   def popSize(self):
+      return self.age.size
+   def fields(self):
+      return ('sex', 'age', 'smurf', 'a', 'b', 't0', 'genotype')
+   def keep(self, index):
+      '''Keeps only the individuals selected by 'index', a boolean mask or an array of indexes.'''
+      for name in self.fields():
+         setattr(self, name, getattr(self, name)[index])
+   def smurfs(self):
+      '''Non-smurfs older than t0 become smurfs with the daily probability of the two-phases model.'''
+      if self.model != 'two_phases':
+         return
+      candidates = numpy.flatnonzero((self.smurf == 0) & (self.age > self.t0))
+      p = hazards.daily_probabilities('two_phases', self.age[candidates], self.a[candidates], self.b[candidates])[0]
+      self.smurf[candidates[self.rng.random(candidates.size) < p]] = 1
+   def mortality(self):
+      if self.model == 'two_phases':
+         # Only smurfs can die.
+         smurfs = numpy.flatnonzero(self.smurf == 1)
+         p = hazards.death_probability('two_phases', k=self.k, smurf=self.smurf[smurfs])
+         dead = smurfs[self.rng.random(smurfs.size) < p]
+      else:
+         p = hazards.daily_probabilities(self.model, self.age, self.a, self.b)[1]
+         dead = numpy.flatnonzero(self.rng.random(p.size) < p)
+      if dead.size > 0:
+         alive = numpy.ones(self.popSize(), dtype=bool)
+         alive[dead] = False
+         self.keep(alive)
+   def mate(self, size):
+      '''Adds the offspring of random pairs of non-smurf adults, up to 'size' individuals.
+
+      Like RandomMating, every family has one father and one mother, drawn
+      with replacement, and the last family is cut short to fill the population
+      exactly. If there are no adults of both sexes, no one is born.'''
+      births = size - self.popSize()
+      if births <= 0:
+         return
+      adults = (self.age >= self.adult) & (self.smurf == 0)
+      males = numpy.flatnonzero(adults & (self.sex == MALE))
+      females = numpy.flatnonzero(adults & (self.sex == FEMALE))
+      if males.size == 0 or females.size == 0:
+         return
+      low, high = self.offspring
+      families = self.rng.integers(low, high + 1, size=births // max(low, 1) + 1)
+      families = families[:numpy.searchsorted(numpy.cumsum(families), births) + 1]
+      families[-1] -= families.sum() - births
+      fathers = numpy.repeat(males[self.rng.integers(males.size, size=families.size)], families)
+      mothers = numpy.repeat(females[self.rng.integers(females.size, size=families.size)], families)
+      genotype = numpy.empty((births,) + self.genotype.shape[1:], dtype=numpy.uint8)
+      # Like simuPOP, the first copy comes from the mother and the second one from the father.
+      genotype[:, 0] = self.genotype[mothers, self.rng.integers(2, size=births)]
+      genotype[:, 1] = self.genotype[fathers, self.rng.integers(2, size=births)]
+      a = numpy.full(births, self.a0, dtype=float)
+      b = numpy.full(births, self.b0, dtype=float)
+      newborns = {
+         'sex': self.rng.integers(MALE, FEMALE + 1, size=births).astype(numpy.int8),
+         'age': numpy.zeros(births, dtype=numpy.int32),
+         'smurf': numpy.zeros(births, dtype=numpy.int8),
+         'a': a,
+         'b': b,
+         't0': -b / a,
+         'genotype': genotype
+      }
+      for name in self.fields():
+         setattr(self, name, numpy.concatenate([getattr(self, name), newborns[name]]))
+   def day(self, subPopSize=None):
+      '''One day: smurfs, deaths, aging and mating, in the order of the preOps of the scripts.
+
+      'subPopSize' is the size of the population after mating, or a function
+      of the generation and the population that returns it, like demo() in the
+      scripts. By default, the population is only cloned.'''
+      self.smurfs()
+      self.mortality()
+      self.age += 1
+      if callable(subPopSize):
+         subPopSize = subPopSize(self.gen, self)
+      if subPopSize is not None:
+         self.mate(subPopSize)
+      self.gen += 1
+   def counts(self):
+      '''Numbers of larvae (non-smurfs younger than 'adult'), adults (non-smurfs) and smurfs.'''
+      young = self.age < self.adult
+      smurfs = int(numpy.count_nonzero(self.smurf))
+      larvae = int(numpy.count_nonzero(young & (self.smurf == 0)))
+      return larvae, self.popSize() - larvae - smurfs, smurfs
+   def structure(self):
+      '''Numbers of individuals by sex (males, females), smurf state and age, with shape (2, 2, maxAge + 1).'''
+      maxAge = int(self.age.max()) if self.popSize() > 0 else 0
+      index = ((self.sex.astype(numpy.int64) - MALE) * 2 + self.smurf) * (maxAge + 1) + self.age
+      return numpy.bincount(index, minlength=4 * (maxAge + 1)).reshape(2, 2, maxAge + 1)
@@ -0,0 +1,141 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import argparse
+import json
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# Every scenario runs one of the scripts of the results folders with the
+# parameters of a real workload, and with a fixed seed when the script accepts
+# one. It runs in a temporary folder, in its own process, so that the peak
+# resident memory (maximum RSS) is that of the script alone. Speed is reported
+# as wall time, generations (days) per second and individual-days per second,
+# which is N·G divided by the wall time. For two_phases.py, which computes a
+# grid of survival curves, N is the number of parameter values and G the
+# oldest age.
+#
+# In 'quick' mode, scenarios are scaled down to check that nothing is broken
+# and get rough numbers. In 'scaling' mode, every scenario is run with the
+# population size multiplied by each of the factors given. Results of the
+# same scenario and size are compared with a baseline file, if any.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = [
+   {'name': 'SurvivalCurves', 'script': 'results/2018-07-20/SurvivalCurves.py', 'N': 5000, 'G': 200,
+    'args': '-N {N} -G {G} -s 1 -w 1 -o survival.txt'},
+   {'name': 'age_structure', 'script': 'results/2018-05-22/age_structure.py', 'N': 5000, 'G': 200,
+    'args': '-N {N} -G {G} -s 1 -o ages.txt'},
+   {'name': 'FitnessCenter', 'script': 'results/2018-06-21/FitnessCenter.py', 'N': 50000, 'G': 500,
+    'args': '-N {N} -G {G} -r 1 -o fitness'},
+   {'name': 'MutationSelection_X100', 'script': 'results/2018-08-08/MutationSelection.py', 'N': 1000, 'G': 2000,
+    'args': '-N {N} -G {G} -X 100 -A 0 -s 2001 -r 1 -w 1 -o mutsel'},
+   {'name': 'MutationSelection_X200_A200', 'script': 'results/2018-08-08/MutationSelection.py', 'N': 1000, 'G': 2000,
+    'args': '-N {N} -G {G} -X 200 -A 200 -s 2001 -r 1 -w 1 -o mutsel'},
+   {'name': 'two_phases_grid', 'script': 'results/2018-07-20/two_phases.py', 'N': 200, 'G': 100,
+    'args': '-a 0.001 -A 0.01 -n {N} -x {G} -o grid.txt'}
+]
+
+QUICK = {'N': 0.1, 'G': 0.1}
+METRICS = ('wall', 'maxRSS')
+
+def scaled(scenario, size=1.0, days=1.0):
+   '''Copy of a scenario with population size and days multiplied by 'size' and 'days'.'''
+   scenario = dict(scenario)
+   scenario['N'] = max(2, int(round(scenario['N'] * size)))
+   scenario['G'] = max(20, int(round(scenario['G'] * days)))
+   scenario['key'] = '{}:N={}:G={}'.format(scenario['name'], scenario['N'], scenario['G'])
+   return scenario
+
+def max_rss(usage):
+   '''Peak resident memory of a child process, in MB.'''
+   # It is given in kilobytes in Linux, and in bytes in macOS.
+   return usage.ru_maxrss / (1024.0 ** 2 if sys.platform == 'darwin' else 1024.0)
+
+def run_scenario(scenario, repeats=1):
+   '''Runs a scenario and returns its metrics: the fastest of 'repeats' runs, and the largest peak memory.'''
+   command = [sys.executable, os.path.join(ROOT, scenario['script'])] + shlex.split(scenario['args'].format(**scenario))
+   wall, rss = float('inf'), 0.0
+   for i in range(repeats):
+      with tempfile.TemporaryDirectory() as folder:
+         with open(os.path.join(folder, 'log'), 'w+') as log:
+            start = time.perf_counter()
+            process = subprocess.Popen(command, cwd=folder, stdout=log, stderr=subprocess.STDOUT)
+            pid, status, usage = os.wait4(process.pid, 0)
+            elapsed = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode != 0:
+               log.seek(0)
+               raise RuntimeError('Scenario {} failed:\n{}'.format(scenario['key'], log.read()[-2000:]))
+      wall = min(wall, elapsed)
+      rss = max(rss, max_rss(usage))
+   return {'N': scenario['N'], 'G': scenario['G'], 'wall': wall, 'maxRSS': rss,
+           'generationsPerSecond': scenario['G'] / wall, 'individualDaysPerSecond': scenario['N'] * scenario['G'] / wall}
+
+def regressions(result, baseline, tolerance):
+   '''Metrics that are worse than in the baseline by more than the 'tolerance' proportion.'''
+   return [metric for metric in METRICS if metric in baseline and result[metric] > baseline[metric] * (1.0 + tolerance)]
+
+def main():
+   parser = argparse.ArgumentParser(description = 'Runs the benchmark scenarios (scripts of the results folders with fixed parameters and seeds), reports wall time, peak memory, generations and individual-days per second, and flags regressions with respect to a baseline.')
+   parser.add_argument('-m', '--mode', default='full', choices=['full', 'quick', 'scaling'], help='Scenarios at the sizes of the real workloads (full), scaled down (quick), or at several population sizes (scaling). Default: full.')
+   parser.add_argument('-s', '--scenarios', nargs='+', default=None, choices=[scenario['name'] for scenario in SCENARIOS], help='Scenarios to run. Default: all.')
+   parser.add_argument('-f', '--factors', nargs='+', default=[0.5, 1.0, 2.0, 4.0], type=float, help='Factors of population size in scaling mode. Default: 0.5 1 2 4.')
+   parser.add_argument('-r', '--repeats', default=1, type=int, help='Runs of every scenario; the fastest one is reported. Default: 1.')
+   parser.add_argument('-b', '--baseline', default=None, type=str, help='JSON file of baseline results to compare with. Default: none.')
+   parser.add_argument('-t', '--tolerance', default=0.2, type=float, help='Proportion by which wall time or peak memory may exceed the baseline before being flagged. Default: 0.2.')
+   parser.add_argument('-u', '--update', action='store_true', help='Save the results in the baseline file, replacing those of the same scenarios and sizes. Default: False.')
+   parser.add_argument('-o', '--output', default=None, type=str, help='JSON file to write the results of this run to. Default: none.')
+   args = parser.parse_args()
+   selected = [scenario for scenario in SCENARIOS if args.scenarios is None or scenario['name'] in args.scenarios]
+   if args.mode == 'quick':
+      runs = [scaled(scenario, QUICK['N'], QUICK['G']) for scenario in selected]
+   elif args.mode == 'scaling':
+      runs = [scaled(scenario, factor) for scenario in selected for factor in args.factors]
+   else:
+      runs = [scaled(scenario) for scenario in selected]
+   baseline = {'results': {}}
+   if args.baseline and os.path.exists(args.baseline):
+      with open(args.baseline) as fh:
+         baseline = json.load(fh)
+   results = {}
+   flagged = 0
+   sys.stdout.write('#Scenario\tN\tG\tWall(s)\tMaxRSS(MB)\tGen/s\tInd-days/s\tBaseline(s)\tFlags\n')
+   for scenario in runs:
+      result = run_scenario(scenario, args.repeats)
+      results[scenario['key']] = result
+      previous = baseline['results'].get(scenario['key'], {})
+      worse = regressions(result, previous, args.tolerance)
+      flagged += len(worse) > 0
+      sys.stdout.write('{}\t{}\t{}\t{:.2f}\t{:.1f}\t{:.1f}\t{:.4g}\t{}\t{}\n'.format(scenario['name'], scenario['N'],
+         scenario['G'], result['wall'], result['maxRSS'], result['generationsPerSecond'], result['individualDaysPerSecond'],
+         '{:.2f}'.format(previous['wall']) if 'wall' in previous else '-', ','.join('REGRESSION:' + m for m in worse) or '-'))
+      sys.stdout.flush()
+   machine = {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.machine(),
+              'cpus': os.cpu_count(), 'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+   if args.output:
+      with open(args.output, 'w') as fh:
+         json.dump({'machine': machine, 'results': results}, fh, indent=1)
+   if args.update and args.baseline:
+      baseline['machine'] = machine
+      baseline['results'].update(results)
+      with open(args.baseline + '.tmp', 'w') as fh:
+         json.dump(baseline, fh, indent=1)
+      os.replace(args.baseline + '.tmp', args.baseline)
+   if flagged:
+      sys.stderr.write('{} scenario(s) slower or larger than the baseline by more than {:.0%}.\n'.format(flagged, args.tolerance))
+      sys.exit(1)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,134 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import argparse
+import sys
+import numpy
+import hazards
+import leslie
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# In SexChromSelectionBalance.py, allele 1 makes males age faster (parameter
+# 'meffect') and the wild type allele reduces female fecundity by s, or h·s in
+# heterozygotes. The values of s that keep both alleles have been found by
+# running replicates of the simulation over a list of values (2018-08-31). Here,
+# they are found with the deterministic projection of leslie.py, for several
+# values of h at once. The frequency of allele 1 increases with s. Then:
+#
+#  * Allele 1 invades when rare if s is above a lower bound, and allele 0
+#    invades when rare if s is below an upper bound. Between them, the
+#    polymorphism is protected.
+#  * The frequency reached after some days, from 0.5, equals the target at
+#    one value of s.
+#
+# Each threshold is bracketed in a coarse grid of s values, and then refined by
+# bisection. All values of h, and all the points of the grid, are projected
+# together, in one batch per step.
+
+class Calibration:
+   '''Evaluates the projection for arrays of s and h, and counts the parameter sets evaluated.'''
+   def __init__(self, a=0.0039, b=-0.019, k=0.1911, meffect=0.0013, model='two_phases', chromosome='X'):
+      self.a = a
+      self.b = b
+      self.k = k
+      self.meffect = meffect
+      self.model = model
+      self.chromosome = chromosome
+      self.evaluations = 0
+      self.batches = 0
+   def frequency(self, s, h, p0, days):
+      '''Frequency of allele 1 after 'days', starting from frequency 'p0'.'''
+      s, h = numpy.broadcast_arrays(numpy.asarray(s, dtype=float), numpy.asarray(h, dtype=float))
+      self.evaluations += s.size
+      self.batches += 1
+      projection = leslie.Projection(leslie.aging_parameters(self.a, self.meffect, self.chromosome), self.b,
+                                     leslie.antagonistic_fitness(s, h), model=self.model, k=self.k,
+                                     chromosome=self.chromosome, p0=p0)
+      return projection.run(days).frequency()
+
+def threshold(func, h, low, high, points=21, tol=1e-4):
+   '''Value of s where func(s, h), increasing with s, changes sign, for every h.
+
+   The sign change is first located in a grid of 'points' values of s between
+   'low' and 'high', and then refined by bisection until the interval is
+   narrower than 'tol'. Returns the lower and upper ends of the final intervals.
+   When there is no sign change in the grid, the interval is (-inf, low) if the
+   function is positive at 'low', and (high, inf) otherwise. Only the values of
+   h with a sign change are evaluated during the bisection.'''
+   h = numpy.asarray(h, dtype=float)
+   grid = numpy.linspace(low, high, points)
+   values = func(grid[None, :], h[:, None])
+   positive = values > 0
+   # First point of the grid where the function is positive, after a point where it was not.
+   change = positive[:, 1:] & ~positive[:, :-1]
+   found = change.any(axis=1)
+   first = numpy.argmax(change, axis=1)
+   # Without a sign change, the threshold is below the grid if the function is already positive at 'low'.
+   below = ~found & positive[:, 0]
+   lower = numpy.where(found, grid[first], numpy.where(below, -numpy.inf, high))
+   upper = numpy.where(found, grid[first + 1], numpy.where(below, low, numpy.inf))
+   while numpy.any(upper[found] - lower[found] > tol):
+      middle = (lower[found] + upper[found]) / 2.0
+      positive = func(middle, h[found]) > 0
+      upper[found] = numpy.where(positive, middle, upper[found])
+      lower[found] = numpy.where(positive, lower[found], middle)
+   return lower, upper
+
+def interval(lower, upper):
+   '''Interval of s as written in the output, or the side of the grid where the threshold is, if it was not found.'''
+   if numpy.isneginf(lower):
+      return '<{:.5f}'.format(upper)
+   if numpy.isposinf(upper):
+      return '>{:.5f}'.format(lower)
+   return '{:.5f}-{:.5f}'.format(lower, upper)
+
+def protected(invades1, invades0, target):
+   '''Whether the target value of s, found in the grid, is within the interval where the polymorphism is protected.
+
+   Arguments are the (lower, upper) pairs returned by threshold(). A bound
+   outside the grid is satisfied only if it is on the side of the target:
+   allele 1 invading in the whole grid (-inf, smin), or allele 0 invading in
+   the whole grid (smax, inf). Otherwise, no value of s in the grid is protected.'''
+   (fromLow, fromHigh), (toLow, toHigh), (targetLow, targetHigh) = invades1, invades0, target
+   found = numpy.isfinite(targetLow) & numpy.isfinite(targetHigh)
+   # Infinite ends of the bounds make the comparisons fail, or succeed, as required.
+   return found & (targetLow >= fromHigh) & (targetHigh <= toLow)
+
+def main():
+   parser = argparse.ArgumentParser(description = 'Finds the values of the female selective coefficient (s) that keep a sexually antagonistic X-linked or autosomal polymorphism, and the one that gives a target frequency of allele 1, for some values of dominance (h). It uses the deterministic projection of leslie.py.')
+   parser.add_argument('-m', '--model', default='two_phases', choices=hazards.MODELS, help='Aging model. Default: "two_phases".')
+   parser.add_argument('-a', default=0.0039, type=float, help='Minimum value of the "a" parameter. Default: 0.0039.')
+   parser.add_argument('-b', default=-0.019, type=float, help='Parameter "b" of the aging model. Default: -0.019.')
+   parser.add_argument('-k', default=0.1911, type=float, help='Rate of mortality of smurfs. Default: 0.1911.')
+   parser.add_argument('-e', '--meffect', default=0.0013, type=float, help='Mutant effect on male rate of aging. Default: 0.0013.')
+   parser.add_argument('-d', '--dominance', default=[0.5], nargs='+', type=float, help='Values of the coefficient of dominance of the deleterious allele in females. Default: 0.5.')
+   parser.add_argument('-t', '--target', default=0.5, type=float, help='Target frequency of allele 1. Default: 0.5.')
+   parser.add_argument('-c', '--chromosome', default='X', choices=['X', 'A'], help='X-linked or autosomal locus. Default: X.')
+   parser.add_argument('-s', '--smin', default=0.0, type=float, help='Lowest value of s considered. Default: 0.0.')
+   parser.add_argument('-S', '--smax', default=0.5, type=float, help='Highest value of s considered. Default: 0.5.')
+   parser.add_argument('-n', '--points', default=21, type=int, help='Number of values of s in the initial grid. Default: 21.')
+   parser.add_argument('-T', '--tol', default=0.0001, type=float, help='Width of the final intervals of s. Default: 0.0001.')
+   parser.add_argument('-G', default=2000, type=int, help='Days projected to reach the equilibrium frequency. Default: 2000.')
+   parser.add_argument('-I', '--invasion', default=500, type=int, help='Days projected to decide if a rare allele invades. Default: 500.')
+   parser.add_argument('-r', '--rare', default=0.01, type=float, help='Initial frequency of a rare allele. Default: 0.01.')
+   args = parser.parse_args()
+   calibration = Calibration(args.a, args.b, args.k, args.meffect, args.model, args.chromosome)
+   h = numpy.array(args.dominance)
+   invades1 = lambda s, h: calibration.frequency(s, h, args.rare, args.invasion) - args.rare
+   # Positive when allele 0 does not invade, that is, when s is above the upper bound.
+   invades0 = lambda s, h: calibration.frequency(s, h, 1.0 - args.rare, args.invasion) - (1.0 - args.rare)
+   target = lambda s, h: calibration.frequency(s, h, 0.5, args.G) - args.target
+   results = [threshold(func, h, args.smin, args.smax, args.points, args.tol) for func in (invades1, invades0, target)]
+   stable = protected(*results)
+   sys.stdout.write('#h\tProtected_from\t\tProtected_to\t\tTarget_s\t\tStable\n')
+   for i in range(h.size):
+      sys.stdout.write('{:.4f}'.format(h[i]) + ''.join('\t' + interval(lower[i], upper[i]) for lower, upper in results) +
+                       '\t' + ('yes' if stable[i] else 'no') + '\n')
+   sys.stdout.write('# {} parameter sets evaluated, in {} batches.\n'.format(calibration.evaluations, calibration.batches))
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,115 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import glob
+import os
+import pickle
+import random
+import numpy
+import simuPOP as sim
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# A checkpoint is a pair of files: the population, '{prefix}.{gen}.ckpt.pop',
+# saved with pop.save(), and the rest of the state of the run, '{prefix}.{gen}.ckpt',
+# pickled. Both are written to temporary files and renamed, and the second one is
+# written last, so that a checkpoint is complete only if it exists.
+#
+# The state of the simuPOP random number generator cannot be read. Instead,
+# Reseeder seeds it again at the end of every generation, with a number derived
+# from the root seed and the generation, whether checkpoints are written or
+# not, so that checkpointing does not change the course of a run. A run resumed
+# from the checkpoint of a generation seeds it with the same number, and then
+# both continue with the same random numbers. The state of the python 'random'
+# module, and of the numpy generators of the operators given (see
+# operators.make_rng), are saved as they are.
+
+def derived_seed(seed, gen):
+   return int(numpy.random.SeedSequence([seed, gen]).generate_state(1)[0])
+
+class Reseeder(sim.PyOperator):
+   '''Seeds the simuPOP random number generator again, with derived_seed(seed, gen).
+
+   It must be the last post-mating operator but Checkpoint, and be applied in
+   every generation, with or without checkpoints.'''
+   def __init__(self, seed, *args, **kwargs):
+      self.seed = seed
+      sim.PyOperator.__init__(self, func=self.reseed, *args, **kwargs)
+   def reseed(self, pop):
+      sim.setRNG('mt19937', derived_seed(self.seed, pop.dvars().gen))
+      return True
+
+class Checkpoint(sim.PyOperator):
+   '''Saves the population and the state of the random number generators every few generations.
+
+   It is a post-mating operator, to be applied with the 'step' argument. Only
+   the last 'keep' checkpoints are kept. 'operators' are the operators with a
+   numpy generator (attribute 'rng'), 'varNames' the population variables
+   that must be restored exactly, and 'sinks' the operators writing to files
+   (with a flush() method, like TrajectorySink), flushed before saving. It
+   must be applied after a Reseeder with the same seed.'''
+   def __init__(self, prefix, seed, operators=[], varNames=[], sinks=[], keep=2, *args, **kwargs):
+      self.prefix = prefix
+      self.seed = seed
+      self.operators = list(operators)
+      self.varNames = list(varNames)
+      self.sinks = list(sinks)
+      self.keep = keep
+      sim.PyOperator.__init__(self, func=self.save, *args, **kwargs)
+   def files(self, gen):
+      name = '{}.{}.ckpt'.format(self.prefix, gen)
+      return name + '.pop', name
+   def generations(self):
+      '''Generations of the complete checkpoints available, sorted.'''
+      gens = []
+      for name in glob.glob(glob.escape(self.prefix) + '.*.ckpt'):
+         gen = name[len(self.prefix) + 1:-len('.ckpt')]
+         if gen.isdigit() and os.path.exists(name + '.pop'):
+            gens.append(int(gen))
+      return sorted(gens)
+   def save(self, pop):
+      gen = pop.dvars().gen
+      for sink in self.sinks:
+         sink.flush()
+      ids = pop.indInfo('ind_id') if 'ind_id' in pop.infoFields() else []
+      state = {
+         'gen': gen,
+         'random': random.getstate(),
+         'rngs': [op.rng.bit_generator.state for op in self.operators],
+         'vars': {name: pop.vars()[name] for name in self.varNames if name in pop.vars()},
+         'nextID': int(max(ids)) + 1 if len(ids) > 0 else 0
+      }
+      popFile, stateFile = self.files(gen)
+      pop.save(popFile + '.tmp')
+      os.replace(popFile + '.tmp', popFile)
+      with open(stateFile + '.tmp', 'wb') as fh:
+         pickle.dump(state, fh)
+      os.replace(stateFile + '.tmp', stateFile)
+      for old in self.generations()[:-self.keep]:
+         for name in reversed(self.files(old)):
+            os.remove(name)
+      return True
+   def restore(self):
+      '''Loads the last checkpoint and restores the random number generators.
+
+      Returns the population, ready to evolve from the generation after the
+      checkpoint, and the next individual ID, to pass to IdTagger(startID=...).
+      If there is no checkpoint, returns (None, 0).'''
+      gens = self.generations()
+      if len(gens) == 0:
+         return None, 0
+      popFile, stateFile = self.files(gens[-1])
+      with open(stateFile, 'rb') as fh:
+         state = pickle.load(fh)
+      pop = sim.loadPopulation(popFile)
+      for name, value in state['vars'].items():
+         pop.vars()[name] = value
+      pop.dvars().gen = state['gen'] + 1
+      random.setstate(state['random'])
+      for op, rngState in zip(self.operators, state['rngs']):
+         op.rng.bit_generator.state = rngState
+      sim.setRNG('mt19937', derived_seed(self.seed, state['gen']))
+      return pop, state['nextID']
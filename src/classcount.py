@@ -0,0 +1,87 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import numpy
+import leslie
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# In SexChromSelectionBalance.py and FitnessCenter.py, individuals only differ
+# in sex, genotype at one locus, age and smurf state: 'a' and 't0' depend only on
+# sex and genotype. leslie.Projection follows the expected numbers of individuals
+# of every class. Here, the same classes hold whole numbers of individuals,
+# and every day the numbers that become smurfs and that die are binomial draws,
+# and the numbers of newborns of every sex and genotype, a multinomial draw.
+# That is the distribution of the simulations: every offspring of RandomMating
+# gets a father and a mother chosen independently, with probabilities
+# proportional to fitness, and alleles transmitted by Mendel's laws. Only the
+# drift is kept, and the cost of a day depends on the number of classes, not on N.
+
+class ClassCounts(leslie.Projection):
+   '''Numbers of individuals by sex, genotype, smurf state and age, simulated with random draws.
+
+   The arguments are those of leslie.Projection, with an integer population
+   size N, plus the 'seed' of the numpy random generator. The population
+   starts with N newborns of random sex, and alleles drawn with frequency 'p0'.
+   The methods ages(), frequency() and mean_age() are inherited.
+
+   Like PedigreeSink and AgeHistogram in FitnessCenter.py, it also keeps
+   'children', where children[..., sex - 1, genotype, age] is the number of
+   children born to parents of that sex, genotype and age; 'born', the number
+   of individuals ever born (founders included) by sex and genotype; and
+   'alive', the number of individuals present right before every mating, by
+   sex, genotype and age, summed over days. The parents of every day's births
+   are one multinomial draw per sex, over the classes of non-smurf adults.'''
+   def __init__(self, a, b, fitness, N=1000, seed=None, **kwargs):
+      leslie.Projection.__init__(self, a, b, fitness, N=N, **kwargs)
+      self.rng = numpy.random.default_rng(seed)
+      self.aging = numpy.broadcast_to(numpy.asarray(a, dtype=float), self.grid + (2, 3))
+      self.N = self.N.astype(numpy.int64)
+      # The projection starts with the expected proportions of founders of every sex and genotype.
+      expected = self.n[..., 0, 0].reshape(self.grid + (6,))
+      founders = self.rng.multinomial(self.N, expected / expected.sum(axis=-1, keepdims=True))
+      self.n = numpy.zeros(self.n.shape, dtype=numpy.int64)
+      self.n[..., 0, 0] = founders.reshape(self.grid + (2, 3))
+      self.born = founders.reshape(self.grid + (2, 3))
+      self.children = numpy.zeros(self.grid + (2, 3, self.maxAge), dtype=numpy.int64)
+      self.alive = numpy.zeros(self.grid + (2, 3, self.maxAge), dtype=numpy.int64)
+   def step(self):
+      '''Advances one day.'''
+      n = self.n
+      today = slice(self.offset, self.offset + self.maxAge)
+      if self.model == 'two_phases':
+         new = self.rng.binomial(n[..., 0, :], self.smurfing[..., today])
+         n[..., 0, :] -= new
+         n[..., 1, :] += new
+         n[..., 1, :] = self.rng.binomial(n[..., 1, :], numpy.broadcast_to(self.survival, n[..., 1, :].shape))
+      else:
+         n[...] = self.rng.binomial(n, numpy.broadcast_to(self.survival[..., today], n.shape))
+      self.offset = (self.offset + 1) % self.maxAge
+      newborn = -self.offset % self.maxAge
+      n[..., newborn] = 0
+      ages = self.ages()
+      self.alive[..., ages] += n.sum(axis=-2)
+      if self.day >= self.founding:
+         births, sons, daughters = self.offspring()
+         p = numpy.concatenate([sons, daughters], axis=-1) / 2.0
+         newborns = self.rng.multinomial(births.astype(numpy.int64), p)
+         n[..., 0, newborn] = newborns.reshape(self.grid + (2, 3))
+         self.born += newborns.reshape(self.grid + (2, 3))
+         self.children[..., ages] += self.parents(newborns.sum(axis=-1))
+      self.day += 1
+   def parents(self, births):
+      '''Number of children of the non-smurfs of every sex, genotype and age, for 'births' children today.'''
+      weight = self.n[..., 0, :] * self.weight[..., self.offset:self.offset + self.maxAge]
+      weight = weight.reshape(self.grid + (2, 3 * self.maxAge))
+      total = weight.sum(axis=-1, keepdims=True)
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         p = numpy.where(total > 0, weight / total, 1.0 / weight.shape[-1])
+      return self.rng.multinomial(births[..., None], p).reshape(self.grid + (2, 3, self.maxAge))
+   def mean_a(self):
+      '''Mean parameter 'a' of males and females, with shape grid + (2,).'''
+      byGenotype = self.n.sum(axis=(-1, -2))
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         return (byGenotype * self.aging).sum(axis=-1) / byGenotype.sum(axis=-1)
@@ -0,0 +1,53 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import numpy
+import hazards
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# In SurvivalCurves.py, all the individuals of a cohort are born the same day,
+# with the same 'a', 'b' and 'k'. They differ only in being smurfs or not, and
+# individuals of the same class share the same daily probabilities of becoming
+# a smurf and of dying. Thus, the number of individuals of a class that change
+# state in one day is a binomial draw, and the cohort can be simulated with two
+# numbers per day, whatever its size. The distribution of the numbers of larvae,
+# adults and smurfs alive every day is the same as when every individual is
+# simulated, in SurvivalCurves.py or with arraypop.py.
+
+KINDS = ('larvae', 'adults', 'smurfs')
+
+def cohort_counts(N, days, model='two_phases', a=0.0039, b=-0.019, k=0.1911, reps=1, adult=10, rng=None):
+   '''Numbers of larvae, adults and smurfs alive at the end of every day, with shape (reps, 3, days).
+
+   Replicates are independent cohorts of N newborns, simulated together.
+   As in SurvivalCurves.py, larvae are non-smurfs younger than 'adult' days
+   (after a day of aging), and every day non-smurfs may become smurfs (only in
+   the two-phases model), then some individuals die, and then all age one day.'''
+   if model not in hazards.MODELS:
+      raise ValueError('Unknown aging model: "{}". Choices: {}.'.format(model, ', '.join(hazards.MODELS)))
+   rng = rng if rng is not None else numpy.random.default_rng()
+   normal = numpy.full(reps, N, dtype=numpy.int64)
+   smurfs = numpy.zeros(reps, dtype=numpy.int64)
+   counts = numpy.zeros((reps, 3, days), dtype=numpy.int64)
+   t0 = -b / a
+   if model == 'two_phases':
+      # The init operators give newborns a first chance to become smurfs at age 0.
+      new = rng.binomial(normal, hazards.smurf_probability(0, a, t0))
+      normal -= new
+      smurfs += new
+      death = float(hazards.death_probability('two_phases', k=k, smurf=1))
+   for day in range(days):
+      if model == 'two_phases':
+         new = rng.binomial(normal, hazards.smurf_probability(day, a, t0))
+         normal -= new
+         smurfs += new
+         smurfs -= rng.binomial(smurfs, death)
+      else:
+         normal -= rng.binomial(normal, float(hazards.death_probability(model, age=day, a=a, b=b)))
+      counts[:, 0 if day + 1 < adult else 1, day] = normal
+      counts[:, 2, day] = smurfs
+   return counts
@@ -0,0 +1,122 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import functools
+import numpy
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# The three aging models implemented since 2018-07-20. See the README.sh of
+# that folder for the derivation of the daily probabilities of death below.
+MODELS = ('two_phases', 'gompertz', 'weibull')
+
+def smurf_probability(age, a, t0):
+   '''Probability of becoming a smurf between ages 'age' and 'age + 1', if not a smurf yet.'''
+   # This is 1 - N(t+1)/N(t), with N(t) = exp(-a·(t - t0)^2 / 2). See 2018-05-22.
+   age = numpy.asarray(age, dtype=float)
+   p = 1.0 - numpy.exp(-a * age + a * t0 - a / 2.0)
+   return numpy.where(age > t0, p, 0.0)
+
+def death_probability(model, age=None, a=None, b=None, k=None, smurf=None):
+   '''Daily probability of death under an aging model, for arrays of individuals.
+
+   The two-phases model only needs 'smurf' and 'k'. The Gompertz and Weibull
+   models only need 'age', 'a' and 'b'. Arguments can be scalars or arrays that
+   broadcast together.'''
+   if model == 'two_phases':
+      smurf = numpy.asarray(smurf)
+      return numpy.where(smurf == 1, 1.0 - numpy.exp(-numpy.asarray(k, dtype=float)), 0.0)
+   age = numpy.asarray(age, dtype=float)
+   a = numpy.asarray(a, dtype=float)
+   b = numpy.asarray(b, dtype=float)
+   if model == 'gompertz':
+      return 1.0 - numpy.exp((a * numpy.exp(b * age) / b) * (1.0 - numpy.exp(b)))
+   if model == 'weibull':
+      return 1.0 - numpy.exp(-(a / b) * (age + 1.0) ** b + (a / b) * age ** b)
+   raise ValueError('Unknown aging model: "{}". Choices: {}.'.format(model, ', '.join(MODELS)))
+
+# Individuals share a few values of 'a' and 'b', set by their genotypes, and
+# ages are whole days. Thus, the probabilities above are computed once for
+# every set of parameters and for all ages up to MAX_AGE, and then looked up.
+# Only the tables of the last CACHE_SIZE sets of parameters used are kept.
+# Finding the sets of parameters present costs one pass over the population
+# per set. With more than MAX_SETS of them, as with many mutant loci, it is
+# cheaper to compute the probabilities than to look them up.
+MAX_AGE = 200
+CACHE_SIZE = 256
+MAX_SETS = 16
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def hazard_table(model, a, b, k=None, maxAge=MAX_AGE):
+   '''Daily probabilities of becoming a smurf and of dying, at ages 0 to maxAge, for one set of parameters.
+
+   Returns two read-only arrays. Smurf probabilities are 0 except in the
+   two-phases model, where the probabilities of death are those of smurfs,
+   or nan if 'k' is not given.'''
+   if model not in MODELS:
+      raise ValueError('Unknown aging model: "{}". Choices: {}.'.format(model, ', '.join(MODELS)))
+   age = numpy.arange(maxAge + 1)
+   if model == 'two_phases':
+      smurf = smurf_probability(age, a, -b / a)
+      death = numpy.full(age.shape, float(death_probability(model, k=k, smurf=1)) if k is not None else numpy.nan)
+   else:
+      smurf = numpy.zeros(age.shape)
+      death = death_probability(model, age=age, a=a, b=b)
+   smurf.flags.writeable = False
+   death.flags.writeable = False
+   return smurf, death
+
+def parameter_sets(a, b, limit=MAX_SETS):
+   '''Number of the set of parameters (a, b) of every individual, and the list of sets.
+
+   Returns (None, None) if there are more than 'limit' sets.'''
+   index = numpy.full(a.size, -1, dtype=numpy.int64)
+   sets = []
+   first = 0
+   while first < a.size:
+      if len(sets) == limit:
+         return None, None
+      same = (a == a[first]) & (b == b[first])
+      index[same] = len(sets)
+      sets.append((float(a[first]), float(b[first])))
+      unassigned = index < 0
+      first = int(numpy.argmax(unassigned)) if unassigned.any() else a.size
+   return index, sets
+
+def daily_probabilities(model, age, a, b, k=None, maxAge=MAX_AGE):
+   '''Probabilities of becoming a smurf and of dying today, for arrays of individuals.
+
+   They are looked up in the tables of hazard_table(), except for individuals
+   with ages that are not whole numbers between 0 and maxAge, or if there are
+   too many different sets of parameters (see parameter_sets()). Then, they
+   are computed with smurf_probability() and death_probability().'''
+   if model not in MODELS:
+      raise ValueError('Unknown aging model: "{}". Choices: {}.'.format(model, ', '.join(MODELS)))
+   if model != 'two_phases':
+      k = None
+   age = numpy.asarray(age, dtype=float).ravel()
+   a = numpy.broadcast_to(numpy.asarray(a, dtype=float), age.shape)
+   b = numpy.broadcast_to(numpy.asarray(b, dtype=float), age.shape)
+   if age.size == 0:
+      return numpy.zeros(0), numpy.zeros(0)
+   index, sets = parameter_sets(a, b)
+   if index is None:
+      outside = numpy.arange(age.size)
+      smurf, death = numpy.zeros(age.shape), numpy.empty(age.shape)
+   else:
+      tables = [hazard_table(model, pa, pb, k, maxAge) for pa, pb in sets]
+      day = numpy.clip(age, 0, maxAge).astype(numpy.int64)
+      position = index * (maxAge + 1) + day
+      smurf = numpy.concatenate([table[0] for table in tables]).take(position)
+      death = numpy.concatenate([table[1] for table in tables]).take(position)
+      outside = numpy.flatnonzero(day != age)
+   if outside.size > 0:
+      if model == 'two_phases':
+         smurf[outside] = smurf_probability(age[outside], a[outside], -b[outside] / a[outside])
+         death[outside] = death_probability(model, k=k, smurf=1) if k is not None else numpy.nan
+      else:
+         death[outside] = death_probability(model, age=age[outside], a=a[outside], b=b[outside])
+   return smurf, death
@@ -0,0 +1,185 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import ast
+import functools
+import numpy
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# The statements passed to sim.InfoExec() in the scripts only combine information
+# fields, population variables, arithmetic, comparisons, conditional expressions
+# and a few functions from the math and random modules. All of that has an
+# element-wise counterpart in numpy. Below, I translate the syntax tree of such
+# statements into expressions that operate on whole arrays of information fields.
+# Anything else (method calls on 'ind', subscripts, comprehensions...) raises
+# NotVectorizable, and the caller is expected to evaluate the statement once per
+# individual, as before.
+
+class NotVectorizable(Exception):
+   '''Raised when a statement cannot be evaluated on whole arrays of information fields.'''
+
+# Like python, 'and' and 'or' return one of their operands, not a boolean:
+# 'x = y or 1.0' sets x to y where y is not zero, and to 1.0 elsewhere.
+def _and(*values):
+   return functools.reduce(lambda a, b: numpy.where(a, b, a), values)
+
+def _or(*values):
+   return functools.reduce(lambda a, b: numpy.where(a, a, b), values)
+
+def _minimum(*values):
+   return functools.reduce(numpy.minimum, values)
+
+def _maximum(*values):
+   return functools.reduce(numpy.maximum, values)
+
+def _float(value):
+   return numpy.asarray(value, dtype=float)
+
+# Prefix of the helper names inserted in the translated expressions. It cannot
+# clash with the name of an information field.
+PREFIX = '__vx_'
+
+HELPERS = {
+   PREFIX + 'where': numpy.where,
+   PREFIX + 'and': _and,
+   PREFIX + 'or': _or,
+   PREFIX + 'not': numpy.logical_not,
+}
+
+FUNCTIONS = {
+   'math': {'exp': numpy.exp, 'log': numpy.log, 'log10': numpy.log10, 'sqrt': numpy.sqrt, 'pow': numpy.power,
+            'floor': numpy.floor, 'ceil': numpy.ceil, 'fabs': numpy.fabs},
+   None: {'abs': numpy.abs, 'min': _minimum, 'max': _maximum, 'int': numpy.trunc, 'float': _float}
+}
+for module, functions in FUNCTIONS.items():
+   for name, function in functions.items():
+      HELPERS['{}{}_{}'.format(PREFIX, module or 'builtin', name)] = function
+
+ALLOWED = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+   ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+   ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+class _Vectorizer(ast.NodeTransformer):
+   '''Rewrites an expression so that it can be evaluated on arrays of information fields.'''
+   def __init__(self, exposeInd):
+      self.exposeInd = exposeInd
+      self.names = set()
+      self.random = False
+   def helper(self, name, args):
+      return ast.Call(func=ast.Name(id=PREFIX + name, ctx=ast.Load()), args=args, keywords=[])
+   def visit_Name(self, node):
+      if node.id == self.exposeInd or node.id in ('math', 'random', 'numpy'):
+         raise NotVectorizable('"{}" can only be used to access fields or functions.'.format(node.id))
+      self.names.add(node.id)
+      return node
+   def visit_Attribute(self, node):
+      # ind.age is the same as the local variable 'age'.
+      if isinstance(node.value, ast.Name) and node.value.id == self.exposeInd and self.exposeInd:
+         self.names.add(node.attr)
+         return ast.Name(id=node.attr, ctx=ast.Load())
+      raise NotVectorizable('Attribute "{}" is not an information field.'.format(ast.unparse(node)))
+   def visit_IfExp(self, node):
+      return self.helper('where', [self.visit(node.test), self.visit(node.body), self.visit(node.orelse)])
+   def visit_BoolOp(self, node):
+      name = 'and' if isinstance(node.op, ast.And) else 'or'
+      return self.helper(name, [self.visit(value) for value in node.values])
+   def visit_UnaryOp(self, node):
+      if isinstance(node.op, ast.Not):
+         return self.helper('not', [self.visit(node.operand)])
+      if isinstance(node.op, ast.Invert):
+         raise NotVectorizable('Bitwise inversion is not supported.')
+      return self.generic_visit(node)
+   def visit_Compare(self, node):
+      # Chained comparisons, like 'a < b < c', become 'a < b and b < c'.
+      for op in node.ops:
+         if not isinstance(op, (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)):
+            raise NotVectorizable('Comparison "{}" is not supported.'.format(type(op).__name__))
+      operands = [self.visit(node.left)] + [self.visit(x) for x in node.comparators]
+      comparisons = [ast.Compare(left=operands[i], ops=[op], comparators=[operands[i + 1]])
+                     for i, op in enumerate(node.ops)]
+      if len(comparisons) == 1:
+         return comparisons[0]
+      return self.helper('and', comparisons)
+   def visit_Call(self, node):
+      if node.keywords:
+         raise NotVectorizable('Keyword arguments are not supported.')
+      if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+         module, name = node.func.value.id, node.func.attr
+      elif isinstance(node.func, ast.Name):
+         module, name = None, node.func.id
+      else:
+         raise NotVectorizable('Call to "{}" is not supported.'.format(ast.unparse(node.func)))
+      args = [self.visit(x) for x in node.args]
+      if module == 'random':
+         # Every call to random.random() becomes an array of independent uniform
+         # numbers, one per individual, just as if it was called once per individual.
+         self.random = True
+         if name == 'random' and len(args) == 0:
+            return self.helper('uniform', [])
+         if name == 'uniform' and len(args) == 2:
+            return self.helper('uniform', args)
+      elif name in FUNCTIONS.get(module, {}):
+         return self.helper('{}_{}'.format(module or 'builtin', name), args)
+      raise NotVectorizable('Function "{}" is not supported.'.format(ast.unparse(node.func)))
+   def generic_visit(self, node):
+      if not isinstance(node, ALLOWED):
+         raise NotVectorizable('"{}" is not supported.'.format(type(node).__name__))
+      return ast.NodeTransformer.generic_visit(self, node)
+
+class CompiledStatements:
+   '''Statements of the form "field = expression" or "field += expression", translated to array operations.
+
+   Attribute 'targets' lists the information fields assigned, 'names' the names
+   of information fields or population variables that must be available when
+   evaluating them, and 'random' tells if any of them draws random numbers.'''
+   def __init__(self, stmts, exposeInd=''):
+      if isinstance(stmts, str):
+         stmts = [stmts]
+      self.source = '\n'.join(stmts)
+      self.statements = []
+      self.names = set()
+      self.random = False
+      try:
+         tree = ast.parse(self.source)
+      except SyntaxError as error:
+         raise NotVectorizable(str(error))
+      for statement in tree.body:
+         if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+            target, value = self.target(statement.targets[0], exposeInd), statement.value
+         elif isinstance(statement, ast.AugAssign):
+            target = self.target(statement.target, exposeInd)
+            value = ast.BinOp(left=ast.Name(id=target, ctx=ast.Load()), op=statement.op, right=statement.value)
+         else:
+            raise NotVectorizable('Only assignments to information fields can be vectorized.')
+         vectorizer = _Vectorizer(exposeInd)
+         expression = ast.fix_missing_locations(ast.Expression(body=vectorizer.visit(value)))
+         self.statements.append((target, compile(expression, '<{}>'.format(self.source), 'eval')))
+         self.names |= vectorizer.names
+         self.random = self.random or vectorizer.random
+      self.targets = [target for target, code in self.statements]
+   def target(self, node, exposeInd):
+      if isinstance(node, ast.Name):
+         return node.id
+      if exposeInd and isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == exposeInd:
+         return node.attr
+      raise NotVectorizable('Cannot assign to "{}".'.format(ast.unparse(node)))
+   def evaluate(self, namespace, size, rng=None):
+      '''Runs the statements on a dictionary of arrays and scalars, and returns the new values of the targets.
+
+      The namespace is not modified. Every value returned is a float array of length 'size'.'''
+      namespace = dict(namespace)
+      helpers = dict(HELPERS)
+      if self.random:
+         helpers[PREFIX + 'uniform'] = lambda low=0.0, high=1.0: rng.uniform(low, high, size)
+      helpers['__builtins__'] = {}
+      result = {}
+      with numpy.errstate(over='ignore', invalid='ignore', divide='ignore'):
+         for target, code in self.statements:
+            value = numpy.broadcast_to(numpy.asarray(eval(code, helpers, namespace), dtype=float), (size,))
+            namespace[target] = value
+            result[target] = value
+      return result
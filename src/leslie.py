@@ -0,0 +1,217 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import argparse
+import itertools
+import sys
+import numpy
+import hazards
+import lifetable
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# The simulations of a single locus with sexually antagonistic effects, like
+# SexChromSelectionBalance.py and FitnessCenter.py, follow every day the same
+# steps: non-smurfs older than t0 become smurfs, some individuals die, all get
+# one day older, and then non-smurf adults are chosen as parents with probabilities
+# proportional to their fitness, to fill the population up to N. Here, the same
+# steps are applied to the expected numbers of individuals by sex, genotype,
+# age and smurf state, instead of to individuals. There is no drift, and the
+# result is the trajectory the simulations fluctuate around.
+#
+# The state has shape grid + (2, 3, 2, ages): any leading dimensions index
+# combinations of parameters, which are all projected at once; then come sex
+# (males, females), number of copies of allele 1, smurf state and age. For
+# X-linked loci, males only have genotypes 0 and 1: the allele in their only
+# X chromosome, which they pass to their daughters, while sons get their only
+# X from the mother. Offspring are males or females with probability 1/2.
+
+def aging_parameters(a1, effect, chromosome='X', mode='codominant', sexes=(1,)):
+   '''Parameter 'a' of every sex and genotype, as ArrayQuanTrait assigns it, with shape grid + (2, 3).
+
+   For 'codominant' mode, 'a' is 'a1' plus 'effect' times the number of copies
+   of allele 1; for 'recessive', plus 'effect' only in homozygotes. X-linked
+   loci in males count as homozygous with one copy. Only 'sexes' express the
+   effect, like MaleEffect() when sexes=(1,).'''
+   a1 = numpy.asarray(a1, dtype=float)[..., None, None]
+   effect = numpy.asarray(effect, dtype=float)[..., None, None]
+   count = numpy.array([[0.0, 1.0, 2.0], [0.0, 1.0, 2.0]])
+   if mode == 'recessive':
+      count = (count == 2).astype(float)
+      if chromosome == 'X':
+         count[0, 1] = 1.0
+   elif chromosome == 'X':
+      count[0, 2] = 1.0
+   count[[sex - 1 for sex in (1, 2) if sex not in sexes]] = 0.0
+   return a1 + effect * count
+
+def antagonistic_fitness(s, h, maxAge=50):
+   '''Fitness table of fitness_func() in SexChromSelectionBalance.py, with shape grid + (maxAge + 1, 2, 3).
+
+   Fitness is the fecundity at each age (see lifetable.fecundity), times 1 - s
+   in females without allele 1, and times 1 - h·s in heterozygous females.'''
+   s, h = numpy.broadcast_arrays(numpy.asarray(s, dtype=float), numpy.asarray(h, dtype=float))
+   female = numpy.stack([1.0 - s, 1.0 - h * s, numpy.ones_like(s)], axis=-1)
+   byGenotype = numpy.stack([numpy.ones_like(female), female], axis=-2)
+   F = lifetable.fecundity(numpy.arange(maxAge + 1))[:, None, None]
+   return F * byGenotype[..., None, :, :]
+
+class Projection:
+   '''Expected numbers of individuals by sex, genotype, smurf state and age, for a grid of parameters.
+
+   'a' has shape grid + (2, 3) (see aging_parameters()), 'fitness' has shape
+   grid + (ages, 2, 3), like the tables of fitness_table() and TableSelector:
+   older ages get the fitness of the last row. 'b' and 'k' broadcast with the
+   grid. The population starts with N newborns, half of each sex, with allele 1
+   at frequency 'p0' in Hardy-Weinberg proportions. Births start on day 'founding'
+   (see demo() in the scripts), and only non-smurfs of age 'adult' or older
+   reproduce. Numbers are expected values, not rounded. Individuals reaching
+   'maxAge' die.
+
+   Instead of moving all numbers to the next age every day, the age axis of
+   the state is a ring: the age of position i is (i + offset) % maxAge, and the
+   tables of rates by age are read through a rotated view. See ages().'''
+   def __init__(self, a, b, fitness, model='two_phases', k=0.1911, chromosome='X', N=1.0, p0=0.5,
+                founding=10, adult=10, maxAge=120):
+      if model not in hazards.MODELS:
+         raise ValueError('Unknown aging model: "{}". Choices: {}.'.format(model, ', '.join(hazards.MODELS)))
+      if chromosome not in ('X', 'A'):
+         raise ValueError('Chromosome must be either "X" or "A".')
+      a = numpy.asarray(a, dtype=float)
+      fitness = numpy.asarray(fitness, dtype=float)
+      self.grid = numpy.broadcast_shapes(a.shape[:-2], fitness.shape[:-3], numpy.shape(b), numpy.shape(k),
+                                         numpy.shape(N), numpy.shape(p0))
+      self.model = model
+      self.chromosome = chromosome
+      self.N = numpy.broadcast_to(numpy.asarray(N, dtype=float), self.grid)
+      self.founding = founding
+      self.day = 0
+      self.maxAge = maxAge
+      self.offset = 0
+      # Daily probabilities of becoming a smurf and of surviving, by sex, genotype and age,
+      # repeated twice along the age axis, so that any rotation is a slice.
+      age = numpy.arange(2 * maxAge) % maxAge
+      shape = self.grid + (2, 3, 2 * maxAge)
+      a = a[..., None]
+      b = numpy.asarray(b, dtype=float)[..., None, None, None]
+      if model == 'two_phases':
+         self.smurfing = numpy.ascontiguousarray(numpy.broadcast_to(hazards.smurf_probability(age, a, -b / a), shape))
+         self.survival = numpy.exp(-numpy.asarray(k, dtype=float))[..., None, None, None]
+      else:
+         alive = 1.0 - hazards.death_probability(model, age=age, a=a, b=b)
+         self.survival = numpy.ascontiguousarray(numpy.broadcast_to(alive, shape))[..., None, :]
+      rows = numpy.minimum(age, fitness.shape[-3] - 1)
+      weight = numpy.moveaxis(fitness[..., rows, :, :], -3, -1) * (age >= adult)
+      self.weight = numpy.ascontiguousarray(numpy.broadcast_to(weight, shape))
+      self.buffer = numpy.empty(self.grid + (2, 3, maxAge))
+      # Initial population.
+      p0 = numpy.asarray(p0, dtype=float)
+      females = numpy.stack([(1 - p0) ** 2, 2 * p0 * (1 - p0), p0 ** 2], axis=-1)
+      if chromosome == 'X':
+         males = numpy.stack([1 - p0, p0, numpy.zeros_like(p0)], axis=-1)
+      else:
+         males = females
+      self.n = numpy.zeros(self.grid + (2, 3, 2, maxAge))
+      self.n[..., 0, :, 0, 0] = self.N[..., None] / 2 * males
+      self.n[..., 1, :, 0, 0] = self.N[..., None] / 2 * females
+   def step(self):
+      '''Advances one day.'''
+      n = self.n
+      today = slice(self.offset, self.offset + self.maxAge)
+      if self.model == 'two_phases':
+         new = numpy.multiply(n[..., 0, :], self.smurfing[..., today], out=self.buffer)
+         n[..., 0, :] -= new
+         n[..., 1, :] += new
+         n[..., 1, :] *= self.survival
+      else:
+         n *= self.survival[..., today]
+      # Everybody gets one day older, and the oldest ones leave room for the newborns.
+      self.offset = (self.offset + 1) % self.maxAge
+      newborn = -self.offset % self.maxAge
+      n[..., newborn] = 0.0
+      if self.day >= self.founding:
+         births, sons, daughters = self.offspring()
+         n[..., 0, :, 0, newborn] = births[..., None] / 2 * sons
+         n[..., 1, :, 0, newborn] = births[..., None] / 2 * daughters
+      self.day += 1
+   def offspring(self):
+      '''Number of births today, and the proportions of genotypes among sons and daughters.
+
+      Parents are chosen with probabilities proportional to their fitness, by
+      sex, among the survivors of today, already one day older. Without parents
+      of both sexes, there are no births.'''
+      n = self.n
+      births = numpy.maximum(self.N - n.sum(axis=(-1, -2, -3, -4)), 0.0)
+      # Genotypes of the parents, weighted by fitness.
+      weight = self.weight[..., self.offset:self.offset + self.maxAge]
+      parents = numpy.einsum('...i,...i->...', n[..., 0, :], weight)
+      total = parents.sum(axis=-1, keepdims=True)
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         parents = numpy.where(total > 0, parents / total, 0.0)
+      births = numpy.where((total[..., 0] > 0).all(axis=-1), births, 0.0)
+      mother = (parents[..., 1, :] * [0.0, 0.5, 1.0]).sum(axis=-1)
+      if self.chromosome == 'X':
+         father = (parents[..., 0, :] * [0.0, 1.0, 1.0]).sum(axis=-1)
+      else:
+         father = (parents[..., 0, :] * [0.0, 0.5, 1.0]).sum(axis=-1)
+      daughters = numpy.stack([(1 - father) * (1 - mother), father * (1 - mother) + (1 - father) * mother,
+                               father * mother], axis=-1)
+      if self.chromosome == 'X':
+         sons = numpy.stack([1 - mother, mother, numpy.zeros_like(mother)], axis=-1)
+      else:
+         sons = daughters
+      return births, sons, daughters
+   def ages(self):
+      '''Age of every position of the last axis of the state.'''
+      return (numpy.arange(self.maxAge) + self.offset) % self.maxAge
+   def run(self, days):
+      for i in range(days):
+         self.step()
+      return self
+   def frequency(self):
+      '''Frequency of allele 1, with one copy per male for X-linked loci.'''
+      byGenotype = self.n.sum(axis=(-1, -2))
+      copies = (byGenotype * [0.0, 1.0, 2.0]).sum(axis=-1)
+      if self.chromosome == 'X':
+         copies[..., 0] = byGenotype[..., 0, 1] + byGenotype[..., 0, 2]
+         total = byGenotype[..., 0, :].sum(axis=-1) + 2 * byGenotype[..., 1, :].sum(axis=-1)
+      else:
+         total = 2 * byGenotype.sum(axis=(-1, -2))
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         return copies.sum(axis=-1) / total
+   def mean_age(self):
+      '''Mean age of males and females, with shape grid + (2,).'''
+      byAge = self.n.sum(axis=(-2, -3))
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         return (byAge * self.ages()).sum(axis=-1) / byAge.sum(axis=-1)
+
+def main():
+   parser = argparse.ArgumentParser(description = 'Projects the expected numbers of individuals of a population with an X-linked or autosomal locus that affects the rate of aging of males and the fecundity of females, for all combinations of parameter values, and prints the final allele frequencies and mean ages.')
+   parser.add_argument('-m', '--model', default='two_phases', choices=hazards.MODELS, help='Aging model. Default: "two_phases".')
+   parser.add_argument('-a', default=[0.0039], nargs='+', type=float, help='Minimum value of the "a" parameter. Default: 0.0039.')
+   parser.add_argument('-b', default=[-0.019], nargs='+', type=float, help='Parameter "b" of the aging model. Default: -0.019.')
+   parser.add_argument('-k', default=[0.1911], nargs='+', type=float, help='Rate of mortality of smurfs. Default: 0.1911.')
+   parser.add_argument('-e', '--meffect', default=[0.0013], nargs='+', type=float, help='Mutant effect on male rate of aging. Default: 0.0013.')
+   parser.add_argument('-s', '--feffect', default=[0.114], nargs='+', type=float, help='Female selective coefficient against the wild type allele. Default: 0.114.')
+   parser.add_argument('-d', '--dominance', default=[0.5], nargs='+', type=float, help='Coefficient of dominance of the deleterious allele in females. Default: 0.5.')
+   parser.add_argument('-f', '--initfreq', default=0.5, type=float, help='Initial frequency of allele 1. Default: 0.5.')
+   parser.add_argument('-c', '--chromosome', default='X', choices=['X', 'A'], help='X-linked or autosomal locus. Default: X.')
+   parser.add_argument('-G', default=500, type=int, help='Number of days. Default: 500.')
+   args = parser.parse_args()
+   names = ['a', 'b', 'k', 'meffect', 'feffect', 'dominance']
+   grid = numpy.array(list(itertools.product(args.a, args.b, args.k, args.meffect, args.feffect, args.dominance))).T
+   a, b, k, meffect, feffect, dominance = grid
+   projection = Projection(aging_parameters(a, meffect, args.chromosome), b, antagonistic_fitness(feffect, dominance),
+                           model = args.model, k = k, chromosome = args.chromosome, p0 = args.initfreq).run(args.G)
+   freq = projection.frequency()
+   age = projection.mean_age()
+   sys.stdout.write('#' + '\t'.join(names) + '\tFreq.\tMaleAge\tFemAge\n')
+   for i in range(grid.shape[1]):
+      sys.stdout.write('\t'.join('{:.6g}'.format(x) for x in grid[:, i]) +
+                       '\t{:.4f}\t{:.2f}\t{:.2f}\n'.format(freq[i], age[i, 0], age[i, 1]))
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,73 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import numpy
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# The discrete-time survival function of the two-phases model (2018-06-21,
+# equations 2 and 3 in survival.pdf) is:
+#
+#           x-1       x-1                         i-1
+#   S(x) = PROD q  +  SUM (1 - q ) · exp((i-x)·d) PROD q
+#          i=c   i    i=c       i                 j=c   j
+#
+# where c = ceil(t0) and q_i = exp(-a·i + a·t0 - a/2) is the probability of not
+# becoming a smurf between ages i and i+1. The script survival.py computed every
+# term from scratch, for every age. Calling N(x) the first product (the proportion
+# of non-smurfs) and M(x) the sum (the proportion of smurfs still alive), both can
+# be updated from one age to the next:
+#
+#   N(x+1) = N(x) · q_x
+#   M(x+1) = exp(-d) · (M(x) + N(x) - N(x+1))
+#
+# with N(c) = 1 and M(c) = 0. Setting q_i = 1 for i < c, the same recursion
+# holds from age 0, and S(x) = N(x) + M(x) = 1 for all x <= c, as before. Each
+# step is an array operation over all the combinations of parameters.
+
+def fecundity(x):
+   '''Age-specific fecundity: 1 - (x - 12)^2 / 100 for adults (x >= 10), and never negative.'''
+   x = numpy.asarray(x, dtype=float)
+   return numpy.where(x < 10, 0.0, numpy.maximum(1.0 - ((x - 12.0) ** 2) / 100.0, 0.0))
+
+def two_phases_survival(a, b, d, oldest):
+   '''Survival function of the two-phases model, from age 1 to 'oldest'.
+
+   Parameters 'a', 'b' and 'd' (the death rate of smurfs) can be scalars or
+   arrays that broadcast together, like a[:, None, None], b[None, :, None] and
+   d[None, None, :] for a full grid. The result has the broadcast shape of the
+   parameters plus a last dimension of length 'oldest', where position x - 1
+   is the probability of surviving to age x.'''
+   a, b, d = numpy.broadcast_arrays(numpy.asarray(a, dtype=float), numpy.asarray(b, dtype=float),
+                                    numpy.asarray(d, dtype=float))
+   t0 = -b / a
+   if numpy.any(t0 < 0):
+      raise ValueError('The two-phases model requires t0 = -b/a >= 0.')
+   first = numpy.ceil(t0)
+   decay = numpy.exp(-d)
+   S = numpy.empty(a.shape + (oldest,))
+   N = numpy.ones(a.shape)
+   M = numpy.zeros(a.shape)
+   for i in range(oldest):
+      q = numpy.where(i >= first, numpy.exp(-a * i + a * t0 - a / 2.0), 1.0)
+      nextN = N * q
+      M = decay * (M + N - nextN)
+      N = nextN
+      S[..., i] = N + M
+   return S
+
+def lifetime_fitness(S, F=None):
+   '''Expected lifetime reproduction, W = SUM S(x)·F(x), from a survival table of ages 1 to 'oldest'.'''
+   if F is None:
+      F = fecundity(numpy.arange(1, S.shape[-1] + 1))
+   return (S * F).sum(axis=-1)
+
+def two_phases_table(a, b, d, oldest, F=None):
+   '''Returns both the survival table and the lifetime fitness W of a grid of parameters.
+
+   See two_phases_survival() for the shape of the parameters and of the table.'''
+   S = two_phases_survival(a, b, d, oldest)
+   return S, lifetime_fitness(S, F)
@@ -0,0 +1,592 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import simuPOP as sim
+import numpy
+import inspect
+import hazards
+import infoexpr
+import pedigree
+import transmission
+import streams
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+def info_array(pop, field):
+   '''Returns the values of an information field of all individuals as a numpy array.'''
+   return numpy.array(pop.indInfo(field), dtype=float)
+
+def sex_array(pop, indexes=None):
+   '''Returns the sex (1, male; 2, female) of all individuals, or of those in 'indexes', as a numpy array.'''
+   if indexes is None:
+      return numpy.fromiter((ind.sex() for ind in pop.individuals()), dtype=numpy.int8, count=pop.popSize())
+   return numpy.fromiter((pop.individual(int(i)).sex() for i in indexes), dtype=numpy.int8, count=len(indexes))
+
+def genotype_array(pop, indexes=None):
+   '''Returns the genotypes of all individuals, or of those in 'indexes', as a numpy array.
+
+   The array has shape (individuals, ploidy, loci). Reading only a few
+   individuals by index avoids converting the genotypes of everyone else.'''
+   if indexes is None:
+      return numpy.array(pop.genotype()).reshape(pop.popSize(), pop.ploidy(), pop.totNumLoci())
+   rows = [pop.individual(int(i)).genotype() for i in indexes]
+   return numpy.array(rows, dtype=numpy.int64).reshape(len(rows), pop.ploidy(), pop.totNumLoci())
+
+def locus_types(pop):
+   '''Returns the chromosome type (sim.AUTOSOME, sim.CHROMOSOME_X...) of every locus, as a numpy array.'''
+   return numpy.concatenate([numpy.full(pop.numLoci(ch), pop.chromType(ch)) for ch in range(pop.numChrom())])
+
+def make_rng(seed, key):
+   '''Returns the numpy random generator of an operator (see streams.py).
+
+   Operators created with the same seed get independent streams, as long as
+   their keys are different. Without a seed, the generator is seeded from the system.'''
+   return streams.generator(seed, key)
+
+class Mortality(sim.PyOperator):
+   '''Removes the individuals that die today, deciding all deaths in one pass.
+
+   It replaces sim.DiscardIf(natural_death). Instead of calling a python
+   function for every individual, it reads the 'age', 'a', 'b' and 'smurf'
+   information fields as arrays, computes the daily probabilities of death
+   of the whole population and compares them with one vector of uniform random
+   numbers. The probabilities are the same, and so are the survival statistics.
+   Under the Gompertz and Weibull models, they are looked up in the cached
+   tables of hazards.daily_probabilities(). If 'k' is not given, it is taken
+   from the population variable 'k'.'''
+   def __init__(self, model='two_phases', k=None, seed=None, *args, **kwargs):
+      if model not in hazards.MODELS:
+         raise ValueError('Unknown aging model: "{}". Choices: {}.'.format(model, ', '.join(hazards.MODELS)))
+      self.model = model
+      self.k = k
+      self.rng = make_rng(seed, 'Mortality ' + model)
+      sim.PyOperator.__init__(self, func=self.kill, *args, **kwargs)
+   def kill(self, pop):
+      if pop.popSize() == 0:
+         return True
+      if self.model == 'two_phases':
+         k = self.k if self.k is not None else pop.dvars().k
+         p = hazards.death_probability('two_phases', k=k, smurf=info_array(pop, 'smurf'))
+      else:
+         p = hazards.daily_probabilities(self.model, info_array(pop, 'age'),
+            info_array(pop, 'a'), info_array(pop, 'b'))[1]
+      dead = numpy.flatnonzero(self.rng.random(p.size) < p)
+      if dead.size > 0:
+         pop.removeIndividuals(indexes=dead.tolist())
+      return True
+
+class Smurfing(sim.PyOperator):
+   '''Turns into smurfs the non-smurfs that become smurfs today, under the two-phases model.
+
+   It replaces the pair of pre-mating operators that drew the 'luck' field and
+   then set 'smurf' with the formula of hazards.smurf_probability(). Only
+   non-smurfs older than t0 = -b/a can become smurfs, and their probabilities
+   are looked up in the cached tables of hazards.daily_probabilities(), by age
+   and by the values of 'a' and 'b'. Neither 'luck' nor 't0' is used: t0 is
+   computed from 'a' and 'b'. Applied as an initial operator too, it gives the
+   founders their smurf status from the same stream.'''
+   def __init__(self, seed=None, *args, **kwargs):
+      self.rng = make_rng(seed, 'Smurfing')
+      sim.PyOperator.__init__(self, func=self.transform, *args, **kwargs)
+   def transform(self, pop):
+      if pop.popSize() == 0:
+         return True
+      smurf = info_array(pop, 'smurf')
+      age = info_array(pop, 'age')
+      a = info_array(pop, 'a')
+      b = info_array(pop, 'b')
+      candidates = numpy.flatnonzero((smurf != 1) & (age > -b / a))
+      if candidates.size == 0:
+         return True
+      p = hazards.daily_probabilities('two_phases', age[candidates], a[candidates], b[candidates])[0]
+      new = candidates[self.rng.random(candidates.size) < p]
+      if new.size > 0:
+         smurf[new] = 1.0
+         pop.setIndInfo(smurf.tolist(), 'smurf')
+      return True
+
+class VectorInfoExec(sim.PyOperator):
+   '''Executes the statements of an InfoExec operator on whole arrays of information fields.
+
+   Statements like "age += 1" or "luck = random.random()" are translated once
+   into numpy expressions (see infoexpr.py), and then evaluated for the whole
+   population in one pass, instead of once per individual. Random numbers are
+   drawn from a numpy generator, the stream 'key' of 'seed' (see streams.py).
+   The key defaults to the statements, so that two operators with the same
+   statements and seed draw the same numbers unless they get different keys.
+   When the statements cannot be vectorized, or when they refer to something
+   that is neither an information field nor a population variable, the
+   operator falls back to sim.InfoExec. It is meant to be used as an init, pre
+   or post-mating operator.'''
+   def __init__(self, stmts, exposeInd='', usePopVars=False, seed=None, key=None, *args, **kwargs):
+      self.infoExec = sim.InfoExec(stmts, exposeInd=exposeInd, usePopVars=usePopVars)
+      try:
+         self.compiled = infoexpr.CompiledStatements(stmts, exposeInd)
+      except infoexpr.NotVectorizable:
+         self.compiled = None
+      self.rng = make_rng(seed, key if key is not None else 'VectorInfoExec ' + str(stmts))
+      sim.PyOperator.__init__(self, func=self.execute, *args, **kwargs)
+   def execute(self, pop):
+      if self.compiled is None:
+         return self.infoExec.apply(pop)
+      fields = pop.infoFields()
+      if not all(target in fields for target in self.compiled.targets):
+         return self.infoExec.apply(pop)
+      namespace = {}
+      for name in self.compiled.names:
+         if name in fields:
+            namespace[name] = info_array(pop, name)
+         elif name in pop.vars():
+            namespace[name] = pop.vars()[name]
+         else:
+            return self.infoExec.apply(pop)
+      try:
+         values = self.compiled.evaluate(namespace, pop.popSize(), self.rng)
+      except (TypeError, ValueError):
+         return self.infoExec.apply(pop)
+      for field, value in values.items():
+         pop.setIndInfo(value.tolist(), field)
+      return True
+
+class _Sex:
+   '''Stands for an individual of known sex when tabulating a fitness function.'''
+   def __init__(self, sex):
+      self.value = sex
+   def sex(self):
+      return self.value
+
+def fitness_table(func, maxAge, genotypes=(0, 1, 2)):
+   '''Tabulates the fitness function of a PySelector by age, sex and number of mutant alleles.
+
+   The function can take any of the arguments 'age', 'geno', 'ind' and 'pop'
+   that sim.PySelector passes to it, like fitness_func() and fitness_func1()
+   in the scripts. For genotype class g, 'geno' is a one-locus genotype with g
+   copies of allele 1, 'ind' only answers to sex(), and 'pop' is None. The
+   result has shape (maxAge + 1, 2, len(genotypes)), indexed by age, sex - 1
+   and genotype class.'''
+   arguments = inspect.signature(func).parameters
+   table = numpy.zeros((maxAge + 1, 2, len(genotypes)))
+   for age in range(maxAge + 1):
+      for sex in (1, 2):
+         for g, mutants in enumerate(genotypes):
+            values = {'age': age, 'geno': (1,) * mutants + (0,) * (2 - mutants), 'ind': _Sex(sex), 'pop': None}
+            table[age, sex - 1, g] = func(**{name: values[name] for name in arguments})
+   return table
+
+class TableSelector(sim.PyOperator):
+   '''Sets the 'fitness' information field of the whole population from a table of fitness values.
+
+   It replaces sim.PySelector. Element table[age, sex - 1, g] is the fitness of
+   an individual of that age and sex with g copies of allele 1 at 'loci', and
+   all individuals are assigned their fitness with one gather operation. Ages
+   beyond the last row get the fitness of the last row. Sexes and genotypes are
+   only read if the table depends on them. See fitness_table() to build the
+   table from the fitness functions used with PySelector.'''
+   def __init__(self, table, loci=[], *args, **kwargs):
+      self.table = numpy.asarray(table, dtype=float)
+      if self.table.ndim != 3 or self.table.shape[1] != 2:
+         raise ValueError('The fitness table must have shape (ages, 2, genotype classes).')
+      self.loci = list(loci)
+      self.bySex = not numpy.array_equal(self.table[:, 0, :], self.table[:, 1, :])
+      self.byGenotype = len(self.loci) > 0 and not numpy.all(self.table == self.table[:, :, :1])
+      sim.PyOperator.__init__(self, func=self.select, *args, **kwargs)
+   def select(self, pop):
+      if pop.popSize() == 0:
+         return True
+      age = numpy.clip(info_array(pop, 'age').astype(int), 0, self.table.shape[0] - 1)
+      sex = sex_array(pop) - 1 if self.bySex else 0
+      if self.byGenotype:
+         g = genotype_array(pop)[:, :, self.loci].sum(axis=(1, 2))
+         g = numpy.minimum(g, self.table.shape[2] - 1)
+      else:
+         g = 0
+      pop.setIndInfo(self.table[age, sex, g].tolist(), 'fitness')
+      return True
+
+class SexSpecificTransmitter(sim.PyOperator):
+   '''Forms the genotypes of all newborns at once, with different recombination maps in mothers and fathers.
+
+   It replaces the sexSpecificRecombinator during-mating operator, which made
+   two python calls to sim.Recombinator for every offspring. Mating must keep
+   the parents (CloneMating) and record them with PedigreeTagger, with a plain
+   MendelianGenoTransmitter. Then, this post-mating operator, applied before
+   any other one, finds the parents of the individuals of age 0 by 'ind_id',
+   and replaces both copies of their genomes with gametes of the mother (first
+   copy) and of the father (second copy), drawn with transmission.recombine().
+   Only the genotypes of the parents are read. If 'newborns' is the virtual
+   subpopulation of the individuals of age 0, like (0, 5) for an
+   InfoSplitter(field='age', values=0), all their genotypes are written with
+   one call to pop.setGenotype(); otherwise, they are written one by one.
+   'rates' and 'maleRates' are the probabilities of recombination after every
+   locus in mothers and in fathers, like the 'rates' of sim.Recombinator. The
+   X chromosome of fathers does not recombine: daughters get its first copy,
+   and sons the second one, as they would get the Y chromosome.'''
+   def __init__(self, rates=0.0, maleRates=0.0, seed=None, newborns=None, *args, **kwargs):
+      self.rates = rates
+      self.maleRates = maleRates
+      self.newborns = newborns
+      self.rng = make_rng(seed, 'SexSpecificTransmitter')
+      sim.PyOperator.__init__(self, func=self.transmit, *args, **kwargs)
+   def parents(self, pop, ids, field, newborn):
+      order = numpy.argsort(ids, kind='stable')
+      wanted = info_array(pop, field)[newborn]
+      found = numpy.minimum(numpy.searchsorted(ids[order], wanted), ids.size - 1)
+      if not numpy.array_equal(ids[order[found]], wanted):
+         raise ValueError('Parents of newborns must be kept in the population, with their "ind_id", until transmission.')
+      return order[found]
+   def transmit(self, pop):
+      newborn = numpy.flatnonzero(info_array(pop, 'age') == 0)
+      loci = pop.totNumLoci()
+      if newborn.size == 0 or loci == 0:
+         return True
+      types = locus_types(pop)
+      if not numpy.all((types == sim.AUTOSOME) | (types == sim.CHROMOSOME_X)):
+         raise ValueError('SexSpecificTransmitter only supports autosomes and X chromosomes.')
+      ids = info_array(pop, 'ind_id')
+      fathers = self.parents(pop, ids, 'father_id', newborn)
+      mothers = self.parents(pop, ids, 'mother_id', newborn)
+      # Only the genotypes of the parents are read, once per parent.
+      parents, inverse = numpy.unique(numpy.concatenate((fathers, mothers)), return_inverse=True)
+      geno = genotype_array(pop, parents)
+      fathers, mothers = inverse[:newborn.size], inverse[newborn.size:]
+      numLoci = [pop.numLoci(ch) for ch in range(pop.numChrom())]
+      X = types == sim.CHROMOSOME_X
+      maternal = transmission.recombine(geno[mothers], numLoci, self.rates, self.rng)
+      maleRates = numpy.where(X, 0.0, numpy.broadcast_to(numpy.asarray(self.maleRates, dtype=float), (loci,)))
+      paternal = transmission.recombine(geno[fathers], numLoci, maleRates, self.rng)
+      if X.any():
+         sons = sex_array(pop, newborn) == 1
+         paternal[:, X] = geno[fathers, sons.astype(int)][:, X]
+      offspring = numpy.stack([maternal, paternal], axis=1)
+      if self.newborns is not None:
+         # Individuals of a virtual subpopulation are visited in order, like 'newborn'.
+         pop.setGenotype(offspring.ravel().tolist(), subPops=[self.newborns])
+         return True
+      for i, genotype in zip(newborn, offspring.reshape(newborn.size, 2 * loci).tolist()):
+         pop.individual(int(i)).setGenotype(genotype)
+      return True
+
+class ArrayQuanTrait(sim.PyOperator):
+   '''Assigns the aging parameters 'a' and 'b' of all newborns at once, from their genotypes.
+
+   It replaces sim.PyQuanTrait with AdditiveRecessive() or MaleEffect(), which
+   were called once per offspring. It must be a post-mating operator, applied
+   before any mutator, and it only changes the individuals of age 0. Parameter
+   'a' is 'a1' plus 'effect' times the number of mutant alleles (mode
+   'codominant') or of loci homozygous for the mutant allele (mode 'recessive').
+   Males are hemizygous for X-linked loci: one mutant allele counts as a mutant
+   locus in both modes. Only the sexes listed in 'sexes' express the mutations.
+   Genotypes of all newborns are read into one boolean array, and mutations are
+   counted with numpy sums. If the population has a 't0' information field, it
+   is set to -b/a too.'''
+   def __init__(self, a1, effect, b, mode='recessive', sexes=(1, 2), *args, **kwargs):
+      if mode not in ('recessive', 'codominant'):
+         raise ValueError('Mode must be either "recessive" or "codominant".')
+      self.a1 = a1
+      self.effect = effect
+      self.b = b
+      self.mode = mode
+      self.sexes = list(sexes)
+      sim.PyOperator.__init__(self, func=self.assign, *args, **kwargs)
+   def mutants(self, mutant):
+      '''Number of mutant alleles or homozygous mutant loci of diploid individuals.'''
+      if self.mode == 'recessive':
+         return (mutant[:, 0, :] & mutant[:, 1, :]).sum(axis=1)
+      return mutant.sum(axis=(1, 2))
+   def assign(self, pop):
+      age = info_array(pop, 'age')
+      newborn = numpy.flatnonzero(age == 0)
+      if newborn.size == 0:
+         return True
+      a = info_array(pop, 'a')
+      a[newborn] = self.a1
+      if pop.totNumLoci() > 0 and len(self.sexes) > 0:
+         X = locus_types(pop) == sim.CHROMOSOME_X
+         mutant = genotype_array(pop, newborn) == 1
+         sex = sex_array(pop)[newborn]
+         count = numpy.zeros(newborn.size)
+         males = sex == 1
+         if 1 in self.sexes and males.any():
+            # Only the first copy of the X chromosome of males carries alleles.
+            male = mutant[males]
+            count[males] = self.mutants(male[:, :, ~X]) + male[:, 0, X].sum(axis=1)
+         if 2 in self.sexes and (~males).any():
+            count[~males] = self.mutants(mutant[~males])
+         a[newborn] += self.effect * count
+      b = info_array(pop, 'b')
+      b[newborn] = self.b
+      pop.setIndInfo(a.tolist(), 'a')
+      pop.setIndInfo(b.tolist(), 'b')
+      if 't0' in pop.infoFields():
+         t0 = info_array(pop, 't0')
+         t0[newborn] = -self.b / a[newborn]
+         pop.setIndInfo(t0.tolist(), 't0')
+      return True
+
+class PedigreeSink(sim.PyOperator):
+   '''Appends the individuals of age 0 to a binary pedigree file. See pedigree.py.
+
+   It replaces sim.PedigreeTagger(output=...), which wrote a line of text per
+   individual. Used as an init operator, it writes the initial population, and
+   as a post-mating operator, all the offspring of the generation at once. The
+   'ind_id', 'father_id' and 'mother_id' fields must be set by IdTagger and
+   PedigreeTagger. The birthday is taken from the 'birthday' field, if present,
+   or else from the generation number. Call close() after evolving.'''
+   def __init__(self, filename, loci=[0], *args, **kwargs):
+      self.fh = open(filename, 'wb')
+      self.loci = list(loci)
+      sim.PyOperator.__init__(self, func=self.write, *args, **kwargs)
+   def write(self, pop):
+      newborn = numpy.flatnonzero(info_array(pop, 'age') == 0)
+      if newborn.size == 0:
+         return True
+      if 'birthday' in pop.infoFields():
+         birthdays = info_array(pop, 'birthday')[newborn]
+      else:
+         birthdays = numpy.full(newborn.size, pop.dvars().gen)
+      pedigree.write_records(self.fh, info_array(pop, 'ind_id')[newborn], info_array(pop, 'father_id')[newborn],
+                             info_array(pop, 'mother_id')[newborn], sex_array(pop, newborn),
+                             genotype_array(pop, newborn)[:, :, self.loci].sum(axis=(1, 2)), birthdays)
+      self.fh.flush()
+      return True
+   def close(self):
+      self.fh.close()
+
+class ReproductiveSuccess(sim.PyOperator):
+   '''Counts the offspring of every individual by the age of the parent, while evolving.
+
+   It is a post-mating operator, not a during-mating one: newborns are the
+   individuals with an 'ind_id' not seen before. Every generation, it credits
+   the newborns to their parents ('father_id' and 'mother_id' must be set by
+   PedigreeTagger),
+   at the age of the parent (days since its birthday), and starts counting the
+   offspring of the newborns. The counts of living individuals are kept in an
+   array with a row per individual and a column per age. When an individual
+   dies, its row is added to the table of its sex and genotype, like the
+   TotalMaleFitness and TotalFemaleFitness tables of FitnessCenter.py, and
+   removed. The genotype is the number of copies of allele 1 at 'loci', and
+   males with two copies count as genotype 1. Births to parents 'ages' days or
+   older are not counted. If 'varName' is given, the mean number of offspring
+   of individuals that already died is stored in that population variable,
+   as a dictionary by sex and genotype. The birthday is read from the 'birthday'
+   field if present, and is otherwise the current generation minus the age.
+   The first time, everybody present is registered before the births are
+   credited, so that offspring of the initial population are counted too.'''
+   def __init__(self, loci=[0], ages=50, varName=None, *args, **kwargs):
+      self.loci = list(loci)
+      self.ages = ages
+      self.varName = varName
+      self.replicates = {}
+      sim.PyOperator.__init__(self, func=self.count, *args, **kwargs)
+   def state(self, pop):
+      rep = pop.vars().get('rep', 0)
+      if rep not in self.replicates:
+         self.replicates[rep] = {
+            'id': numpy.zeros(0), 'sex': numpy.zeros(0, dtype=numpy.int8), 'genotype': numpy.zeros(0, dtype=numpy.int64),
+            'birthday': numpy.zeros(0, dtype=numpy.int64), 'counts': numpy.zeros((0, self.ages), dtype=numpy.uint64),
+            'offspring': numpy.zeros((2, 3, self.ages), dtype=numpy.uint64), 'individuals': numpy.zeros((2, 3), dtype=numpy.int64)
+         }
+      return self.replicates[rep]
+   def fold(self, state, rows):
+      '''Adds the counts of some living individuals to the tables of their sex and genotype.'''
+      index = (state['sex'][rows].astype(numpy.int64) - 1) * 3 + state['genotype'][rows]
+      state['individuals'] += numpy.bincount(index, minlength=6).reshape(2, 3)
+      numpy.add.at(state['offspring'].reshape(6, self.ages), index, state['counts'][rows])
+   def count(self, pop):
+      state = self.state(pop)
+      gen = pop.dvars().gen
+      ids = info_array(pop, 'ind_id')
+      # Deaths.
+      dead = ~numpy.isin(state['id'], ids)
+      if dead.any():
+         self.fold(state, dead)
+         for key in ('id', 'sex', 'genotype', 'birthday', 'counts'):
+            state[key] = state[key][~dead]
+      # Individuals not tracked yet are registered first: the newborns and, the
+      # first time, everybody present, so that the parents of the newborns are
+      # tracked before their births are credited.
+      new = numpy.flatnonzero(~numpy.isin(ids, state['id']))
+      if new.size > 0:
+         new = new[numpy.argsort(ids[new], kind='stable')]
+         if 'birthday' in pop.infoFields():
+            birthday = info_array(pop, 'birthday')[new].astype(numpy.int64)
+         else:
+            birthday = gen - info_array(pop, 'age')[new].astype(numpy.int64)
+         sex = sex_array(pop, new)
+         genotype = genotype_array(pop, new)[:, :, self.loci].sum(axis=(1, 2)).astype(numpy.int64)
+         genotype[(sex == 1) & (genotype == 2)] = 1
+         state['id'] = numpy.concatenate((state['id'], ids[new]))
+         state['sex'] = numpy.concatenate((state['sex'], sex))
+         state['genotype'] = numpy.concatenate((state['genotype'], genotype))
+         state['birthday'] = numpy.concatenate((state['birthday'], birthday))
+         state['counts'] = numpy.concatenate((state['counts'], numpy.zeros((new.size, self.ages), dtype=numpy.uint64)))
+      # Births. Parents of founders are not in the population, and are not counted.
+      for field in ('father_id', 'mother_id'):
+         parents = info_array(pop, field)[new]
+         parents = parents[numpy.isin(parents, state['id'])]
+         rows = numpy.searchsorted(state['id'], parents)
+         age = gen - state['birthday'][rows]
+         young = (age >= 0) & (age < self.ages)
+         numpy.add.at(state['counts'], (rows[young], age[young]), 1)
+      if self.varName:
+         pop.vars()[self.varName] = self.mean_fitness(pop.vars().get('rep', 0))
+      return True
+   def tables(self, rep=0, living=True):
+      '''Returns the offspring[sex - 1, genotype, age] and individuals[sex - 1, genotype] tables of a replicate.
+
+      If 'living' is True, individuals still alive are included, as in FitnessCenter.py.'''
+      state = self.replicates[rep]
+      offspring, individuals = state['offspring'].copy(), state['individuals'].copy()
+      if living and state['id'].size > 0:
+         alive = {key: state[key] for key in ('sex', 'genotype', 'counts')}
+         alive['offspring'], alive['individuals'] = offspring, individuals
+         self.fold(alive, numpy.ones(state['id'].size, dtype=bool))
+      return offspring, individuals
+   def mean_fitness(self, rep=0, living=False):
+      '''Mean lifetime number of offspring by sex (1, 2) and genotype, of the individuals that died.'''
+      offspring, individuals = self.tables(rep, living)
+      total = offspring.sum(axis=2)
+      return {sex: {g: float(total[sex - 1, g] / individuals[sex - 1, g]) if individuals[sex - 1, g] > 0 else float('nan')
+                    for g in range(3 if sex == 2 else 2)} for sex in (1, 2)}
+
+class AgeHistogram(sim.PyOperator):
+   '''Accumulates the number of individuals alive by sex, genotype and age, every time it is applied.
+
+   It replaces an InfoExec that incremented a dictionary of dictionaries once
+   per individual. Element counts[sex - 1, g, age] is the number of times an
+   individual of that sex, with g copies of allele 1 at 'loci' and of that age,
+   was present when the operator was applied, summed over generations. Ages
+   'maxAge' or older are not counted. The genotype is not corrected for males,
+   as in the dictionary it replaces. Counts are kept per replicate; see table().'''
+   def __init__(self, loci=[0], maxAge=200, *args, **kwargs):
+      self.loci = list(loci)
+      self.maxAge = maxAge
+      self.counts = {}
+      sim.PyOperator.__init__(self, func=self.accumulate, *args, **kwargs)
+   def accumulate(self, pop):
+      rep = pop.vars().get('rep', 0)
+      if rep not in self.counts:
+         self.counts[rep] = numpy.zeros((2, 2 * len(self.loci) + 1, self.maxAge), dtype=numpy.int64)
+      if pop.popSize() == 0:
+         return True
+      counts = self.counts[rep]
+      age = info_array(pop, 'age').astype(numpy.int64)
+      keep = (age >= 0) & (age < self.maxAge)
+      sex = sex_array(pop).astype(numpy.int64) - 1
+      g = genotype_array(pop)[:, :, self.loci].sum(axis=(1, 2)).astype(numpy.int64)
+      index = (sex[keep] * counts.shape[1] + g[keep]) * self.maxAge + age[keep]
+      counts += numpy.bincount(index, minlength=counts.size).reshape(counts.shape)
+      return True
+   def table(self, rep=0):
+      '''Returns the array of counts[sex - 1, genotype, age] of a replicate.'''
+      return self.counts[rep]
+
+class Equilibrium(sim.PyOperator):
+   '''Stops evolving when the mean mutant frequencies and the mean ages by sex do not change any more.
+
+   It must be applied right after sim.Stat(alleleFreq=...), with the same step.
+   Every time, it records the mean frequency of allele 1 at the X-linked loci
+   'xLoci' and at the autosomal loci 'aLoci', and the mean age of males and of
+   females. Once there are two full windows of 'window' records, it compares
+   their means. If none of the statistics changed by more than 'tolerance'
+   times its mean, the run ends. Then, the population variable 'varName' gets
+   the generation and the mean and variance of every statistic in the last
+   window, as estimates of the equilibrium. The records are kept in population
+   variable '{varName}History', so that they are saved with the population.'''
+   def __init__(self, xLoci=[], aLoci=[], window=10, tolerance=0.01, varName='equilibrium', *args, **kwargs):
+      self.xLoci = list(xLoci)
+      self.aLoci = list(aLoci)
+      self.window = window
+      self.tolerance = tolerance
+      self.varName = varName
+      self.names = (['X'] if self.xLoci else []) + (['A'] if self.aLoci else []) + ['age_males', 'age_females']
+      sim.PyOperator.__init__(self, func=self.check, *args, **kwargs)
+   def statistics(self, pop):
+      freq = pop.dvars().alleleFreq
+      values = []
+      for loci in (self.xLoci, self.aLoci):
+         if loci:
+            values.append(float(numpy.mean([freq[x][1] for x in loci])))
+      age = info_array(pop, 'age')
+      sex = sex_array(pop)
+      for s in (1, 2):
+         values.append(float(age[sex == s].mean()) if (sex == s).any() else float('nan'))
+      return values
+   def check(self, pop):
+      history = self.varName + 'History'
+      if history not in pop.vars():
+         pop.vars()[history] = []
+      pop.vars()[history].append([pop.dvars().gen] + self.statistics(pop))
+      if len(pop.vars()[history]) < 2 * self.window:
+         return True
+      records = numpy.array(pop.vars()[history][-2 * self.window:])[:, 1:]
+      before, last = records[:self.window], records[self.window:]
+      change = numpy.abs(last.mean(axis=0) - before.mean(axis=0))
+      scale = numpy.maximum(numpy.abs(last.mean(axis=0)), numpy.abs(before.mean(axis=0)))
+      if not numpy.all(change <= self.tolerance * scale):
+         return True
+      pop.vars()[self.varName] = {
+         'gen': pop.dvars().gen,
+         'mean': dict(zip(self.names, last.mean(axis=0).tolist())),
+         'variance': dict(zip(self.names, last.var(axis=0, ddof=1).tolist()))
+      }
+      return False
+
+class PopStats(sim.PyOperator):
+   '''Computes allele frequencies and means of information fields by sex, in one pass over the population.
+
+   It replaces several sim.Stat operators applied at the same time, and stores
+   the results in the same population variables: 'alleleFreq', as a dictionary
+   of allele frequencies by locus, and 'meanOfInfo' plus a suffix. Only the
+   first copy of X-linked loci counts in males, and only the first copy of
+   Y-linked loci in males counts at all, as in sim.Stat. Mutations are assumed
+   to be biallelic (0 and 1). 'meanOfInfo' is a list of (field, sex, suffix),
+   where sex is 1 (males), 2 (females) or 0 (everybody). The mean frequency of
+   allele 1 across loci of every type of chromosome present is stored in the
+   variable 'mutantFreq', with keys 'X', 'Y' and 'A' (autosomes).'''
+   def __init__(self, alleleFreq=True, meanOfInfo=[], *args, **kwargs):
+      self.alleleFreq = alleleFreq
+      self.meanOfInfo = list(meanOfInfo)
+      sim.PyOperator.__init__(self, func=self.compute, *args, **kwargs)
+   def frequencies(self, pop, sex):
+      '''Frequency of allele 1 at every locus, counting only the copies that exist in each sex.'''
+      geno = genotype_array(pop) == 1
+      types = locus_types(pop)
+      males = sex == 1
+      first = geno[:, 0, :].sum(axis=0)
+      second = geno[:, 1, :].sum(axis=0)
+      secondMales = geno[males, 1, :].sum(axis=0)
+      nMales, nFemales = int(males.sum()), int((~males).sum())
+      count = numpy.where(types == sim.AUTOSOME, first + second, 0).astype(float)
+      total = numpy.where(types == sim.AUTOSOME, 2.0 * (nMales + nFemales), 0.0)
+      X = types == sim.CHROMOSOME_X
+      count[X] = (first + second - secondMales)[X]
+      total[X] = nMales + 2.0 * nFemales
+      Y = types == sim.CHROMOSOME_Y
+      count[Y] = geno[males, 0, :].sum(axis=0)[Y]
+      total[Y] = nMales
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         return count / total, types
+   def compute(self, pop):
+      sex = sex_array(pop)
+      if self.alleleFreq and pop.totNumLoci() > 0:
+         freq, types = self.frequencies(pop, sex)
+         pop.vars()['alleleFreq'] = {locus: {0: 1.0 - p, 1: p} for locus, p in enumerate(freq.tolist())}
+         mutantFreq = {}
+         for name, kind in (('X', sim.CHROMOSOME_X), ('Y', sim.CHROMOSOME_Y), ('A', sim.AUTOSOME)):
+            if (types == kind).any():
+               mutantFreq[name] = float(freq[types == kind].mean())
+         pop.vars()['mutantFreq'] = mutantFreq
+      fields = {}
+      for field, s, suffix in self.meanOfInfo:
+         if field not in fields:
+            fields[field] = info_array(pop, field)
+         values = fields[field] if s == 0 else fields[field][sex == s]
+         name = 'meanOfInfo' + suffix
+         if name not in pop.vars():
+            pop.vars()[name] = {}
+         pop.vars()[name][field] = float(values.mean()) if values.size > 0 else float('nan')
+      return True
@@ -0,0 +1,76 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import numpy
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# FitnessCenter.py used to write a text line per individual ever born, with
+# PedigreeTagger, and then it read the whole file into dictionaries, with an
+# array of offspring numbers for every individual. Here, the pedigree is a
+# binary file of fixed-width records, and the number of offspring per age of
+# the parents is accumulated by sex and genotype while reading it in chunks.
+#
+# Records must be written in increasing order of 'id', as IdTagger assigns them.
+# Then, the parents of any individual are among the last records read, born at
+# most 'maxAge' days before their offspring, and only those need to be kept in
+# memory. The 'genotype' is the number of copies of allele 1 at the loci written,
+# as in the pedigree files. In males, the second copy of an X-linked locus only
+# means something in the first generation.
+
+PEDIGREE = numpy.dtype([('id', '<u8'), ('father', '<u8'), ('mother', '<u8'),
+                        ('sex', 'u1'), ('genotype', 'u1'), ('birthday', '<u4')])
+
+def write_records(fh, ids, fathers, mothers, sexes, genotypes, birthdays):
+   '''Appends pedigree records to an open binary file, sorted by id.'''
+   records = numpy.empty(len(ids), dtype=PEDIGREE)
+   records['id'] = ids
+   records['father'] = fathers
+   records['mother'] = mothers
+   records['sex'] = sexes
+   records['genotype'] = genotypes
+   records['birthday'] = birthdays
+   records[numpy.argsort(records['id'], kind='stable')].tofile(fh)
+
+def read_records(filename):
+   '''Returns all the records of a binary pedigree file. Only for small files.'''
+   return numpy.fromfile(filename, dtype=PEDIGREE)
+
+def offspring_by_parent_age(filename, ages=50, maxAge=200, chunk=1000000):
+   '''Counts offspring by sex, genotype and age of the parents, reading a binary pedigree once.
+
+   Returns two arrays: 'offspring', where offspring[sex - 1, genotype, age] is
+   the number of children born to parents of that sex and genotype when they
+   were 'age' days old, summed over all parents; and 'individuals', where
+   individuals[sex - 1, genotype] is the number of individuals ever born with
+   that sex and genotype. As in FitnessCenter.py, males with two copies of allele
+   1 are counted as genotype 1. Births to parents 'ages' days or older are not
+   counted. Memory does not grow with the length of the pedigree.'''
+   offspring = numpy.zeros((2, 3, ages), dtype=numpy.uint64)
+   individuals = numpy.zeros((2, 3), dtype=numpy.int64)
+   window = numpy.empty(0, dtype=PEDIGREE)
+   with open(filename, 'rb') as fh:
+      while True:
+         records = numpy.fromfile(fh, dtype=PEDIGREE, count=chunk)
+         if records.size == 0:
+            break
+         records['genotype'][(records['sex'] == 1) & (records['genotype'] == 2)] = 1
+         individuals += numpy.bincount((records['sex'].astype(int) - 1) * 3 + records['genotype'],
+                                       minlength=6).reshape(2, 3)
+         pool = numpy.concatenate((window, records))
+         for parent in ('father', 'mother'):
+            known = records[parent] != 0
+            ids = records[parent][known]
+            position = numpy.minimum(numpy.searchsorted(pool['id'], ids), pool.size - 1)
+            if not numpy.array_equal(pool['id'][position], ids):
+               raise ValueError('Parents not found in {}. Are they older than maxAge={}?'.format(filename, maxAge))
+            parents = pool[position]
+            age = records['birthday'][known].astype(numpy.int64) - parents['birthday'].astype(numpy.int64)
+            young = age < ages
+            index = ((parents['sex'][young].astype(numpy.int64) - 1) * 3 + parents['genotype'][young]) * ages + age[young]
+            offspring += numpy.bincount(index, minlength=offspring.size).reshape(offspring.shape).astype(numpy.uint64)
+         window = pool[pool['birthday'].astype(numpy.int64) >= int(records['birthday'].max()) - maxAge]
+   return offspring, individuals
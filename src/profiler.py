@@ -0,0 +1,96 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import time
+import simuPOP as sim
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# simuPOP does not tell how the time of a generation is spent among operators,
+# and the debug codes (DBG_ALL, DBG_PROFILE) slow everything down. Operators
+# implemented in C++ cannot be wrapped from python without changing when they
+# apply (begin, end, step...). Instead, a small marker operator is inserted
+# before the first pre-mating operator and after every operator, and it reads
+# the clock. The time between two markers is the time of the operator between
+# them, and the time between the last pre-mating marker and the first
+# post-mating one is the time of mating, including all the operators applied
+# during mating (IdTagger, PedigreeTagger, transmitters...), which are called
+# once per offspring and cannot be separated. A marker costs a few microseconds.
+# Without a profiler, the lists of operators are not changed at all.
+
+class _Marker(sim.PyOperator):
+   def __init__(self, profiler, slot, last=False):
+      self.profiler = profiler
+      self.slot = slot
+      self.last = last
+      sim.PyOperator.__init__(self, func=self.mark)
+   def mark(self, pop):
+      self.profiler.mark(self.slot, pop.dvars().gen if self.last else None)
+      return True
+
+class Profiler:
+   '''Wall time spent every generation by every operator of simu.evolve(), and by mating.
+
+   Pass the lists of pre and post-mating operators through preOps() and
+   postOps(), in that order, before evolving. Then summary() writes a table
+   with the number of generations every operator was reached, and the total and
+   mean times. Operators applied only every few generations ('step') are
+   reached every generation, and their mean time includes the generations
+   when they did nothing. If 'trace' is a file name, the time of every operator
+   in every generation is written to it, one line per generation.'''
+   def __init__(self, trace=None):
+      self.names = []
+      self.calls = []
+      self.total = []
+      self.generation = []
+      self.last = None
+      self.trace = open(trace, 'w') if trace else None
+      self.traceHeader = False
+   def add(self, name):
+      self.names.append(name)
+      self.calls.append(0)
+      self.total.append(0.0)
+      self.generation.append(0.0)
+      return len(self.names) - 1
+   def preOps(self, ops):
+      instrumented = [_Marker(self, None)]
+      for i, op in enumerate(ops):
+         instrumented += [op, _Marker(self, self.add('pre\t{}:{}'.format(i, type(op).__name__)))]
+      return instrumented
+   def postOps(self, ops):
+      instrumented = [_Marker(self, self.add('mating\tmatingScheme'), last=len(ops) == 0)]
+      for i, op in enumerate(ops):
+         instrumented += [op, _Marker(self, self.add('post\t{}:{}'.format(i, type(op).__name__)), last=i == len(ops) - 1)]
+      return instrumented
+   def mark(self, slot, gen=None):
+      now = time.perf_counter()
+      if slot is not None and self.last is not None:
+         elapsed = now - self.last
+         self.calls[slot] += 1
+         self.total[slot] += elapsed
+         self.generation[slot] += elapsed
+      self.last = now
+      if gen is not None and self.trace:
+         if not self.traceHeader:
+            self.trace.write('#Gen\t' + '\t'.join(name.replace('\t', ':') for name in self.names) + '\n')
+            self.traceHeader = True
+         self.trace.write(str(gen) + ''.join('\t{:.6f}'.format(t) for t in self.generation) + '\n')
+      if gen is not None:
+         self.generation = [0.0] * len(self.names)
+   def summary(self, fh):
+      '''Writes the table of times, from the most to the least time-consuming operator.'''
+      if self.trace:
+         self.trace.close()
+         self.trace = None
+      grand = sum(self.total) or 1.0
+      fh.write('#Stage\tOperator\tCalls\tTotal(s)\tMean(ms)\tShare\n')
+      for i in sorted(range(len(self.names)), key=lambda i: -self.total[i]):
+         mean = 1000.0 * self.total[i] / self.calls[i] if self.calls[i] > 0 else 0.0
+         fh.write('{}\t{}\t{:.3f}\t{:.3f}\t{:.1%}\n'.format(self.names[i], self.calls[i], self.total[i], mean,
+                                                            self.total[i] / grand))
+      generations = max(self.calls) if self.calls else 0
+      if generations > 0:
+         fh.write('# {} generations, {:.3f} ms per generation.\n'.format(generations, 1000.0 * sum(self.total) / generations))
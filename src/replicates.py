@@ -0,0 +1,54 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import concurrent.futures
+import multiprocessing
+import os
+import simuPOP as sim
+import streams
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# Replicates used to be evolved together by one sim.Simulator(pop, rep=reps),
+# one after the other in one process, and sharing the random number generators.
+# Here, every replicate is evolved by a function in its own worker process, with
+# its own seeds for the simuPOP and the python (or numpy) random number generators.
+# The seeds depend only on the root seed and on the number of the replicate.
+# Thus, the results of every replicate are the same, whatever the number of
+# workers, and they are returned in the order of the replicates.
+
+def replicate_seeds(seed, reps):
+   '''Returns a pair of seeds (simuPOP, python) for every replicate.
+
+   Replicate 0 gets the root seed for both generators, so that runs of one
+   replicate are the same as before. The other replicates get seeds derived
+   from the root seed with numpy's SeedSequence (see streams.RandomStreams).
+   If 'seed' is None, the root seed is drawn from the system.'''
+   root = streams.RandomStreams(seed)
+   return [root.replicate(rep).seeds() for rep in range(reps)]
+
+def _run(func, rep, seeds, threads, kwargs):
+   if threads:
+      sim.setOptions(numThreads=threads)
+   return func(rep, seeds, **kwargs)
+
+def run_replicates(func, reps, seed=None, workers=None, **kwargs):
+   '''Runs func(rep, seeds, **kwargs) for every replicate, and returns the list of results.
+
+   The function evolves replicate number 'rep', seeding the simuPOP and python
+   random number generators with the pair of 'seeds', and returns something
+   that can be pickled. With more than one worker, replicates run in forked
+   processes, each with a share of the threads available to simuPOP.'''
+   seeds = replicate_seeds(seed, reps)
+   workers = min(workers or os.cpu_count() or 1, reps)
+   if workers <= 1:
+      return [func(rep, seeds[rep], **kwargs) for rep in range(reps)]
+   threads = max(1, (os.cpu_count() or 1) // workers)
+   # Forking lets the workers run functions defined in the scripts themselves.
+   context = multiprocessing.get_context('fork')
+   with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+      futures = [executor.submit(_run, func, rep, seeds[rep], threads, kwargs) for rep in range(reps)]
+      return [future.result() for future in futures]
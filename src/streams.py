@@ -0,0 +1,63 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import zlib
+import numpy
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# Random numbers come from simuPOP's mt19937, seeded with sim.setRNG(), from the
+# python 'random' module, and from the numpy generators of the operators in
+# operators.py. Here, all the seeds and generators of a run derive from one root
+# seed. Every replicate gets a pair of seeds (simuPOP, python) from numpy's
+# SeedSequence, and every operator of a replicate gets its own generator, from
+# the python seed of the replicate and a key that names the operator. Streams
+# do not depend on the order in which operators are created, nor on which
+# worker process runs the replicate, so parallel runs are exactly reproducible.
+#
+# Operators draw all the numbers they need in a day with one call, like
+# rng.random(n) or rng.binomial(n, p) with arrays of parameters. Handing out
+# slices of blocks drawn in advance was tried, and it was slower: numpy fills
+# an array of doubles at the same speed either way, and the copies and the
+# bookkeeping of the blocks cost more than the call saved.
+
+def generator(seed=None, key=None):
+   '''Numpy random generator of the stream named 'key', derived from 'seed'.
+
+   The same pair always gives the same numbers, and different keys give
+   independent streams. Without a seed, the generator is seeded from the system.'''
+   if seed is None:
+      return numpy.random.default_rng()
+   if key is None:
+      return numpy.random.default_rng(seed)
+   return numpy.random.default_rng([seed, zlib.crc32(key.encode())])
+
+class RandomStreams:
+   '''Seeds and random streams of one replicate, all derived from a root seed.
+
+   Replicate 0 uses the root seed for both simuPOP and python, so that runs of
+   one replicate are the same as before there were replicates. The others get
+   seeds from SeedSequence(seed).spawn(). If 'seed' is None, the root seed is
+   drawn from the system, and can be read from attribute 'root'.'''
+   def __init__(self, seed=None, rep=0):
+      if seed is None:
+         seed = int(numpy.random.SeedSequence().generate_state(1)[0])
+      self.root = seed
+      self.rep = rep
+      if rep == 0:
+         self.simuPOP, self.python = seed, seed
+      else:
+         simuSeed, pySeed = numpy.random.SeedSequence(seed, spawn_key=(rep,)).generate_state(2)
+         self.simuPOP, self.python = int(simuSeed), int(pySeed)
+   def seeds(self):
+      '''Pair of seeds (simuPOP, python) of the replicate.'''
+      return self.simuPOP, self.python
+   def replicate(self, rep):
+      '''Streams of replicate number 'rep', from the same root seed.'''
+      return RandomStreams(self.root, rep)
+   def stream(self, key):
+      '''Numpy generator of the operator named 'key' in this replicate.'''
+      return generator(self.python, key)
@@ -0,0 +1,187 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# Parameter sweeps used to be run by launching all combinations of parameters
+# at once from a README.sh, with '&' and 'wait' (see 2018-06-07). Here, the jobs
+# are run by a limited number of workers, and their state is recorded in a
+# manifest file. If the sweep is interrupted, running it again with the same
+# manifest only runs the jobs that did not finish.
+
+PENDING = 'pending'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+def expand_grid(params, derive=None):
+   '''Returns the list of all combinations of parameter values, as dictionaries.
+
+   'params' is a list of (name, values) pairs. Values are kept as strings, so
+   that they are written in file names exactly as given. 'derive' is a list of
+   (name, expression) pairs, where each python expression is evaluated with the
+   numeric values of the parameters to add another parameter.'''
+   names = [name for name, values in params]
+   grid = []
+   for combination in itertools.product(*[values for name, values in params]):
+      job = dict(zip(names, combination))
+      for name, expression in derive or []:
+         job[name] = str(eval(expression, {'__builtins__': {}}, {k: to_number(v) for k, v in job.items()}))
+      grid.append(job)
+   return grid
+
+def to_number(value):
+   try:
+      return int(value)
+   except ValueError:
+      try:
+         return float(value)
+      except ValueError:
+         return value
+
+def job_id(job):
+   return ','.join('{}={}'.format(name, value) for name, value in job.items())
+
+def entry_command(entry, arguments):
+   '''Command line that runs an entry point with a list of arguments.
+
+   The entry point is either a script, like 'mutationSelectionBalance.py', or a
+   script and the function that parses the arguments, like 'MutationSelection.py:main'.'''
+   script, sep, function = entry.partition(':')
+   script = os.path.abspath(script)
+   if not function:
+      return [sys.executable, script] + arguments
+   module = os.path.splitext(os.path.basename(script))[0]
+   code = 'import sys; sys.path.insert(0, {!r}); sys.argv[0] = {!r}; import {}; {}.{}()'.format(
+      os.path.dirname(script), script, module, module, function)
+   return [sys.executable, '-c', code] + arguments
+
+def default_workers(memory=None):
+   '''Number of jobs to run at once: one per core, but no more than fit in the available memory.
+
+   'memory' is the expected peak memory of a job, in GB.'''
+   workers = os.cpu_count() or 1
+   if memory:
+      try:
+         with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+               if line.startswith('MemAvailable:'):
+                  available = int(line.split()[1]) / 1024 ** 2
+                  workers = min(workers, int(available / memory))
+                  break
+      except (OSError, ValueError):
+         pass
+   return max(1, workers)
+
+class Sweep:
+   '''A set of runs of one entry point, one per combination of parameters, tracked in a manifest.'''
+   def __init__(self, entry, template, grid, manifest='sweep.json', logs='{id}.log', retry=False):
+      self.manifest = manifest
+      self.lock = threading.Lock()
+      self.processes = {}
+      self.interrupted = False
+      self.jobs = {}
+      if os.path.exists(manifest):
+         with open(manifest) as fh:
+            self.jobs = json.load(fh)['jobs']
+      for job in grid:
+         name = job_id(job)
+         if name in self.jobs:
+            status = self.jobs[name]['status']
+            # A job that was running when the sweep was interrupted must be run again.
+            if status == RUNNING or (status == FAILED and retry):
+               self.jobs[name]['status'] = PENDING
+            continue
+         self.jobs[name] = {
+            'params': job,
+            'command': entry_command(entry, shlex.split(template.format(**job))),
+            'log': logs.format(id=name.replace(',', '_'), **job),
+            'status': PENDING,
+            'returncode': None,
+            'started': None,
+            'finished': None
+         }
+      self.save()
+   def save(self):
+      '''Writes the manifest atomically.'''
+      temporary = self.manifest + '.tmp'
+      with open(temporary, 'w') as fh:
+         json.dump({'jobs': self.jobs}, fh, indent=1)
+      os.replace(temporary, self.manifest)
+   def update(self, name, **fields):
+      with self.lock:
+         self.jobs[name].update(fields)
+         self.save()
+   def run_job(self, name):
+      job = self.jobs[name]
+      self.update(name, status=RUNNING, started=time.time(), finished=None, returncode=None)
+      with open(job['log'], 'w') as log:
+         process = subprocess.Popen(job['command'], stdout=log, stderr=subprocess.STDOUT)
+         with self.lock:
+            self.processes[name] = process
+         returncode = process.wait()
+      with self.lock:
+         del self.processes[name]
+      if self.interrupted:
+         # Runs killed by an interruption are left pending, to be resumed.
+         self.update(name, status=PENDING, returncode=None, started=None)
+      else:
+         self.update(name, status=FINISHED if returncode == 0 else FAILED, returncode=returncode, finished=time.time())
+      return returncode
+   def run(self, workers=None):
+      '''Runs all pending jobs, 'workers' at a time, and returns the number of failed jobs.'''
+      pending = [name for name, job in self.jobs.items() if job['status'] == PENDING]
+      with concurrent.futures.ThreadPoolExecutor(max_workers=workers or default_workers()) as executor:
+         try:
+            list(executor.map(self.run_job, pending))
+         except KeyboardInterrupt:
+            self.interrupted = True
+            executor.shutdown(wait=False, cancel_futures=True)
+            with self.lock:
+               for process in self.processes.values():
+                  process.terminate()
+            raise
+      return self.summary()[FAILED]
+   def summary(self):
+      counts = {PENDING: 0, RUNNING: 0, FINISHED: 0, FAILED: 0}
+      for job in self.jobs.values():
+         counts[job['status']] += 1
+      return counts
+
+def main():
+   parser = argparse.ArgumentParser(description = 'Runs a script once for every combination of parameter values, a limited number of runs at a time. The state of the runs is kept in a manifest, so that an interrupted sweep can be resumed without repeating finished runs.')
+   parser.add_argument('entry', type=str, help='Script to run, optionally followed by ":function" to call a function of it that parses the command line, like "MutationSelection.py:main".')
+   parser.add_argument('template', type=str, help='Arguments of the script, with the names of parameters in braces, like "-X {X} -A {A} -o MSB.{X}.{A}.txt".')
+   parser.add_argument('-p', '--param', nargs='+', action='append', default=[], metavar=('NAME', 'VALUE'), help='Name of a parameter followed by its values. Can be used several times.')
+   parser.add_argument('-d', '--derive', action='append', default=[], metavar='NAME=EXPRESSION', help='Parameter computed from the others with a python expression, like "q=1.55 * (X + A) * u".')
+   parser.add_argument('-m', '--manifest', default='sweep.json', type=str, help='Manifest file. Default: sweep.json.')
+   parser.add_argument('-l', '--logs', default='{id}.log', type=str, help='Template of the name of the file where the output of every run is saved. Default: "{id}.log".')
+   parser.add_argument('-w', '--workers', default=None, type=int, help='Number of simultaneous runs. Default: number of cores, limited by memory if --memory is given.')
+   parser.add_argument('-M', '--memory', default=None, type=float, help='Expected memory used by one run, in GB.')
+   parser.add_argument('-r', '--retry', action='store_true', help='Run again the runs that failed. Default: False.')
+   args = parser.parse_args()
+   params = [(values[0], values[1:]) for values in args.param]
+   derive = [tuple(x.split('=', 1)) for x in args.derive]
+   sweep = Sweep(args.entry, args.template, expand_grid(params, derive), args.manifest, args.logs, args.retry)
+   sweep.run(args.workers or default_workers(args.memory))
+   counts = sweep.summary()
+   print('Finished: {}; failed: {}; pending: {}.'.format(counts[FINISHED], counts[FAILED], counts[PENDING] + counts[RUNNING]))
+   if counts[FAILED] > 0:
+      sys.exit(1)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,104 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import argparse
+import json
+import os
+import sys
+import numpy
+import simuPOP as sim
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# MutationSelection.py used to keep the mutant allele frequencies of every
+# sampled generation in the XFreqChange and AFreqChange dictionaries, in pop
+# vars, for the whole run. Here, they are appended to a binary file instead:
+# a header of HEADER bytes, with a JSON description of the columns, followed
+# by one row of float64 numbers per sampled generation: the generation, the
+# frequencies at X-linked loci, and then at autosomal loci. A row can only be
+# incomplete if the run was killed while writing it, and then it is ignored.
+
+HEADER = 256
+DTYPE = '<f8'
+
+def write_header(fh, X_loci, A_loci):
+   header = json.dumps({'dtype': DTYPE, 'columns': 1 + X_loci + A_loci, 'X_loci': X_loci, 'A_loci': A_loci}).encode()
+   fh.write(header.ljust(HEADER, b' '))
+
+def read_header(filename):
+   with open(filename, 'rb') as fh:
+      return json.loads(fh.read(HEADER).decode())
+
+def read_trajectory(filename):
+   '''Memory-maps a trajectory file. Returns the generations and the frequencies at X-linked and autosomal loci.
+
+   The three arrays are views of the file, which is not loaded in memory.
+   Frequencies have one row per generation and one column per locus.'''
+   header = read_header(filename)
+   rows = (os.path.getsize(filename) - HEADER) // (header['columns'] * numpy.dtype(DTYPE).itemsize)
+   if rows == 0:
+      table = numpy.zeros((0, header['columns']))
+   else:
+      table = numpy.memmap(filename, dtype=DTYPE, mode='r', offset=HEADER, shape=(rows, header['columns']))
+   return table[:, 0], table[:, 1:1 + header['X_loci']], table[:, 1 + header['X_loci']:]
+
+def text_lines(filename, rep=0):
+   '''Lines of text with the frequencies of every sampled generation, as printed by MutationSelection.py -P.'''
+   gens, X, A = read_trajectory(filename)
+   for i in range(gens.size):
+      yield (str(rep) + '\t' + str(int(gens[i])) + '\t' + '\t'.join(map('{0:.4f}'.format, X[i].tolist())) + '\t\t' +
+             '\t'.join(map('{0:.4f}'.format, A[i].tolist())) + '\n')
+
+class TrajectorySink(sim.PyOperator):
+   '''Appends the frequencies of allele 1 at X-linked and autosomal loci to a trajectory file.
+
+   It must be applied after the allele frequencies are computed (by sim.Stat
+   or PopStats), with the same step. Rows are written in batches of 'batch'
+   generations; call flush() before saving a checkpoint, and close() after
+   evolving. If 'start' is given, the file is not created again: rows of
+   generations 'start' or later, written after the last checkpoint, are
+   removed, and new rows are appended.'''
+   def __init__(self, filename, X_loci, A_loci, batch=100, start=None, *args, **kwargs):
+      self.X_loci = X_loci
+      self.A_loci = A_loci
+      self.batch = batch
+      self.rows = []
+      if start is None or not os.path.exists(filename):
+         with open(filename, 'wb') as fh:
+            write_header(fh, X_loci, A_loci)
+      else:
+         gens, X, A = read_trajectory(filename)
+         keep = int(numpy.searchsorted(gens, start))
+         del gens, X, A
+         with open(filename, 'r+b') as fh:
+            fh.truncate(HEADER + keep * (1 + X_loci + A_loci) * numpy.dtype(DTYPE).itemsize)
+      self.fh = open(filename, 'ab')
+      sim.PyOperator.__init__(self, func=self.record, *args, **kwargs)
+   def record(self, pop):
+      freq = pop.dvars().alleleFreq
+      self.rows.append([pop.dvars().gen] + [freq[x][1] for x in range(self.X_loci + self.A_loci)])
+      if len(self.rows) >= self.batch:
+         self.flush()
+      return True
+   def flush(self):
+      if self.rows:
+         numpy.array(self.rows, dtype=DTYPE).tofile(self.fh)
+         self.rows = []
+      self.fh.flush()
+   def close(self):
+      self.flush()
+      self.fh.close()
+
+def main():
+   parser = argparse.ArgumentParser(description = 'Prints the allele frequencies saved in trajectory files as text, one line per replicate and sampled generation.')
+   parser.add_argument('files', nargs='+', type=str, help='Trajectory files, in order of replicates.')
+   args = parser.parse_args()
+   for rep, filename in enumerate(args.files):
+      for line in text_lines(filename, rep):
+         sys.stdout.write(line)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,68 @@
+###############################################################
+#                           MODULES                           #
+###############################################################
+
+import numpy
+
+###############################################################
+#                    FUNCTIONS AND CLASSES                    #
+###############################################################
+
+# sim.Recombinator decides, for every meiosis and every pair of adjacent loci,
+# whether there is a crossover between them, with probability 'rates' of the
+# first locus. Every chromosome starts from one of the two copies at random,
+# and switches to the other one at every crossover. Here, the crossovers of all
+# the meioses of a generation are drawn together. When the rate is the same
+# along a chromosome, as with the uniform maps of the scripts, the number of
+# crossovers of every meiosis is binomial (the number of intervals times the
+# rate, on average, which is the length of the map in Morgans), and they fall
+# on distinct intervals chosen uniformly, which is the same distribution as the
+# interval-by-interval trials. Otherwise, the trials of all the intervals and
+# meioses are drawn in one array. Genotypes have shape (individuals, 2, loci).
+
+def breakpoints(n, rates, rng):
+   '''Crossovers of 'n' meioses along a chromosome with crossover probability 'rates' in every interval.
+
+   Returns two arrays of the same length: the meiosis and the interval (from
+   0, between the first and second loci) of every crossover.'''
+   rates = numpy.asarray(rates, dtype=float)
+   m = rates.size
+   if m == 0 or n == 0 or not rates.any():
+      return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+   if numpy.all(rates == rates[0]):
+      meiosis = numpy.repeat(numpy.arange(n), rng.binomial(m, rates[0], size=n))
+      interval = rng.integers(m, size=meiosis.size)
+      # Two crossovers of the same meiosis in the same interval are drawn again.
+      while True:
+         key = meiosis * m + interval
+         order = numpy.argsort(key, kind='stable')
+         repeated = numpy.zeros(key.size, dtype=bool)
+         repeated[order[1:]] = key[order[1:]] == key[order[:-1]]
+         if not repeated.any():
+            return meiosis, interval
+         interval[repeated] = rng.integers(m, size=int(repeated.sum()))
+   return numpy.divmod(numpy.flatnonzero(rng.random((n, m)) < rates), m)
+
+def recombine(genotypes, numLoci, rates, rng):
+   '''One gamete of every individual in 'genotypes', with shape (individuals, loci).
+
+   'numLoci' has the number of loci of every chromosome, and 'rates' the
+   probability of a crossover after every locus, like the 'rates' of
+   sim.Recombinator: one value per locus (the last locus of every chromosome
+   is ignored) or a single value for all. Chromosomes are independent.'''
+   n, ploidy, loci = genotypes.shape
+   rates = numpy.broadcast_to(numpy.asarray(rates, dtype=float), (loci,))
+   # Whether every locus comes from the second copy.
+   second = numpy.empty((n, loci), dtype=bool)
+   start = 0
+   for size in numLoci:
+      end = start + size
+      if size == 0:
+         continue
+      meiosis, interval = breakpoints(n, rates[start:end - 1], rng)
+      # Crossovers fall on distinct intervals of every meiosis.
+      switches = numpy.bincount(meiosis * size + interval + 1, minlength=n * size).astype(bool).reshape(n, size)
+      switches[:, 0] = rng.integers(2, size=n).astype(bool)
+      second[:, start:end] = numpy.logical_xor.accumulate(switches, axis=1)
+      start = end
+   return numpy.where(second, genotypes[:, 1, :], genotypes[:, 0, :])
@@ -0,0 +1,118 @@
+import pickle
+import numpy
+import simuPOP as sim
+
+# The operators of operators.py only use a few methods of sim.Population. The
+# Population below has the same methods, with the information fields, sexes and
+# genotypes kept in numpy arrays, so that the tests can set them directly and
+# compare the results of the operators with plain python loops.
+
+class _Vars:
+   def __init__(self, variables):
+      object.__setattr__(self, 'variables', variables)
+   def __getattr__(self, name):
+      try:
+         return self.variables[name]
+      except KeyError:
+         raise AttributeError(name)
+   def __setattr__(self, name, value):
+      self.variables[name] = value
+
+class Individual:
+   def __init__(self, pop, index):
+      self.pop = pop
+      self.index = index
+   def sex(self):
+      return int(self.pop.sexes[self.index])
+   def genotype(self):
+      return self.pop.genotypes[self.index].ravel().tolist()
+   def setGenotype(self, geno):
+      self.pop.genotypes[self.index] = numpy.asarray(geno).reshape(self.pop.genotypes.shape[1:])
+   def info(self, field):
+      return float(self.pop.fields[field][self.index])
+
+class Population:
+   '''Individuals with information fields 'infoFields', sexes 'sexes' (1 or 2) and genotypes of shape (individuals, 2, loci).
+
+   'loci' and 'chromTypes' describe the chromosomes, like in sim.Population.
+   'splitters' maps virtual subpopulation numbers to functions of the population
+   that return the mask of its individuals, for setGenotype(subPops=...).'''
+   def __init__(self, sexes, genotypes=None, loci=(), chromTypes=None, infoFields=(), splitters=None, **fields):
+      self.sexes = numpy.asarray(sexes, dtype=numpy.int64)
+      n = self.sexes.size
+      self.loci = list(loci)
+      self.chromTypes = list(chromTypes) if chromTypes is not None else [sim.AUTOSOME] * len(self.loci)
+      if genotypes is None:
+         genotypes = numpy.zeros((n, 2, sum(self.loci)), dtype=numpy.int64)
+      self.genotypes = numpy.array(genotypes, dtype=numpy.int64).reshape(n, 2, sum(self.loci))
+      self.fields = {name: numpy.zeros(n) for name in infoFields}
+      for name, values in fields.items():
+         self.fields[name] = numpy.array(numpy.broadcast_to(numpy.asarray(values, dtype=float), (n,)))
+      self.splitters = splitters or {}
+      self.variables = {'gen': 0, 'rep': 0}
+      self.genotypeWrites = 0
+   def popSize(self):
+      return self.sexes.size
+   def infoFields(self):
+      return list(self.fields)
+   def indInfo(self, field):
+      return tuple(self.fields[field].tolist())
+   def setIndInfo(self, values, field):
+      self.fields[field] = numpy.array(numpy.broadcast_to(numpy.asarray(values, dtype=float), (self.popSize(),)))
+   def individual(self, index):
+      return Individual(self, index)
+   def individuals(self):
+      return (Individual(self, i) for i in range(self.popSize()))
+   def genotype(self):
+      return self.genotypes.ravel().tolist()
+   def setGenotype(self, geno, subPops=None):
+      self.genotypeWrites += 1
+      if subPops is None:
+         selected = numpy.ones(self.popSize(), dtype=bool)
+      else:
+         selected = numpy.zeros(self.popSize(), dtype=bool)
+         for sp, vsp in subPops:
+            selected |= self.splitters[vsp](self)
+      self.genotypes[selected] = numpy.asarray(geno).reshape((-1,) + self.genotypes.shape[1:])
+   def totNumLoci(self):
+      return sum(self.loci)
+   def numChrom(self):
+      return len(self.loci)
+   def numLoci(self, ch=None):
+      return self.loci if ch is None else self.loci[ch]
+   def chromType(self, ch):
+      return self.chromTypes[ch]
+   def ploidy(self):
+      return 2
+   def vars(self):
+      return self.variables
+   def dvars(self):
+      return _Vars(self.variables)
+   def removeIndividuals(self, indexes):
+      keep = numpy.ones(self.popSize(), dtype=bool)
+      keep[list(indexes)] = False
+      self.select(keep)
+   def select(self, keep):
+      '''Keeps only the individuals in 'keep', a mask or array of indexes.'''
+      self.sexes = self.sexes[keep]
+      self.genotypes = self.genotypes[keep]
+      for name in self.fields:
+         self.fields[name] = self.fields[name][keep]
+   def add(self, sexes, genotypes=None, **fields):
+      '''Appends individuals, with the given fields and zeros in the others.'''
+      sexes = numpy.asarray(sexes, dtype=numpy.int64)
+      if genotypes is None:
+         genotypes = numpy.zeros((sexes.size,) + self.genotypes.shape[1:], dtype=numpy.int64)
+      self.sexes = numpy.concatenate((self.sexes, sexes))
+      self.genotypes = numpy.concatenate((self.genotypes, numpy.asarray(genotypes, dtype=numpy.int64)))
+      for name in self.fields:
+         values = numpy.broadcast_to(numpy.asarray(fields.get(name, 0.0), dtype=float), (sexes.size,))
+         self.fields[name] = numpy.concatenate((self.fields[name], values))
+   def save(self, filename):
+      self.splitters = {}
+      with open(filename, 'wb') as fh:
+         pickle.dump(self, fh)
+
+def loadPopulation(filename):
+   with open(filename, 'rb') as fh:
+      return pickle.load(fh)
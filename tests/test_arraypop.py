@@ -0,0 +1,19 @@
+import numpy
+import arraypop
+
+def test_first_copy_comes_from_the_mother():
+   pop = arraypop.ArrayPopulation(200, 0.0039, -0.019, loci=3, seed=0)
+   pop.age[:] = pop.adult
+   pop.genotype[pop.sex == arraypop.MALE] = 1
+   pop.genotype[pop.sex == arraypop.FEMALE] = 0
+   pop.mate(1000)
+   newborns = pop.genotype[200:]
+   assert len(newborns) == 800
+   assert (newborns[:, 0] == 0).all() and (newborns[:, 1] == 1).all()
+
+def test_counts_add_up():
+   pop = arraypop.ArrayPopulation(500, 0.0039, -0.019, seed=1)
+   for day in range(30):
+      pop.day(500)
+   assert sum(pop.counts()) == pop.popSize() == 500
+   assert pop.structure().sum() == 500
@@ -0,0 +1,33 @@
+import numpy
+import calibrate
+
+def test_threshold_is_bracketed_for_every_h():
+   h = numpy.array([0.1, 0.25, 0.4])
+   lower, upper = calibrate.threshold(lambda s, h: s - h, h, 0.0, 0.5, points=11, tol=1e-6)
+   assert ((lower <= h) & (h <= upper)).all()
+   assert (upper - lower <= 1e-6).all()
+
+def test_threshold_outside_the_grid():
+   lower, upper = calibrate.threshold(lambda s, h: s - h, [-1.0, 2.0], 0.0, 0.5)
+   assert numpy.isneginf(lower[0]) and upper[0] == 0.0
+   assert lower[1] == 0.5 and numpy.isposinf(upper[1])
+   assert calibrate.interval(lower[0], upper[0]) == '<0.00000'
+   assert calibrate.interval(lower[1], upper[1]) == '>0.50000'
+
+def test_protected_within_bounds():
+   target = (numpy.array([0.2]), numpy.array([0.21]))
+   assert calibrate.protected((numpy.array([0.1]), numpy.array([0.11])), (numpy.array([0.3]), numpy.array([0.31])), target)
+   # Allele 1 invades in the whole grid, and allele 0 too.
+   assert calibrate.protected((numpy.array([-numpy.inf]), numpy.array([0.0])), (numpy.array([0.5]), numpy.array([numpy.inf])), target)
+
+def test_not_protected_when_allele_1_never_invades():
+   target = (numpy.array([0.2]), numpy.array([0.21]))
+   assert not calibrate.protected((numpy.array([0.5]), numpy.array([numpy.inf])), (numpy.array([0.3]), numpy.array([0.31])), target)
+
+def test_not_protected_when_allele_0_never_invades():
+   target = (numpy.array([0.2]), numpy.array([0.21]))
+   assert not calibrate.protected((numpy.array([0.1]), numpy.array([0.11])), (numpy.array([-numpy.inf]), numpy.array([0.0])), target)
+
+def test_not_stable_without_target():
+   target = (numpy.array([-numpy.inf]), numpy.array([0.0]))
+   assert not calibrate.protected((numpy.array([-numpy.inf]), numpy.array([0.0])), (numpy.array([0.5]), numpy.array([numpy.inf])), target)
@@ -0,0 +1,60 @@
+import random
+import numpy
+import pytest
+
+sim = pytest.importorskip('simuPOP')
+import checkpoint
+import mockpop
+import streams
+
+class Drawing:
+   '''Stands for an operator with a numpy generator.'''
+   def __init__(self):
+      self.rng = streams.generator(1, 'Drawing')
+
+class Sink:
+   def __init__(self):
+      self.flushes = 0
+   def flush(self):
+      self.flushes += 1
+
+@pytest.fixture
+def seeds(monkeypatch):
+   '''Records the seeds given to the simuPOP random number generator.'''
+   calls = []
+   monkeypatch.setattr(sim, 'setRNG', lambda name, seed: calls.append(seed))
+   monkeypatch.setattr(sim, 'loadPopulation', mockpop.loadPopulation)
+   return calls
+
+def test_reseeder_uses_the_generation(seeds):
+   pop = mockpop.Population([1, 2])
+   pop.dvars().gen = 7
+   checkpoint.Reseeder(2001).reseed(pop)
+   assert seeds == [checkpoint.derived_seed(2001, 7)]
+   assert checkpoint.derived_seed(2001, 7) != checkpoint.derived_seed(2001, 8)
+
+def test_save_and_restore(seeds, tmp_path):
+   prefix = str(tmp_path / 'run')
+   drawing, sink = Drawing(), Sink()
+   saver = checkpoint.Checkpoint(prefix, 2001, operators=[drawing], varNames=['alleleFreq'], sinks=[sink])
+   pop = mockpop.Population([1, 2, 2], age=[3, 4, 5], ind_id=[4, 8, 9])
+   for gen in (10, 20, 30):
+      pop.dvars().gen = gen
+      pop.vars()['alleleFreq'] = {0: {1: gen / 100.0}}
+      saver.save(pop)
+   # Saving does not touch the simuPOP generator: Reseeder does, with or without checkpoints.
+   assert seeds == []
+   assert sink.flushes == 3
+   assert saver.generations() == [20, 30]
+   expected = (random.random(), drawing.rng.random())
+   random.random()
+   drawing.rng.random()
+   restored, nextID = checkpoint.Checkpoint(prefix, 2001, operators=[drawing]).restore()
+   assert (random.random(), drawing.rng.random()) == expected
+   assert seeds == [checkpoint.derived_seed(2001, 30)]
+   assert restored.dvars().gen == 31 and nextID == 10
+   assert restored.vars()['alleleFreq'] == {0: {1: 0.3}}
+   assert restored.fields['age'].tolist() == [3, 4, 5]
+
+def test_nothing_to_restore(seeds, tmp_path):
+   assert checkpoint.Checkpoint(str(tmp_path / 'run'), 1).restore() == (None, 0)
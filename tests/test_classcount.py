@@ -0,0 +1,30 @@
+import numpy
+import classcount
+import leslie
+import lifetable
+
+def test_large_population_follows_the_projection():
+   a = leslie.aging_parameters(0.0039, 0.0013)
+   fitness = leslie.antagonistic_fitness(0.2, 0.5)
+   counts = classcount.ClassCounts(a, -0.019, fitness, N=10 ** 7, p0=0.3, seed=0).run(200)
+   projection = leslie.Projection(a, -0.019, fitness, N=10 ** 7, p0=0.3).run(200)
+   assert abs(counts.frequency() - projection.frequency()) < 0.002
+   numpy.testing.assert_allclose(counts.mean_age(), projection.mean_age(), rtol=0.01)
+
+def test_survivors_without_births_follow_the_survival_function():
+   a, b, k, days = 0.0039, -0.019, 0.1911, 100
+   counts = classcount.ClassCounts(leslie.aging_parameters(a, 0.0), b, leslie.antagonistic_fitness(0.0, 0.5),
+                                   k=k, N=10 ** 6, founding=days + 1, seed=1).run(days)
+   alive = counts.alive.sum(axis=(0, 1))
+   assert alive[0] == 0 and (alive[days + 1:] == 0).all()
+   numpy.testing.assert_allclose(alive[1:days + 1] / 10 ** 6, lifetable.two_phases_survival(a, b, k, days), atol=0.002)
+
+def test_every_child_has_one_adult_parent_of_each_sex():
+   counts = classcount.ClassCounts(leslie.aging_parameters(0.0039, 0.0013), -0.019, leslie.antagonistic_fitness(0.1, 0.5),
+                                   N=[1000, 5000], p0=0.5, adult=10, seed=2).run(300)
+   births = counts.born.sum(axis=(-1, -2)) - [1000, 5000]
+   assert (births > 0).all()
+   numpy.testing.assert_array_equal(counts.children.sum(axis=(-1, -2)), numpy.stack([births, births], axis=-1))
+   assert (counts.children[..., :10] == 0).all()
+   # Males have one copy of the X chromosome.
+   assert (counts.born[..., 0, 2] == 0).all() and (counts.children[..., 0, 2, :] == 0).all()
@@ -0,0 +1,13 @@
+import numpy
+import cohort
+import lifetable
+
+def test_mean_survival_follows_the_survival_function():
+   a, b, k, days = 0.0039, -0.019, 0.1911, 100
+   counts = cohort.cohort_counts(100, days, 'two_phases', a, b, k, reps=2000, rng=numpy.random.default_rng(0))
+   alive = counts.sum(axis=1).mean(axis=0) / 100
+   numpy.testing.assert_allclose(alive, lifetable.two_phases_survival(a, b, k, days), atol=0.005)
+
+def test_larvae_become_adults():
+   counts = cohort.cohort_counts(50, 20, 'gompertz', 0.0004, 0.05, adult=10, rng=numpy.random.default_rng(1))
+   assert (counts[0, 0, 9:] == 0).all() and (counts[0, 1, :9] == 0).all() and (counts[0, 2] == 0).all()
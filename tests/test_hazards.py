@@ -0,0 +1,60 @@
+import math
+import numpy
+import pytest
+import hazards
+
+def scalar_death(model, age, a, b, k, smurf):
+   if model == 'two_phases':
+      return 1.0 - math.exp(-k) if smurf == 1 else 0.0
+   if model == 'gompertz':
+      return 1.0 - math.exp((a * math.exp(b * age) / b) * (1.0 - math.exp(b)))
+   return 1.0 - math.exp(-(a / b) * (age + 1.0) ** b + (a / b) * age ** b)
+
+def scalar_smurf(age, a, b):
+   t0 = -b / a
+   return 1.0 - math.exp(-a * age + a * t0 - a / 2.0) if age > t0 else 0.0
+
+PARAMETERS = {'two_phases': (0.0039, -0.019), 'gompertz': (0.0004, 0.05), 'weibull': (0.0001, 2.5)}
+
+@pytest.mark.parametrize('model', hazards.MODELS)
+def test_death_probability_matches_scalar_formula(model):
+   a, b = PARAMETERS[model]
+   age = numpy.arange(0, 150)
+   smurf = age % 2
+   p = hazards.death_probability(model, age=age, a=a, b=b, k=0.1911, smurf=smurf)
+   expected = [scalar_death(model, x, a, b, 0.1911, s) for x, s in zip(age, smurf)]
+   numpy.testing.assert_allclose(p, expected, rtol=1e-12)
+
+def test_smurf_probability_matches_scalar_formula():
+   a, b = PARAMETERS['two_phases']
+   age = numpy.arange(0, 150)
+   numpy.testing.assert_allclose(hazards.smurf_probability(age, a, -b / a), [scalar_smurf(x, a, b) for x in age])
+
+def test_unknown_model():
+   with pytest.raises(ValueError):
+      hazards.death_probability('logistic', age=1, a=0.1, b=0.1)
+
+@pytest.mark.parametrize('model', hazards.MODELS)
+@pytest.mark.parametrize('sets', [1, 3, hazards.MAX_SETS + 5])
+def test_daily_probabilities_match_direct_computation(model, sets):
+   rng = numpy.random.default_rng(1)
+   a0, b0 = PARAMETERS[model]
+   n = 500
+   a = a0 * (1.0 + rng.integers(sets, size=n) / 10.0)
+   b = numpy.full(n, b0)
+   # Whole ages, some beyond the tables, and a few that are not whole numbers.
+   age = rng.integers(0, hazards.MAX_AGE + 20, size=n).astype(float)
+   age[:10] += 0.5
+   smurf, death = hazards.daily_probabilities(model, age, a, b, k=0.1911)
+   if model == 'two_phases':
+      numpy.testing.assert_allclose(smurf, [scalar_smurf(x, pa, pb) for x, pa, pb in zip(age, a, b)], rtol=1e-12)
+      numpy.testing.assert_allclose(death, 1.0 - math.exp(-0.1911))
+   else:
+      numpy.testing.assert_array_equal(smurf, 0.0)
+      numpy.testing.assert_allclose(death, [scalar_death(model, x, pa, pb, None, 0) for x, pa, pb in zip(age, a, b)],
+                                    rtol=1e-12)
+
+def test_hazard_tables_are_read_only():
+   smurf, death = hazards.hazard_table('gompertz', 0.0004, 0.05)
+   with pytest.raises(ValueError):
+      death[0] = 1.0
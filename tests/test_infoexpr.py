@@ -0,0 +1,56 @@
+import math
+import types
+import numpy
+import pytest
+import infoexpr
+
+def individuals(n=200, seed=0):
+   rng = numpy.random.default_rng(seed)
+   return {'age': rng.integers(0, 60, size=n).astype(float), 'a': rng.uniform(0.001, 0.01, size=n),
+           'b': rng.uniform(-0.05, 0.0, size=n), 'smurf': rng.integers(0, 2, size=n).astype(float),
+           'luck': rng.random(n)}
+
+def one_by_one(stmts, fields, variables, targets, exposeInd=''):
+   '''Runs the statements once per individual, like sim.InfoExec, and returns the values of the targets.'''
+   result = {name: numpy.empty(len(fields['age'])) for name in targets}
+   for i in range(len(fields['age'])):
+      namespace = dict(variables, math=math)
+      namespace.update({name: float(values[i]) for name, values in fields.items()})
+      if exposeInd:
+         namespace[exposeInd] = types.SimpleNamespace(**{name: float(values[i]) for name, values in fields.items()})
+      exec(stmts, namespace)
+      for name in targets:
+         result[name][i] = namespace[name]
+   return result
+
+STATEMENTS = [
+   ('age += 1', ''),
+   ('t = -b / a', ''),
+   ("smurf = 1.0 if ((ind.smurf == 1) or (ind.age > -ind.b / ind.a and ind.luck < 1.0 - math.exp(-ind.a * ind.age - ind.b - ind.a / 2.0))) else 0.0", 'ind'),
+   ('a = (smurf and a * 2) or b', ''),
+   ('luck = not smurf', ''),
+   ('age = max(age, k, 10) - min(abs(b) * 100, 1)', ''),
+   ('b = 0.5 if 10 < age <= 30 else -1.0', ''),
+   ('age = int(age / 7.0) + math.sqrt(age) + math.floor(luck * 3)', ''),
+   ('a = a * k\nb = a - 1', ''),
+]
+
+@pytest.mark.parametrize('stmts,exposeInd', STATEMENTS)
+def test_matches_per_individual_evaluation(stmts, exposeInd):
+   fields = individuals()
+   compiled = infoexpr.CompiledStatements(stmts, exposeInd)
+   values = compiled.evaluate(dict(fields, k=20.0), len(fields['age']))
+   expected = one_by_one(stmts, fields, {'k': 20.0}, compiled.targets, exposeInd)
+   for target in compiled.targets:
+      numpy.testing.assert_allclose(values[target], expected[target], rtol=1e-12)
+
+@pytest.mark.parametrize('stmts', ['x = ind.genotype()', 'x = [a for a in b]', 'x = a[0]', 'y.x = 1', 'x = a & b'])
+def test_not_vectorizable(stmts):
+   with pytest.raises(infoexpr.NotVectorizable):
+      infoexpr.CompiledStatements(stmts, 'ind')
+
+def test_random_numbers_are_drawn_per_individual():
+   compiled = infoexpr.CompiledStatements('luck = random.random()')
+   assert compiled.random
+   luck = compiled.evaluate({}, 1000, numpy.random.default_rng(0))['luck']
+   assert len(numpy.unique(luck)) == 1000 and 0.0 <= luck.min() and luck.max() < 1.0
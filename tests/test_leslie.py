@@ -0,0 +1,36 @@
+import numpy
+import leslie
+import lifetable
+
+def test_projection_without_births_follows_the_survival_function():
+   a, b, k, days = 0.0039, -0.019, 0.1911, 100
+   projection = leslie.Projection(leslie.aging_parameters(a, 0.0), b, leslie.antagonistic_fitness(0.0, 0.5),
+                                  k=k, founding=days + 1)
+   alive = []
+   for day in range(days):
+      projection.step()
+      alive.append(projection.n.sum())
+   numpy.testing.assert_allclose(alive, lifetable.two_phases_survival(a, b, k, days), rtol=1e-10)
+
+def test_neutral_allele_keeps_its_frequency():
+   for chromosome in ('X', 'A'):
+      projection = leslie.Projection(leslie.aging_parameters(0.0039, 0.0, chromosome), -0.019,
+                                     leslie.antagonistic_fitness(0.0, 0.5), chromosome=chromosome, p0=0.3)
+      assert numpy.isclose(projection.run(300).frequency(), 0.3)
+
+def test_grid_matches_single_projections():
+   s = numpy.array([0.0, 0.1, 0.3])
+   h = numpy.array([0.2, 0.5])
+   grid = numpy.meshgrid(s, h, indexing='ij')
+   together = leslie.Projection(leslie.aging_parameters(0.0039, 0.0013), -0.019,
+                                leslie.antagonistic_fitness(*grid)).run(200).frequency()
+   for i, j in numpy.ndindex(together.shape):
+      alone = leslie.Projection(leslie.aging_parameters(0.0039, 0.0013), -0.019,
+                                leslie.antagonistic_fitness(s[i], h[j])).run(200).frequency()
+      assert numpy.isclose(together[i, j], alone)
+
+def test_aging_parameters():
+   a = leslie.aging_parameters(1.0, 0.5, chromosome='X', mode='codominant', sexes=(1,))
+   numpy.testing.assert_allclose(a, [[1.0, 1.5, 1.5], [1.0, 1.0, 1.0]])
+   a = leslie.aging_parameters(1.0, 0.5, chromosome='A', mode='recessive', sexes=(1, 2))
+   numpy.testing.assert_allclose(a, [[1.0, 1.0, 1.5], [1.0, 1.0, 1.5]])
@@ -0,0 +1,29 @@
+import math
+import numpy
+import lifetable
+
+def survival(a, b, d, x):
+   '''S(x) of the two-phases model, computed term by term as in survival.py.'''
+   t0 = -b / a
+   c = math.ceil(t0)
+   q = lambda i: math.exp(-a * i + a * t0 - a / 2.0)
+   if x <= c:
+      return 1.0
+   product = lambda first, last: math.prod(q(j) for j in range(first, last))
+   return product(c, x) + sum((1.0 - q(i)) * math.exp((i - x) * d) * product(c, i) for i in range(c, x))
+
+def test_recursion_matches_direct_formula():
+   a = numpy.array([0.002, 0.0039, 0.01])
+   b = numpy.array([-0.019, -0.005, 0.0])
+   d = numpy.array([0.05, 0.1911])
+   oldest = 80
+   S = lifetable.two_phases_survival(a[:, None, None], b[None, :, None], d[None, None, :], oldest)
+   assert S.shape == (3, 3, 2, oldest)
+   for i, j, k in numpy.ndindex(S.shape[:-1]):
+      expected = [survival(a[i], b[j], d[k], x) for x in range(1, oldest + 1)]
+      numpy.testing.assert_allclose(S[i, j, k], expected, rtol=1e-10, atol=1e-14)
+
+def test_lifetime_fitness():
+   S, W = lifetable.two_phases_table(0.0039, -0.019, 0.1911, 60)
+   F = [max(1.0 - (x - 12.0) ** 2 / 100.0, 0.0) if x >= 10 else 0.0 for x in range(1, 61)]
+   assert math.isclose(W, sum(s * f for s, f in zip(S, F)), rel_tol=1e-12)
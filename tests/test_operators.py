@@ -0,0 +1,263 @@
+import math
+import numpy
+import pytest
+
+sim = pytest.importorskip('simuPOP')
+import operators
+from mockpop import Population
+
+def population(n=300, seed=0, **kwargs):
+   '''A mock population of random sexes and ages, with the aging fields of the scripts.'''
+   rng = numpy.random.default_rng(seed)
+   fields = dict(age=rng.integers(0, 80, size=n), a=0.0039, b=-0.019, smurf=rng.integers(0, 2, size=n),
+                 ind_id=numpy.arange(1, n + 1))
+   fields.update(kwargs)
+   return Population(rng.integers(1, 3, size=n), **fields)
+
+@pytest.mark.parametrize('model,a,b', [('two_phases', 0.0039, -0.019), ('gompertz', 0.0004, 0.05), ('weibull', 0.0001, 2.5)])
+def test_mortality_removes_the_same_individuals_as_discardif(model, a, b):
+   pop = population()
+   pop.setIndInfo(a, 'a')
+   pop.setIndInfo(b, 'b')
+   pop.dvars().k = 0.1911
+   before = dict(pop.fields)
+   operators.Mortality(model, seed=1).kill(pop)
+   # natural_death() of the scripts, one individual at a time, with the same random numbers.
+   u = operators.make_rng(1, 'Mortality ' + model).random(before['age'].size)
+   survivors = []
+   for i in range(before['age'].size):
+      age, smurf = before['age'][i], before['smurf'][i]
+      if model == 'two_phases':
+         p = 1.0 - math.exp(-0.1911) if smurf == 1 else 0.0
+      elif model == 'gompertz':
+         p = 1.0 - math.exp((a * math.exp(b * age) / b) * (1.0 - math.exp(b)))
+      else:
+         p = 1.0 - math.exp(-(a / b) * (age + 1.0) ** b + (a / b) * age ** b)
+      if not u[i] < p:
+         survivors.append(before['ind_id'][i])
+   assert pop.fields['ind_id'].tolist() == survivors
+
+def fitness_func(geno, ind, pop, age):
+   '''Like fitness_func() of SexChromSelectionBalance.py, with s = 0.2 and h = 0.5.'''
+   value = 0.0 if age < 10 else max(1.0 - ((age - 12) ** 2) / 100, 0.0)
+   if ind.sex() == 2:
+      value *= {0: 0.8, 1: 0.9, 2: 1.0}[geno[0] + geno[1]]
+   return value
+
+def test_vector_info_exec_streams_are_named_by_key():
+   draws = {}
+   for name, key in [('first', None), ('second', None), ('other', 'other luck')]:
+      pop = population(luck=0.0)
+      operators.VectorInfoExec('luck = random.random()', seed=7, key=key).execute(pop)
+      draws[name] = pop.fields['luck']
+   assert ((draws['first'] > 0) & (draws['first'] < 1)).all()
+   numpy.testing.assert_array_equal(draws['first'], draws['second'])
+   assert not (draws['first'] == draws['other']).any()
+
+def test_table_selector_matches_pyselector():
+   rng = numpy.random.default_rng(2)
+   pop = population(genotypes=rng.integers(0, 2, size=(300, 2, 2)), loci=[2], fitness=0.0)
+   operators.TableSelector(operators.fitness_table(fitness_func, 50), loci=[1]).select(pop)
+   # PySelector calls the function once per individual, with its genotype at the loci given.
+   expected = [fitness_func(tuple(pop.genotypes[i, :, 1]), ind, None, min(int(pop.fields['age'][i]), 50))
+               for i, ind in enumerate(pop.individuals())]
+   numpy.testing.assert_allclose(pop.fields['fitness'], expected)
+
+def transmission_population(seed=4, parents=40, newborns=200):
+   '''Parents with random genotypes at 4 X-linked and 3 autosomal loci, and newborns of age 0 without genotypes.'''
+   rng = numpy.random.default_rng(seed)
+   n = parents + newborns
+   sexes = numpy.concatenate([numpy.tile([1, 2], parents // 2), rng.integers(1, 3, size=newborns)])
+   genotypes = numpy.zeros((n, 2, 7), dtype=int)
+   genotypes[:parents] = rng.integers(0, 2, size=(parents, 2, 7))
+   fathers = numpy.zeros(n)
+   mothers = numpy.zeros(n)
+   fathers[parents:] = 2 * rng.integers(0, parents // 2, size=newborns) + 1
+   mothers[parents:] = 2 * rng.integers(0, parents // 2, size=newborns) + 2
+   return Population(sexes, genotypes=genotypes, loci=[4, 3], chromTypes=[sim.CHROMOSOME_X, sim.AUTOSOME],
+                     splitters={5: lambda pop: pop.fields['age'] == 0}, age=numpy.where(numpy.arange(n) < parents, 20, 0),
+                     ind_id=numpy.arange(1, n + 1), father_id=fathers, mother_id=mothers)
+
+def test_sex_specific_transmitter_writes_the_newborns_at_once():
+   together, alone = transmission_population(), transmission_population()
+   operators.SexSpecificTransmitter(seed=3, newborns=(0, 5)).transmit(together)
+   operators.SexSpecificTransmitter(seed=3).transmit(alone)
+   assert together.genotypeWrites == 1 and alone.genotypeWrites == 0
+   numpy.testing.assert_array_equal(together.genotypes, alone.genotypes)
+   # Without recombination, every chromosome of a gamete is one whole copy of the parent.
+   g = together.genotypes
+   for i in range(40, 240):
+      father = g[int(together.fields['father_id'][i]) - 1]
+      mother = g[int(together.fields['mother_id'][i]) - 1]
+      for chromosome in (slice(0, 4), slice(4, 7)):
+         assert any((g[i, 0, chromosome] == mother[copy, chromosome]).all() for copy in (0, 1))
+      assert any((g[i, 1, 4:] == father[copy, 4:]).all() for copy in (0, 1))
+      # Daughters get the X chromosome of their fathers, and sons the copy that stands for the Y.
+      numpy.testing.assert_array_equal(g[i, 1, :4], father[2 - together.sexes[i], :4])
+
+def additive_recessive(geno, ind, X_loci, min_a, effect):
+   '''AdditiveRecessive() of mutationSelectionBalance.py, called by PyQuanTrait for one newborn.'''
+   a = min_a
+   loci = ind.pop.totNumLoci()
+   if ind.sex() == 1:
+      for X_locus in range(X_loci):
+         if geno[X_locus] == 1:
+            a += effect
+      for A_locus in range(loci - X_loci):
+         if geno[X_loci + A_locus * 2] + geno[X_loci + A_locus * 2 + 1] == 2:
+            a += effect
+   else:
+      for locus in range(loci):
+         if geno[locus * 2] + geno[locus * 2 + 1] == 2:
+            a += effect
+   return a
+
+def quantrait_genotype(pop, i, X_loci):
+   '''The 'geno' tuple of PyQuanTrait: alleles locus by locus, with only one copy of X-linked loci in males.'''
+   g = pop.genotypes[i]
+   if pop.sexes[i] == 1:
+      return tuple(g[0, :X_loci]) + tuple(g[:, X_loci:].T.ravel())
+   return tuple(g.T.ravel())
+
+@pytest.mark.parametrize('X_loci,A_loci', [(70, 0), (5, 80), (0, 3)])
+def test_array_quantrait_matches_additive_recessive(X_loci, A_loci):
+   rng = numpy.random.default_rng(X_loci + A_loci)
+   n = 200
+   pop = population(n, genotypes=rng.random((n, 2, X_loci + A_loci)) < 0.4, loci=[X_loci, A_loci],
+                    chromTypes=[sim.CHROMOSOME_X, sim.AUTOSOME])
+   pop.fields['age'][:50] = 0
+   old = pop.fields['a'].copy()
+   effect = 0.047 / (X_loci + A_loci)
+   operators.ArrayQuanTrait(0.003, effect, -0.019, mode='recessive').assign(pop)
+   for i, ind in enumerate(pop.individuals()):
+      if i < 50:
+         assert math.isclose(pop.fields['a'][i], additive_recessive(quantrait_genotype(pop, i, X_loci), ind, X_loci, 0.003, effect))
+         assert pop.fields['b'][i] == -0.019
+      else:
+         assert pop.fields['a'][i] == old[i]
+
+def test_array_quantrait_matches_male_effect():
+   rng = numpy.random.default_rng(5)
+   pop = population(100, genotypes=rng.integers(0, 2, size=(100, 2, 1)), loci=[1], chromTypes=[sim.CHROMOSOME_X], t0=0.0)
+   pop.fields['age'][:] = 0
+   operators.ArrayQuanTrait(0.0039, 0.0013, -0.019, mode='codominant', sexes=[1]).assign(pop)
+   # MaleEffect() of SexChromSelectionBalance.py.
+   a = numpy.where(pop.sexes == 1, 0.0039 + 0.0013 * pop.genotypes[:, 0, 0], 0.0039)
+   numpy.testing.assert_allclose(pop.fields['a'], a)
+   numpy.testing.assert_allclose(pop.fields['t0'], 0.019 / a)
+
+def test_array_quantrait_without_loci():
+   pop = population(20, age=0)
+   operators.ArrayQuanTrait(0.003, 0.0, -0.019).assign(pop)
+   numpy.testing.assert_allclose(pop.fields['a'], 0.003)
+
+def test_pedigree_sink_writes_the_newborns(tmp_path):
+   import pedigree
+   rng = numpy.random.default_rng(6)
+   pop = population(50, genotypes=rng.integers(0, 2, size=(50, 2, 1)), loci=[1], father_id=7, mother_id=9, age=5)
+   pop.fields['age'][::3] = 0
+   pop.dvars().gen = 12
+   sink = operators.PedigreeSink(str(tmp_path / 'pedigree.bin'))
+   sink.write(pop)
+   sink.close()
+   records = pedigree.read_records(tmp_path / 'pedigree.bin')
+   newborn = numpy.arange(0, 50, 3)
+   assert records['id'].tolist() == pop.fields['ind_id'][newborn].tolist()
+   assert records['sex'].tolist() == pop.sexes[newborn].tolist()
+   assert records['genotype'].tolist() == pop.genotypes[newborn].sum(axis=(1, 2)).tolist()
+   assert (records['father'] == 7).all() and (records['mother'] == 9).all() and (records['birthday'] == 12).all()
+
+def test_reproductive_success_matches_the_pedigree(tmp_path):
+   import pedigree
+   rng = numpy.random.default_rng(7)
+   # Founders of ages 10 to 30, and their first offspring, on day 100.
+   n = 60
+   pop = Population(rng.integers(1, 3, size=n), genotypes=rng.integers(0, 2, size=(n, 2, 1)), loci=[1],
+                    age=rng.integers(10, 31, size=n), ind_id=numpy.arange(1, n + 1), father_id=0, mother_id=0)
+   pop.dvars().gen = 100
+   records = [(i, 0, 0, s, g, 100 - age) for i, s, g, age in
+              zip(range(1, n + 1), pop.sexes, pop.genotypes.sum(axis=(1, 2)), pop.fields['age'].astype(int))]
+   lrs = operators.ReproductiveSuccess(loci=[0], ages=20)
+   for gen in range(100, 160):
+      if gen > 100:
+         pop.fields['age'] += 1
+         pop.select(rng.random(pop.popSize()) > 0.05)
+      pop.dvars().gen = gen
+      adults = pop.fields['age'] >= 10
+      fathers = numpy.flatnonzero(adults & (pop.sexes == 1))
+      mothers = numpy.flatnonzero(adults & (pop.sexes == 2))
+      births = 10 if fathers.size > 0 and mothers.size > 0 else 0
+      father = pop.fields['ind_id'][rng.choice(fathers, births)]
+      mother = pop.fields['ind_id'][rng.choice(mothers, births)]
+      first = len(records) + 1
+      sexes, genotypes = rng.integers(1, 3, size=births), rng.integers(0, 2, size=(births, 2, 1))
+      pop.add(sexes, genotypes, age=0, ind_id=numpy.arange(first, first + births), father_id=father, mother_id=mother)
+      records += [(first + j, father[j], mother[j], sexes[j], genotypes[j].sum(), gen) for j in range(births)]
+      lrs.count(pop)
+   filename = tmp_path / 'pedigree.bin'
+   with open(filename, 'wb') as fh:
+      pedigree.write_records(fh, *[[r[i] for r in records] for i in range(6)])
+   expected = pedigree.offspring_by_parent_age(filename, ages=20)
+   offspring, individuals = lrs.tables(0, living=True)
+   numpy.testing.assert_array_equal(offspring, expected[0])
+   numpy.testing.assert_array_equal(individuals, expected[1])
+
+def test_age_histogram_matches_the_accumulated_dictionary():
+   rng = numpy.random.default_rng(8)
+   histogram = operators.AgeHistogram(loci=[0], maxAge=60)
+   AccumAges = {sex: {g: [0] * 60 for g in range(3)} for sex in (1, 2)}
+   for day in range(5):
+      pop = population(100, seed=day, genotypes=rng.integers(0, 2, size=(100, 2, 1)), loci=[1])
+      histogram.accumulate(pop)
+      # The InfoExec statement of FitnessCenter.py, once per individual.
+      for i, ind in enumerate(pop.individuals()):
+         if pop.fields['age'][i] < 60:
+            AccumAges[ind.sex()][int(pop.genotypes[i, 0, 0] + pop.genotypes[i, 1, 0])][int(pop.fields['age'][i])] += 1
+   expected = [[AccumAges[sex][g] for g in range(3)] for sex in (1, 2)]
+   numpy.testing.assert_array_equal(histogram.table(0), expected)
+
+def test_equilibrium_compares_the_means_of_two_windows():
+   import statistics
+   pop = population(40, genotypes=numpy.zeros((40, 2, 2)), loci=[1, 1], chromTypes=[sim.CHROMOSOME_X, sim.AUTOSOME])
+   equilibrium = operators.Equilibrium(xLoci=[0], aLoci=[1], window=5, tolerance=0.01)
+   # The X frequency keeps rising until generation 10, and then stays within 0.5% of 0.2.
+   frequencies = [0.02 * gen for gen in range(10)] + [0.2 + 0.001 * (gen % 2) for gen in range(10, 40)]
+   stopped = None
+   for gen, x in enumerate(frequencies):
+      pop.dvars().gen = gen
+      pop.dvars().alleleFreq = {0: {1: x}, 1: {1: 0.5}}
+      if not equilibrium.check(pop):
+         stopped = gen
+         break
+   assert stopped == 19
+   last = frequencies[10:20]
+   estimate = pop.vars()['equilibrium']
+   assert estimate['gen'] == 19
+   assert numpy.isclose(estimate['mean']['X'], statistics.mean(last[5:]))
+   assert numpy.isclose(estimate['variance']['X'], statistics.variance(last[5:]))
+   assert numpy.isclose(estimate['mean']['age_males'], pop.fields['age'][pop.sexes == 1].mean())
+   assert len(pop.vars()['equilibriumHistory']) == 20
+
+def test_pop_stats_match_allele_counting():
+   rng = numpy.random.default_rng(9)
+   types = [sim.CHROMOSOME_X, sim.AUTOSOME, sim.CHROMOSOME_Y]
+   pop = population(150, genotypes=rng.integers(0, 2, size=(150, 2, 9)), loci=[3, 4, 2], chromTypes=types)
+   operators.PopStats(meanOfInfo=[('age', 1, '_males'), ('age', 0, '')]).compute(pop)
+   locusType = [sim.CHROMOSOME_X] * 3 + [sim.AUTOSOME] * 4 + [sim.CHROMOSOME_Y] * 2
+   # sim.Stat(alleleFreq=...) counts the copies that every individual has at every locus.
+   for locus, kind in enumerate(locusType):
+      mutants = copies = 0
+      for i, ind in enumerate(pop.individuals()):
+         if kind == sim.AUTOSOME or (kind == sim.CHROMOSOME_X and ind.sex() == 2):
+            present = (0, 1)
+         elif ind.sex() == 1:
+            present = (0,)
+         else:
+            present = ()
+         mutants += sum(pop.genotypes[i, p, locus] for p in present)
+         copies += len(present)
+      assert numpy.isclose(pop.vars()['alleleFreq'][locus][1], mutants / copies)
+   assert numpy.isclose(pop.vars()['mutantFreq']['A'], numpy.mean([pop.vars()['alleleFreq'][x][1] for x in range(3, 7)]))
+   ages = pop.fields['age']
+   assert numpy.isclose(pop.vars()['meanOfInfo_males']['age'], ages[pop.sexes == 1].mean())
+   assert numpy.isclose(pop.vars()['meanOfInfo']['age'], ages.mean())
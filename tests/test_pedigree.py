@@ -0,0 +1,51 @@
+import numpy
+import pedigree
+
+def random_pedigree(rng, founders=20, days=60, births=15):
+   '''Records of a pedigree where parents are 10 to 40 days old, in the order of IdTagger.'''
+   records = [(i + 1, 0, 0, rng.integers(1, 3), rng.integers(0, 3), 0) for i in range(founders)]
+   for day in range(10, days):
+      eligible = [r for r in records if 10 <= day - r[5] <= 40]
+      males = [r for r in eligible if r[3] == 1]
+      females = [r for r in eligible if r[3] == 2]
+      if not males or not females:
+         continue
+      for j in range(births):
+         father = males[rng.integers(len(males))]
+         mother = females[rng.integers(len(females))]
+         records.append((len(records) + 1, father[0], mother[0], rng.integers(1, 3), rng.integers(0, 3), day))
+   return records
+
+def count(records, ages):
+   '''offspring_by_parent_age() with dictionaries, one record at a time.'''
+   byId = {r[0]: r for r in records}
+   offspring = numpy.zeros((2, 3, ages), dtype=numpy.uint64)
+   individuals = numpy.zeros((2, 3), dtype=numpy.int64)
+   genotype = lambda r: 1 if r[3] == 1 and r[4] == 2 else r[4]
+   for r in records:
+      individuals[r[3] - 1, genotype(r)] += 1
+      for parentId in r[1:3]:
+         if parentId == 0:
+            continue
+         parent = byId[parentId]
+         age = r[5] - parent[5]
+         if age < ages:
+            offspring[parent[3] - 1, genotype(parent), age] += 1
+   return offspring, individuals
+
+def test_round_trip_and_counts(tmp_path):
+   rng = numpy.random.default_rng(3)
+   records = random_pedigree(rng)
+   filename = tmp_path / 'pedigree.bin'
+   with open(filename, 'wb') as fh:
+      # Written in two batches, the second one shuffled: write_records() sorts them.
+      half = len(records) // 2
+      for batch in (records[:half], [records[i] for i in rng.permutation(range(half, len(records)))]):
+         pedigree.write_records(fh, *[[r[i] for r in batch] for i in range(6)])
+   read = pedigree.read_records(filename)
+   assert [tuple(int(x) for x in r) for r in read] == [tuple(int(x) for x in r) for r in records]
+   expected = count(records, 30)
+   for chunk in (7, 100, 10 ** 6):
+      offspring, individuals = pedigree.offspring_by_parent_age(filename, ages=30, maxAge=45, chunk=chunk)
+      numpy.testing.assert_array_equal(offspring, expected[0])
+      numpy.testing.assert_array_equal(individuals, expected[1])
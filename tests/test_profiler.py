@@ -0,0 +1,58 @@
+import io
+import pytest
+
+sim = pytest.importorskip('simuPOP')
+import mockpop
+import profiler
+
+class Clock:
+   '''Stands for time.perf_counter, returning the given times in order.'''
+   def __init__(self, times):
+      self.times = iter(times)
+   def __call__(self):
+      return next(self.times)
+
+class Op:
+   pass
+
+def evolve(pre, post, pop, generations):
+   '''Applies the markers the way simu.evolve() would, with no time spent by the operators themselves.'''
+   for gen in range(generations):
+      pop.dvars().gen = gen
+      for op in pre + post:
+         if isinstance(op, profiler._Marker):
+            op.mark(pop)
+
+def test_time_between_markers_goes_to_the_operator_before(monkeypatch, tmp_path):
+   # Every generation: start, pre 0 (1 s), pre 1 (2 s), mating (3 s), post 0 (4 s).
+   times = []
+   for gen in range(2):
+      start = 100.0 * gen
+      times += [start, start + 1, start + 3, start + 6, start + 10]
+   monkeypatch.setattr(profiler.time, 'perf_counter', Clock(times))
+   profile = profiler.Profiler(str(tmp_path / 'z.trace'))
+   pre = profile.preOps([Op(), Op()])
+   post = profile.postOps([Op()])
+   assert len(pre) == 5 and len(post) == 3
+   evolve(pre, post, mockpop.Population([1, 2]), 2)
+   assert profile.names == ['pre\t0:Op', 'pre\t1:Op', 'mating\tmatingScheme', 'post\t0:Op']
+   assert profile.calls == [2, 2, 2, 2]
+   assert profile.total == pytest.approx([2.0, 4.0, 6.0, 8.0])
+   summary = io.StringIO()
+   profile.summary(summary)
+   lines = summary.getvalue().splitlines()
+   assert lines[1].startswith('post\t0:Op\t2\t8.000\t4000.0')
+   assert lines[-1] == '# 2 generations, 10000.000 ms per generation.'
+   trace = (tmp_path / 'z.trace').read_text().splitlines()
+   assert trace[0] == '#Gen\tpre:0:Op\tpre:1:Op\tmating:matingScheme\tpost:0:Op'
+   assert trace[1:] == ['0\t1.000000\t2.000000\t3.000000\t4.000000', '1\t1.000000\t2.000000\t3.000000\t4.000000']
+
+def test_without_post_mating_operators_mating_ends_the_generation(monkeypatch):
+   monkeypatch.setattr(profiler.time, 'perf_counter', Clock([0.0, 1.0, 5.0, 6.0]))
+   profile = profiler.Profiler()
+   pre = profile.preOps([])
+   post = profile.postOps([])
+   evolve(pre, post, mockpop.Population([1]), 2)
+   assert profile.names == ['mating\tmatingScheme']
+   assert profile.total == pytest.approx([2.0])
+   assert profile.calls == [2]
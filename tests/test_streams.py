@@ -0,0 +1,19 @@
+import numpy
+import streams
+
+def test_same_seed_and_key_give_the_same_numbers():
+   assert (streams.generator(5, 'Mortality').random(10) == streams.generator(5, 'Mortality').random(10)).all()
+   assert not (streams.generator(5, 'Mortality').random(10) == streams.generator(5, 'Smurfing').random(10)).any()
+   assert not (streams.generator(5, 'Mortality').random(10) == streams.generator(6, 'Mortality').random(10)).any()
+
+def test_replicate_seeds():
+   root = streams.RandomStreams(2001)
+   assert root.seeds() == (2001, 2001)
+   seeds = [root.replicate(rep).seeds() for rep in range(5)]
+   assert len(set(seeds)) == 5
+   assert seeds == [streams.RandomStreams(2001, rep).seeds() for rep in range(5)]
+   assert root.replicate(3).stream('x').random() == streams.generator(seeds[3][1], 'x').random()
+
+def test_unseeded_root_is_recorded():
+   root = streams.RandomStreams()
+   assert streams.RandomStreams(root.root, 2).seeds() == root.replicate(2).seeds()
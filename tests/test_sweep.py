@@ -0,0 +1,44 @@
+import json
+import sweep
+
+SCRIPT = '''import sys
+with open(sys.argv[2], 'a') as fh:
+   fh.write(sys.argv[1] + '\\n')
+sys.exit(int(sys.argv[1]))
+'''
+
+def runs(filename):
+   with open(filename) as fh:
+      return fh.read().split()
+
+def test_expand_grid():
+   grid = sweep.expand_grid([('X', ['100', '200']), ('u', ['0.001'])], [('q', '2 * X * u')])
+   assert grid == [{'X': '100', 'u': '0.001', 'q': '0.2'}, {'X': '200', 'u': '0.001', 'q': '0.4'}]
+   assert sweep.job_id(grid[0]) == 'X=100,u=0.001,q=0.2'
+
+def test_resume_and_retry(tmp_path):
+   script = tmp_path / 'job.py'
+   script.write_text(SCRIPT)
+   marker = tmp_path / 'runs.txt'
+   manifest = str(tmp_path / 'sweep.json')
+   grid = sweep.expand_grid([('code', ['0', '1'])])
+   make = lambda retry=False: sweep.Sweep(str(script), '{code} ' + str(marker), grid, manifest,
+                                          str(tmp_path / '{id}.log'), retry)
+   assert make().run(2) == 1
+   assert sorted(runs(marker)) == ['0', '1']
+   # Finished and failed jobs are not run again.
+   assert make().run(2) == 1
+   assert len(runs(marker)) == 2
+   # A job left running by an interrupted sweep is run again.
+   with open(manifest) as fh:
+      jobs = json.load(fh)
+   jobs['jobs']['code=0']['status'] = sweep.RUNNING
+   with open(manifest, 'w') as fh:
+      json.dump(jobs, fh)
+   assert make().run(2) == 1
+   assert runs(marker)[2:] == ['0']
+   # Failed jobs are run again with 'retry'.
+   again = make(retry=True)
+   assert again.run(2) == 1
+   assert runs(marker)[3:] == ['1']
+   assert again.summary() == {sweep.PENDING: 0, sweep.RUNNING: 0, sweep.FINISHED: 1, sweep.FAILED: 1}
@@ -0,0 +1,49 @@
+import numpy
+import pytest
+
+sim = pytest.importorskip('simuPOP')
+import trajectory
+from mockpop import Population
+
+def record(sink, pop, gens, rng):
+   '''Applies the sink in every generation, and returns the frequencies as the XFreqChange and AFreqChange dictionaries.'''
+   XFreqChange, AFreqChange = {}, {}
+   for gen in gens:
+      freq = rng.random(5)
+      pop.dvars().gen = gen
+      pop.dvars().alleleFreq = {x: {0: 1.0 - p, 1: p} for x, p in enumerate(freq)}
+      sink.record(pop)
+      XFreqChange[gen] = freq[:2].tolist()
+      AFreqChange[gen] = freq[2:].tolist()
+   return XFreqChange, AFreqChange
+
+def test_trajectory_matches_the_dictionaries(tmp_path):
+   filename = str(tmp_path / 'run.traj')
+   rng = numpy.random.default_rng(0)
+   pop = Population([1, 2])
+   sink = trajectory.TrajectorySink(filename, 2, 3, batch=3)
+   XFreqChange, AFreqChange = record(sink, pop, range(0, 1000, 100), rng)
+   sink.close()
+   gens, X, A = trajectory.read_trajectory(filename)
+   assert gens.tolist() == list(XFreqChange)
+   numpy.testing.assert_array_equal(X, list(XFreqChange.values()))
+   numpy.testing.assert_array_equal(A, list(AFreqChange.values()))
+   lines = list(trajectory.text_lines(filename, rep=1))
+   assert lines[0] == '1\t0\t' + '\t'.join('{:.4f}'.format(p) for p in XFreqChange[0]) + '\t\t' + \
+                      '\t'.join('{:.4f}'.format(p) for p in AFreqChange[0]) + '\n'
+
+def test_resumed_trajectory_drops_the_rows_after_the_checkpoint(tmp_path):
+   filename = str(tmp_path / 'run.traj')
+   rng = numpy.random.default_rng(1)
+   pop = Population([1, 2])
+   sink = trajectory.TrajectorySink(filename, 2, 3)
+   before, _ = record(sink, pop, range(0, 600, 100), rng)
+   sink.close()
+   # The run was checkpointed at generation 300, and resumed from generation 301.
+   sink = trajectory.TrajectorySink(filename, 2, 3, start=301)
+   after, _ = record(sink, pop, range(400, 800, 100), rng)
+   sink.close()
+   gens, X, A = trajectory.read_trajectory(filename)
+   assert gens.tolist() == [0, 100, 200, 300, 400, 500, 600, 700]
+   numpy.testing.assert_array_equal(X[:4], [before[gen] for gen in (0, 100, 200, 300)])
+   numpy.testing.assert_array_equal(X[4:], list(after.values()))
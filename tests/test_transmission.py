@@ -0,0 +1,40 @@
+import numpy
+import transmission
+
+def heterozygotes(n, loci):
+   '''Genotypes with allele 0 in the first copy and 1 in the second one, so that gametes show where every locus comes from.'''
+   genotypes = numpy.zeros((n, 2, loci), dtype=numpy.int64)
+   genotypes[:, 1, :] = 1
+   return genotypes
+
+def close(observed, expected, n):
+   '''Whether a proportion in n trials is within five standard errors of its expected value.'''
+   return abs(observed - expected) <= 5 * numpy.sqrt(max(expected * (1 - expected), 1e-12) / n)
+
+def test_recombination_fractions_match_theory():
+   n, loci, rate = 20000, 40, 0.02
+   gametes = transmission.recombine(heterozygotes(n, loci), [loci], rate, numpy.random.default_rng(0))
+   assert close(gametes[:, 0].mean(), 0.5, n)
+   for distance in (1, 5, 39):
+      fraction = (gametes[:, 0] != gametes[:, distance]).mean()
+      assert close(fraction, (1 - (1 - 2 * rate) ** distance) / 2, n)
+
+def test_chromosomes_are_independent():
+   n = 20000
+   gametes = transmission.recombine(heterozygotes(n, 6), [3, 0, 3], 0.0, numpy.random.default_rng(1))
+   # Without crossovers, every chromosome comes whole from one copy.
+   assert (gametes[:, :3] == gametes[:, :1]).all() and (gametes[:, 3:] == gametes[:, 3:4]).all()
+   assert close((gametes[:, 0] != gametes[:, 3]).mean(), 0.5, n)
+
+def test_variable_rates():
+   n = 50000
+   rates = numpy.array([0.0, 0.3, 0.05, 0.0])
+   meiosis, interval = transmission.breakpoints(n, rates[:-1], numpy.random.default_rng(2))
+   counts = numpy.bincount(interval, minlength=3)
+   for i in range(3):
+      assert close(counts[i] / n, rates[i], n)
+
+def test_crossovers_fall_on_distinct_intervals():
+   meiosis, interval = transmission.breakpoints(1000, numpy.full(5, 0.6), numpy.random.default_rng(3))
+   assert len(set(zip(meiosis, interval))) == meiosis.size
+   assert interval.min() >= 0 and interval.max() < 5